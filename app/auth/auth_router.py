@@ -1,48 +1,164 @@
 from typing import Annotated, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status, Path, Response, Request
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, status, Path, Query, Response, Request
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.security.utils import get_authorization_scheme_param
 
 from auth.backend import auth_servise_dependency, AuthServise
 from auth.database.queries import get_user_objects_dependency, UserObjects
 from auth.database.models import User
-from auth.utils import OAuth2PasswordBearerWithCookie
+from auth.database.schemas import (
+    LogoutJobRead,
+    SessionRevocation,
+    Token,
+    TokenPrincipal,
+    UserCreate,
+    UserPage,
+    UserRead,
+)
+from auth.keys import get_key_set
+from auth.logout import log_out_users, logout_jobs
+from auth.ratelimit import enforce_username_limits
+from auth.utils import OAuth2PasswordBearerWithCookie, etag_matches, make_etag
+from config import (
+    JWKS_MAX_AGE,
+    LOGOUT_BATCH_SIZE,
+    MAX_PAGE_SIZE,
+    PAGE_SIZE,
+    USER_PROFILE_MAX_AGE,
+)
+from database.connection import async_session
+from database.pagination import decode_cursor, encode_cursor
 
 router = APIRouter(prefix="/api/auth")
 
 oauth2_scheme = OAuth2PasswordBearerWithCookie(tokenUrl="api/auth/sign-in")
 
+USER_READ_COLUMNS = tuple(getattr(User, field) for field in UserRead.model_fields)
 
-@router.get("/users")
-async def user_list(users: Annotated[UserObjects, Depends(get_user_objects_dependency)]):
-    return await users.get_all()
 
+def profile_cache_control(public: bool) -> str:
+    # Private profiles may be kept by the client but not by shared caches,
+    # and are revalidated on every use.
+    if public:
+        return f"public, max-age={USER_PROFILE_MAX_AGE}"
+    return "private, no-cache"
 
-@router.get("/users/{username}")
+
+@router.get("/.well-known/jwks.json")
+async def jwks(request: Request):
+    body, etag = get_key_set().jwks()
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={JWKS_MAX_AGE}, stale-while-revalidate={JWKS_MAX_AGE}",
+    }
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(body, media_type="application/jwk-set+json", headers=headers)
+
+
+@router.get("/users", response_model=UserPage)
+async def user_list(
+    request: Request,
+    users: Annotated[UserObjects, Depends(get_user_objects_dependency)],
+    cursor: Annotated[Optional[str], Query()] = None,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = PAGE_SIZE,
+):
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+    # Only ids and versions are needed to answer a conditional request.
+    versions = await users.get_page_rows(
+        (User.id, User.updated_at, User.is_public), after=after, limit=limit
+    )
+    headers = page_headers(after, limit, versions)
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    items = []
+    if versions:
+        items = await users.get_page_rows(
+            (*USER_READ_COLUMNS, User.updated_at),
+            User.id.in_([row["id"] for row in versions]),
+            limit=limit,
+        )
+        # Rows may have changed since the version check; describe these.
+        headers = page_headers(after, limit, items)
+        for item in items:
+            del item["updated_at"]
+    next_cursor = encode_cursor(versions[-1]["id"]) if len(versions) == limit else None
+    # Rows are already in the shape of UserPage; skip validating them again.
+    return Response(
+        orjson.dumps({"items": items, "next_cursor": next_cursor}),
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+def page_headers(after: Optional[int], limit: int, rows: list[dict]) -> dict:
+    versions = (f"{row['id']}:{row['updated_at'].isoformat()}" for row in rows)
+    return {
+        "ETag": make_etag(after, limit, *versions),
+        "Cache-Control": profile_cache_control(all(row["is_public"] for row in rows)),
+    }
+
+
+@router.get("/users/export")
+async def export_users():
+    async def rows():
+        async with async_session() as session:
+            async for row in UserObjects(session).stream_rows(USER_READ_COLUMNS):
+                yield orjson.dumps(row) + b"\n"
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+
+@router.get("/users/{username}", response_model=Optional[UserRead])
 async def get_user(
+    request: Request,
+    response: Response,
     username: Annotated[str, Path()],
     users: Annotated[UserObjects, Depends(get_user_objects_dependency)],
 ):
-    return await users.get(username=username)
+    user = await users.get(username=username)
+    if user is None:
+        return None
+    headers = {
+        "ETag": make_etag(user.id, user.updated_at.isoformat()),
+        "Cache-Control": profile_cache_control(user.is_public),
+    }
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return user
 
 
 @router.post("/sign-up")
 async def sign_up(
-    form_data: Annotated[User, Depends()],
+    form_data: Annotated[UserCreate, Depends()],
     servise: Annotated[AuthServise, Depends(auth_servise_dependency)],
 ):
-    return await servise.authorize(**form_data.model_dump())
+    return await servise.authorize(
+        **form_data.model_dump(exclude={"is_superuser", "registered_at"})
+    )
 
 
-@router.post("/sign-in")
+@router.post("/sign-in", response_model=Token)
 async def sign_in(
+    request: Request,
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
     servise: Annotated[AuthServise, Depends(auth_servise_dependency)],
 ):
+    await enforce_username_limits(request, form_data.username)
     return await servise.authenticate(form_data.username, form_data.password)
 
 
-@router.get("/my_profile")
+@router.get("/my_profile", response_model=TokenPrincipal)
 async def get_current_user_profile(
     servise: Annotated[AuthServise, Depends(auth_servise_dependency)],
     token: Annotated[str, Depends(oauth2_scheme)],
@@ -56,11 +172,12 @@ async def logout(
     request: Request,
     response: Response,
 ):
-    token = request.cookies.get("refres_token")
-    return await servise.logout(response, token)
+    token = request.cookies.get("refresh_token")
+    _, access_token = get_authorization_scheme_param(request.cookies.get("access_token"))
+    return await servise.logout(response, token, access_token or None)
 
 
-@router.post("/refresh")
+@router.post("/refresh", response_model=Token)
 async def refresh(
     servise: Annotated[AuthServise, Depends(auth_servise_dependency)],
     request: Request,
@@ -68,3 +185,44 @@ async def refresh(
 ):
     token = request.cookies.get("refresh_token")
     return await servise.refresh(response, token)
+
+
+@router.post("/logout/everywhere")
+async def logout_everywhere(
+    servise: Annotated[AuthServise, Depends(auth_servise_dependency)],
+    token: Annotated[str, Depends(oauth2_scheme)],
+    response: Response,
+):
+    return await servise.logout_everywhere(response, token)
+
+
+async def require_superuser(
+    servise: Annotated[AuthServise, Depends(auth_servise_dependency)],
+    token: Annotated[str, Depends(oauth2_scheme)],
+) -> None:
+    user = await servise.get_current_active_user(token)
+    if not user.is_superuser:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
+
+
+@router.post("/sessions/revoke", dependencies=[Depends(require_superuser)])
+async def revoke_sessions(body: SessionRevocation, response: Response):
+    if body.user_ids is not None and len(body.user_ids) <= LOGOUT_BATCH_SIZE:
+        sessions = await log_out_users(body.user_ids)
+        return {"users": len(body.user_ids), "sessions": sessions}
+    job = await logout_jobs.start(body.user_ids)
+    response.status_code = status.HTTP_202_ACCEPTED
+    response.headers["Location"] = router.url_path_for("logout_job", job_id=job.id)
+    return LogoutJobRead.model_validate(job, from_attributes=True)
+
+
+@router.get(
+    "/sessions/revoke/{job_id}",
+    response_model=LogoutJobRead,
+    dependencies=[Depends(require_superuser)],
+)
+async def logout_job(job_id: Annotated[str, Path()]):
+    job = await logout_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    return LogoutJobRead.model_validate(job, from_attributes=True)
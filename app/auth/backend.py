@@ -1,32 +1,52 @@
+import logging
 import uuid
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timedelta
+from typing import Optional
 
-from fastapi import Response, status, HTTPException, Depends
-from bcrypt import checkpw, hashpw, gensalt
+from fastapi import Request, Response, status, HTTPException, Depends
+from fastapi.security.utils import get_authorization_scheme_param
+from sqlalchemy.exc import IntegrityError
 
-from auth.cookies import CookieTransport
-from auth.jwt_strategy import JWTStrategy
+from auth.cookies import CookieTransport, get_cookie_transport
+from auth.hashing import PasswordHasher, password_hasher
+from auth.jwt_strategy import JWTStrategy, get_jwt_strategy
+from auth.logout import log_out_users
+from auth.ratelimit import LoginLockout, login_lockout, retry_after_header
+from auth.rehash import PasswordRehasher, password_rehasher
+from auth.sessions import RefreshSessionStore
 from auth.database.queries import (
     UserObjects,
-    TokenSessionObjects,
-    get_token_objects_dependency, 
+    get_session_store_dependency,
     get_user_objects_dependency,
 )
-from auth.database.models import User, TokenSession
-from auth.database.schemas import Token
-from config import REFRESH_TOKEN_EXPIRE_DAYS
+from auth.database.models import User
+from auth.database.schemas import Token, TokenPrincipal
+from database.connection import async_session
+from config import (
+    REFRESH_REUSE_GRACE_SECONDS,
+    REFRESH_TOKEN_EXPIRE_DAYS,
+    SIGNUP_PRECHECK,
+)
+
+logger = logging.getLogger(__name__)
 
 
 class AuthServise:
     def __init__(
         self,
-        refresh_sessions: TokenSessionObjects,
+        refresh_sessions: RefreshSessionStore,
         users: UserObjects,
-        cookies = CookieTransport(),
-        strategy = JWTStrategy(),
+        cookies: Optional[CookieTransport] = None,
+        strategy: Optional[JWTStrategy] = None,
+        hasher: PasswordHasher = password_hasher,
+        lockout: LoginLockout = login_lockout,
+        rehasher: PasswordRehasher = password_rehasher,
     ):
-        self.cookies = cookies
-        self.strategy = strategy
+        self.cookies = cookies or get_cookie_transport()
+        self.strategy = strategy or get_jwt_strategy()
+        self.hasher = hasher
+        self.lockout = lockout
+        self.rehasher = rehasher
         self.users = users
         self.refresh_sessions = refresh_sessions
 
@@ -35,12 +55,20 @@ class AuthServise:
         username: str, 
         password: str, 
     ) -> Token:
-        user = await self.users.get(username=username)
+        locked_for = await self.lockout.retry_after(username)
+        if locked_for:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many failed sign-in attempts",
+                headers=retry_after_header(locked_for),
+            )
+        user = await self.users.get(username=username, cache=False)
         exception = HTTPException(status_code=status.HTTP_400_BAD_REQUEST)
-        if not user:
-            raise exception
-        if not checkpw(password.encode(), user.password.encode()):
+        if not user or not await self.hasher.verify(password, user.password):
+            await self.lockout.record_failure(username)
             raise exception
+        await self.lockout.reset(username)
+        self.rehasher.schedule(user, password)
         token = await self.create_token(user)
         response = Response(status_code=status.HTTP_202_ACCEPTED)
         self.cookies.set_login_cookie(response, token.access_token, "access_token")
@@ -48,33 +76,58 @@ class AuthServise:
         return token
 
     async def authorize(self, **user_data) -> Response:
-        user = await self.users.get(username=user_data["username"])
-        exception = HTTPException(status_code=status.HTTP_409_CONFLICT)
-        if user:
-            raise exception
-        user = await self.users.get(email=user_data["email"])
-        if user:
-            raise exception
-        user_data["password"] = hashpw(user_data["password"].encode(), gensalt())
-        await self.users.create(**user_data)
+        if SIGNUP_PRECHECK:
+            field = await self.users.find_conflict(
+                user_data["username"], user_data["email"]
+            )
+            if field:
+                raise self._conflict(field)
+        user_data["password"] = await self.hasher.hash(user_data["password"])
+        user_data["registered_at"] = datetime.now()
+        try:
+            await self.users.create(**user_data)
+        except IntegrityError as error:
+            raise self._conflict(self.users.conflicting_field(error))
         return Response(status_code=status.HTTP_201_CREATED)
 
-    async def logout(self, response: Response, token: uuid.UUID) -> Response:
-        await self.refresh_sessions.delete(
-            TokenSession.refresh_token == token,
+    def _conflict(self, field: Optional[str]) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"User with this {field} already exists" if field else None,
         )
+
+    async def logout(
+        self,
+        response: Response,
+        token: uuid.UUID,
+        access_token: Optional[str] = None,
+    ) -> Response:
+        if token is not None:
+            await self.refresh_sessions.revoke(token)
+        if access_token is not None:
+            await self.strategy.revoke_token(access_token)
+        self.cookies.set_logout_cookie(response, "access_token")
+        self.cookies.set_logout_cookie(response, "refresh_token")
+        response.status_code = status.HTTP_204_NO_CONTENT
+        return response
+
+    async def logout_everywhere(self, response: Response, access_token: str) -> Response:
+        user = await self.get_current_user(access_token)
+        await log_out_users([user.id])
         self.cookies.set_logout_cookie(response, "access_token")
         self.cookies.set_logout_cookie(response, "refresh_token")
+        response.status_code = status.HTTP_204_NO_CONTENT
         return response
 
     async def create_token(self, user: User) -> Token:
-        access_token = await self.strategy.write_token(user)
+        access_token = self.strategy.write_token(user)
         refresh_token = uuid.uuid4()
-        await self.refresh_sessions.create(
+        created_at = datetime.now()
+        await self.refresh_sessions.open_session(
             user_id=user.id,
-            created_at=datetime.now(),
             refresh_token=refresh_token,
-            expires=timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+            created_at=created_at,
+            expires_at=created_at + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
         )
         return Token(
             access_token=access_token, 
@@ -83,36 +136,61 @@ class AuthServise:
         )
 
     async def refresh(self, response: Response, token: uuid.UUID) -> Token:
-        refresh_session = await self.refresh_sessions.get(
-            TokenSession.refresh_token == token
-        )
-        if not refresh_session:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
-        if refresh_session.created_at + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS) <= datetime.now(timezone.utc):
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
-        user = await self.users.get(User.id == refresh_session.user_id)
-        access_token = self.strategy.write_token(user.username)
-        self.cookies.set_login_cookie(response, access_token, "access_token")
-        self.cookies.set_login_cookie(response, refresh_token, "refresh_token")
+        exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+        try:
+            token = uuid.UUID(str(token))
+        except ValueError:
+            raise exception
         refresh_token = uuid.uuid4()
-        await self.refresh_sessions.update(
-            TokenSession.id == refresh_session.id,
-            refresh_token=refresh_token,
-            expires_in=REFRESH_TOKEN_EXPIRE_DAYS
+        user_id = await self.refresh_sessions.rotate(
+            token,
+            refresh_token,
+            expires_at=datetime.now() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
         )
+        if user_id is None:
+            await self._handle_failed_rotation(token)
+            raise exception
+        user = await self.users.get(id=user_id)
+        if user is None:
+            raise exception
+        access_token = self.strategy.write_token(user)
+        self.cookies.set_login_cookie(response, access_token, "access_token")
+        self.cookies.set_login_cookie(response, str(refresh_token), "refresh_token")
         return Token(
             access_token=access_token, 
             refresh_token=refresh_token, 
-            token_type="baerer"
+            token_type="bearer"
         )
 
-    async def get_current_user(self, token: str) -> User:
-        return await self.strategy.read_token(token, self.users)
+    async def _handle_failed_rotation(self, token: uuid.UUID) -> None:
+        rotated = await self.refresh_sessions.find_rotated(token)
+        if rotated is None:
+            return
+        grace = timedelta(seconds=REFRESH_REUSE_GRACE_SECONDS)
+        if rotated.rotated_at and datetime.now() - rotated.rotated_at <= grace:
+            return
+        logger.warning(
+            "refresh token reuse detected for user %s, revoking its session",
+            rotated.user_id,
+        )
+        await self.refresh_sessions.revoke(rotated.refresh_token)
+
+    async def get_current_user(
+        self,
+        token: str,
+        load_user: bool = False,
+    ) -> User | TokenPrincipal:
+        user = await self.strategy.read_token(token, self.users, load_user)
+        if not user:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+        return user
 
     async def get_current_active_user(
         self,
-        current_user: User = Depends(get_current_user),
-    ) -> User:
+        token: str,
+        load_user: bool = False,
+    ) -> User | TokenPrincipal:
+        current_user = await self.get_current_user(token, load_user)
         if not current_user.is_active:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -123,9 +201,26 @@ class AuthServise:
 
 def auth_servise_dependency(
     users: UserObjects = Depends(get_user_objects_dependency),
-    refresh_sessions: TokenSessionObjects = Depends(get_token_objects_dependency),
+    refresh_sessions: RefreshSessionStore = Depends(get_session_store_dependency),
 ):
     return AuthServise(
         users=users, 
         refresh_sessions=refresh_sessions
     )
+
+
+async def is_superuser_request(
+    request: Request,
+    strategy: Optional[JWTStrategy] = None,
+) -> bool:
+    _, token = get_authorization_scheme_param(request.cookies.get("access_token"))
+    if not token:
+        return False
+    async with async_session() as session:
+        try:
+            user = await (strategy or get_jwt_strategy()).read_token(
+                token, UserObjects(session)
+            )
+        except HTTPException:
+            return False
+    return bool(user and user.is_active and user.is_superuser)
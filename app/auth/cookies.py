@@ -51,3 +51,13 @@ class CookieTransport:
             samesite=self.cookie_samesite,
         )
         return response
+
+
+_cookie_transport: Optional[CookieTransport] = None
+
+
+def get_cookie_transport() -> CookieTransport:
+    global _cookie_transport
+    if _cookie_transport is None:
+        _cookie_transport = CookieTransport()
+    return _cookie_transport
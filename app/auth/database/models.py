@@ -1,7 +1,10 @@
+from typing import Optional
 from uuid import UUID
 
 from datetime import datetime, timedelta
 
+from sqlalchemy import DateTime
+from sqlalchemy.dialects import mysql
 from sqlmodel import Field, SQLModel
 
 
@@ -16,11 +19,30 @@ class User(SQLModel, table=True):
     is_public: bool = Field()
     is_active: bool = Field(default=True)
     is_superuser: bool = Field(default=False)
+    token_version: int = Field(default=0)
+    tokens_revoked_at: Optional[datetime] = Field(default=None, index=True)
+    # Moves on every UPDATE of the row; profile ETags are derived from it.
+    updated_at: datetime = Field(
+        default_factory=datetime.now,
+        sa_type=DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql"),
+        sa_column_kwargs={"default": datetime.now, "onupdate": datetime.now},
+    )
 
 
 class TokenSession(SQLModel, table=True):
     id: int = Field(nullable=False, primary_key=True, index=True)
     refresh_token: UUID = Field(unique=True, index=True)
+    previous_token: Optional[UUID] = Field(default=None, index=True)
+    rotated_at: Optional[datetime] = Field(default=None)
     created_at: datetime = Field(default=datetime.now().date())
     expires: timedelta = Field()
+    expires_at: datetime = Field(index=True)
+    user_id: int | None = Field(default=None, foreign_key="Users.id", index=True)
+
+
+class RevokedToken(SQLModel, table=True):
+    id: int = Field(nullable=False, primary_key=True, index=True)
+    jti: str = Field(unique=True, index=True, max_length=64)
+    revoked_at: datetime = Field()
+    expires_at: datetime = Field(index=True)
     user_id: int | None = Field(default=None, foreign_key="Users.id")
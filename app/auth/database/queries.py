@@ -1,21 +1,297 @@
+import re
+import uuid
+from datetime import datetime
+from functools import partial
+from typing import AsyncIterator, Optional, Sequence
+
 from fastapi import Depends
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select, update
 
-from auth.database.models import User, TokenSession
-from database.base import ORMBase
+from auth.database.models import RevokedToken, TokenSession, User
+from auth.sessions import RefreshSession, RefreshSessionStore, get_redis_session_store
+from cache import CacheNamespace, get_cache_backend
+from config import (
+    SESSION_STORE,
+    USER_CACHE_TTL,
+    USER_CACHE_NEGATIVE_TTL,
+)
+from database.base import ORMBase, chunked
 from database.connection import get_session, AsyncSession
 
+UNIQUE_VIOLATION_PATTERNS = (
+    re.compile(r"for key '(?:\w+\.)?(\w+)'"),
+    re.compile(r"UNIQUE constraint failed: \w+\.(\w+)"),
+    re.compile(r"Key \((\w+)\)="),
+)
+
 
 class UserObjects(ORMBase):
     model = User
+    cache = CacheNamespace(
+        get_cache_backend,
+        "users",
+        ttl=USER_CACHE_TTL,
+        negative_ttl=USER_CACHE_NEGATIVE_TTL,
+    )
+    cache_fields = ("id", "username", "email")
+    # Password hashes stay out of the shared cache; sign-in reads them with
+    # ``get(..., cache=False)``.
+    cache_exclude = {"password": ""}
+    coalesce_fields = ("id", "username", "email")
+    unique_fields = ("username", "email")
+    # Other workers' writes may take REPLICA_MAX_LAG to show up here; sign-in
+    # reads the primary, so new accounts and passwords count at once.
+    replica_reads = True
+
+    async def find_conflict(self, username: str, email: str) -> Optional[str]:
+        result = await self.session.execute(
+            select(User.username, User.email).
+            where(or_(User.username == username, User.email == email)).
+            limit(2)
+        )
+        for row in result:
+            if row.username == username:
+                return "username"
+            if row.email == email:
+                return "email"
+        return None
+
+    async def replace_password(self, user: dict, hashed: str) -> bool:
+        """Store ``hashed`` unless the password changed since ``user`` was read."""
+        result = await self.session.execute(
+            update(User).
+            where(User.id == user["id"], User.password == user["password"]).
+            values(password=hashed)
+        )
+        await self._commit(partial(self.invalidate_rows, [user]))
+        return result.rowcount == 1
+
+    async def bump_token_versions(self, user_ids: Sequence[int]) -> dict[int, int]:
+        """Invalidate the access tokens of ``user_ids``; return the new versions."""
+        now = datetime.now()
+        versions, cached = {}, []
+        for chunk in chunked(user_ids, self.chunk_size):
+            cached += await self._cached_rows(User.id.in_(chunk))
+            await self.session.execute(
+                update(User).
+                where(User.id.in_(chunk)).
+                values(token_version=User.token_version + 1, tokens_revoked_at=now)
+            )
+            result = await self.session.execute(
+                select(User.id, User.token_version).
+                where(User.id.in_(chunk))
+            )
+            versions.update(result.tuples().all())
+        await self._commit(partial(self.invalidate_rows, cached))
+        return versions
+
+    async def revoked_versions_page(
+        self, since: datetime, after: int, limit: int
+    ) -> list[tuple[int, int, datetime]]:
+        result = await self.session.execute(
+            select(User.id, User.token_version, User.tokens_revoked_at).
+            where(User.tokens_revoked_at > since, User.id > after).
+            order_by(User.id).
+            limit(limit)
+        )
+        return result.all()
+
+    def conflicting_field(self, error: IntegrityError) -> Optional[str]:
+        message = str(error.orig)
+        for pattern in UNIQUE_VIOLATION_PATTERNS:
+            match = pattern.search(message)
+            if match and match.group(1) in self.unique_fields:
+                return match.group(1)
+        return None
 
 
-class TokenSessionObjects(ORMBase):
+class TokenSessionObjects(ORMBase, RefreshSessionStore):
     model = TokenSession
+    # Sessions and revocations are always read from the primary.
+    replica_reads = False
+
+    async def open_session(
+        self,
+        user_id: int,
+        refresh_token: uuid.UUID,
+        created_at: datetime,
+        expires_at: datetime,
+    ) -> None:
+        await self.create(
+            user_id=user_id,
+            refresh_token=refresh_token,
+            created_at=created_at,
+            expires=expires_at - created_at,
+            expires_at=expires_at,
+        )
+
+    async def rotate(
+        self,
+        token: uuid.UUID,
+        new_token: uuid.UUID,
+        expires_at: datetime,
+    ) -> Optional[int]:
+        """Swap ``token`` for ``new_token`` if it is live; return its user id.
+
+        The conditional UPDATE is the only check, so of several concurrent
+        rotations of one token exactly one matches a row.
+        """
+        now = datetime.now()
+        result = await self.session.execute(
+            update(TokenSession).
+            where(
+                TokenSession.refresh_token == token,
+                TokenSession.expires_at > now,
+            ).
+            values(
+                refresh_token=new_token,
+                previous_token=token,
+                rotated_at=now,
+                expires_at=expires_at,
+            )
+        )
+        if result.rowcount != 1:
+            await self._rollback()
+            return None
+        result = await self.session.execute(
+            select(TokenSession.user_id).
+            where(TokenSession.refresh_token == new_token)
+        )
+        user_id = result.scalar()
+        await self._commit()
+        return user_id
+
+    async def find_rotated(self, previous_token: uuid.UUID) -> Optional[RefreshSession]:
+        row = await self.get(previous_token=previous_token)
+        return row and self.to_refresh_session(row)
+
+    async def revoke(self, refresh_token: uuid.UUID) -> None:
+        await self.delete(refresh_token=refresh_token)
+
+    async def revoke_users(self, user_ids: Sequence[int]) -> int:
+        return await self.delete_many(user_ids, field="user_id")
+
+    async def export_sessions(self, batch_size: int) -> AsyncIterator[list[RefreshSession]]:
+        now, after = datetime.now(), None
+        while True:
+            rows = await self.get_page(
+                TokenSession.expires_at > now, after=after, limit=batch_size
+            )
+            if rows:
+                yield [self.to_refresh_session(row) for row in rows]
+            if len(rows) < batch_size:
+                return
+            after = rows[-1].id
+
+    async def import_sessions(self, sessions: list[RefreshSession]) -> None:
+        rows = [
+            {
+                "user_id": session.user_id,
+                "refresh_token": session.refresh_token,
+                "previous_token": session.previous_token,
+                "rotated_at": session.rotated_at,
+                "created_at": session.created_at,
+                "expires": session.expires_at - session.created_at,
+                "expires_at": session.expires_at,
+            }
+            for session in sessions
+        ]
+        await self.upsert(
+            rows,
+            update_fields=("previous_token", "rotated_at", "expires", "expires_at"),
+            conflict_fields=("refresh_token",),
+        )
+
+    @staticmethod
+    def to_refresh_session(row: TokenSession) -> RefreshSession:
+        return RefreshSession(
+            user_id=row.user_id,
+            refresh_token=row.refresh_token,
+            created_at=row.created_at,
+            expires_at=row.expires_at,
+            previous_token=row.previous_token,
+            rotated_at=row.rotated_at,
+        )
+
+    async def expired_ids(self, now: datetime, limit: int) -> list[int]:
+        result = await self.session.execute(
+            select(TokenSession.id).
+            where(TokenSession.expires_at <= now).
+            limit(limit)
+        )
+        return result.scalars().all()
+
+    async def users_over_cap(self, cap: int, limit: int) -> list[int]:
+        result = await self.session.execute(
+            select(TokenSession.user_id).
+            group_by(TokenSession.user_id).
+            having(func.count() > cap).
+            limit(limit)
+        )
+        return result.scalars().all()
+
+    async def overflow_ids(self, user_id: int, keep: int) -> list[int]:
+        result = await self.session.execute(
+            select(TokenSession.id).
+            where(TokenSession.user_id == user_id).
+            order_by(TokenSession.created_at.desc(), TokenSession.id.desc()).
+            offset(keep)
+        )
+        return result.scalars().all()
+
+
+class RevokedTokenObjects(ORMBase):
+    model = RevokedToken
+
+    async def revoke(self, jti: str, expires_at: datetime, user_id: Optional[int]) -> None:
+        try:
+            await self.create(
+                jti=jti,
+                revoked_at=datetime.now(),
+                expires_at=expires_at,
+                user_id=user_id,
+            )
+        except IntegrityError:
+            pass
+
+    async def is_revoked(self, jti: str) -> bool:
+        result = await self.session.execute(
+            select(RevokedToken.id).
+            where(RevokedToken.jti == jti)
+        )
+        return result.first() is not None
+
+    async def live_page(
+        self, now: datetime, after: int, limit: int
+    ) -> list[tuple[int, str, datetime]]:
+        result = await self.session.execute(
+            select(RevokedToken.id, RevokedToken.jti, RevokedToken.expires_at).
+            where(RevokedToken.expires_at > now, RevokedToken.id > after).
+            order_by(RevokedToken.id).
+            limit(limit)
+        )
+        return result.all()
+
+    async def expired_ids(self, now: datetime, limit: int) -> list[int]:
+        result = await self.session.execute(
+            select(RevokedToken.id).
+            where(RevokedToken.expires_at <= now).
+            limit(limit)
+        )
+        return result.scalars().all()
 
 
 def get_user_objects_dependency(session: AsyncSession = Depends(get_session)):
     return UserObjects(session)
 
 
-def get_token_objects_dependency(session: AsyncSession = Depends(get_session)):
+def get_session_store(session: AsyncSession) -> RefreshSessionStore:
+    if SESSION_STORE == "redis":
+        return get_redis_session_store()
     return TokenSessionObjects(session)
+
+
+def get_session_store_dependency(session: AsyncSession = Depends(get_session)):
+    return get_session_store(session)
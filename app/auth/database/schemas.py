@@ -2,7 +2,7 @@ from typing import Annotated, Optional
 from datetime import datetime
 import uuid
 
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, model_validator
 
 
 class BaseUserModel(BaseModel):
@@ -10,8 +10,8 @@ class BaseUserModel(BaseModel):
     email: Annotated[EmailStr, Field(max_length=100)]
     registered_at: datetime
     is_public: bool
-    is_active: Optional[Annotated[bool, Field(default=True)]]
-    is_superuser: Optional[Annotated[bool, Field(default=False)]]
+    is_active: Annotated[bool, Field(default=True)]
+    is_superuser: Annotated[bool, Field(default=False)]
 
     class Config:
         from_attributes = True
@@ -19,7 +19,19 @@ class BaseUserModel(BaseModel):
 
 class UserCreate(BaseUserModel):
     password: Annotated[str, Field(min_length=8, max_length=150)]
-    registered_at: Optional[Annotated[datetime, Field(default=datetime.now())]]
+    registered_at: Optional[datetime] = None
+
+
+class UserRead(BaseUserModel):
+    id: int
+    # Stored addresses were validated on sign-up; re-validating every row
+    # of a response would run the email validator per user.
+    email: str
+
+
+class UserPage(BaseModel):
+    items: list[UserRead]
+    next_cursor: Optional[str] = None
 
 
 class UserUpdate(BaseModel):
@@ -32,3 +44,33 @@ class Token(BaseModel):
     access_token: str
     refresh_token: uuid.UUID
     token_type: str
+
+
+class TokenPrincipal(BaseModel):
+    id: int
+    username: str
+    is_active: bool
+    is_superuser: bool
+    token_version: int
+
+
+class SessionRevocation(BaseModel):
+    user_ids: Optional[list[int]] = None
+    all_users: bool = False
+
+    @model_validator(mode="after")
+    def one_target(self) -> "SessionRevocation":
+        if (self.user_ids is None) == (not self.all_users):
+            raise ValueError("give either user_ids or all_users")
+        return self
+
+
+class LogoutJobRead(BaseModel):
+    id: str
+    state: str
+    total: Optional[int]
+    users: int
+    sessions: int
+    error: Optional[str] = None
+    started_at: datetime
+    updated_at: datetime
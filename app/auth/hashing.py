@@ -0,0 +1,336 @@
+"""Password hashing.
+
+Every stored hash names its algorithm and parameters in its prefix
+(``$2b$12$...``, ``$argon2id$v=19$m=65536,t=3,p=4$...``,
+``$scrypt$ln=15,r=8,p=1$...``), so hashes made under any registered
+algorithm keep verifying after ``PASSWORD_HASH_ALGORITHM`` or its cost
+settings change. ``PasswordHasher.needs_rehash`` reports the ones that no
+longer match the configuration; ``auth.rehash`` upgrades them on sign-in.
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import logging
+import os
+import re
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import ClassVar, Literal, Optional
+
+from bcrypt import checkpw, gensalt, hashpw
+from fastapi import HTTPException, status
+
+from config import (
+    ARGON2_MEMORY_COST,
+    ARGON2_PARALLELISM,
+    ARGON2_TIME_COST,
+    PASSWORD_HASH_ALGORITHM,
+    PASSWORD_HASH_EXECUTOR,
+    PASSWORD_HASH_QUEUE_SIZE,
+    PASSWORD_HASH_ROUNDS,
+    PASSWORD_HASH_WORKERS,
+    SCRYPT_BLOCK_SIZE,
+    SCRYPT_LOG_N,
+    SCRYPT_PARALLELISM,
+)
+from observability.metrics import PASSWORD_HASH_DURATION, PASSWORD_HASH_QUEUE_TIME
+
+logger = logging.getLogger(__name__)
+
+# bcrypt panics, rather than raising, on a hash of the wrong shape.
+BCRYPT_HASH = re.compile(r"\$2[aby]\$(\d{2})\$[./A-Za-z0-9]{53}")
+
+
+class HashAlgorithm(ABC):
+    name: ClassVar[str]
+    prefixes: ClassVar[tuple[str, ...]]
+
+    @abstractmethod
+    def hash(self, password: bytes) -> str:
+        ...
+
+    @abstractmethod
+    def verify(self, password: bytes, hashed: str) -> bool:
+        """Whether ``password`` matches; False for a malformed ``hashed``."""
+
+    @abstractmethod
+    def needs_update(self, hashed: str) -> bool:
+        ...
+
+
+@dataclass(frozen=True)
+class Bcrypt(HashAlgorithm):
+    name: ClassVar[str] = "bcrypt"
+    prefixes: ClassVar[tuple[str, ...]] = ("$2a$", "$2b$", "$2y$")
+    rounds: int = PASSWORD_HASH_ROUNDS
+
+    def hash(self, password: bytes) -> str:
+        return hashpw(password, gensalt(self.rounds)).decode()
+
+    def verify(self, password: bytes, hashed: str) -> bool:
+        if BCRYPT_HASH.fullmatch(hashed) is None:
+            return False
+        try:
+            return checkpw(password, hashed.encode())
+        except ValueError:
+            return False
+
+    def needs_update(self, hashed: str) -> bool:
+        match = BCRYPT_HASH.fullmatch(hashed)
+        return match is not None and int(match.group(1)) != self.rounds
+
+
+@dataclass(frozen=True)
+class Argon2id(HashAlgorithm):
+    name: ClassVar[str] = "argon2id"
+    prefixes: ClassVar[tuple[str, ...]] = ("$argon2id$",)
+    time_cost: int = ARGON2_TIME_COST
+    memory_cost: int = ARGON2_MEMORY_COST
+    parallelism: int = ARGON2_PARALLELISM
+
+    def _hasher(self):
+        # argon2-cffi is only imported by deployments that use it.
+        from argon2 import PasswordHasher as Argon2Hasher
+
+        return Argon2Hasher(
+            time_cost=self.time_cost,
+            memory_cost=self.memory_cost,
+            parallelism=self.parallelism,
+        )
+
+    def hash(self, password: bytes) -> str:
+        return self._hasher().hash(password)
+
+    def verify(self, password: bytes, hashed: str) -> bool:
+        from argon2.exceptions import InvalidHashError, VerificationError
+
+        try:
+            return self._hasher().verify(hashed, password)
+        except (VerificationError, InvalidHashError):
+            return False
+
+    def needs_update(self, hashed: str) -> bool:
+        return self._hasher().check_needs_rehash(hashed)
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode().rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+
+@dataclass(frozen=True)
+class Scrypt(HashAlgorithm):
+    name: ClassVar[str] = "scrypt"
+    prefixes: ClassVar[tuple[str, ...]] = ("$scrypt$",)
+    log_n: int = SCRYPT_LOG_N
+    block_size: int = SCRYPT_BLOCK_SIZE
+    parallelism: int = SCRYPT_PARALLELISM
+    salt_size: ClassVar[int] = 16
+    key_size: ClassVar[int] = 32
+
+    @staticmethod
+    def _derive(password: bytes, salt: bytes, log_n: int, r: int, p: int) -> bytes:
+        n = 1 << log_n
+        return hashlib.scrypt(
+            password,
+            salt=salt,
+            n=n,
+            r=r,
+            p=p,
+            maxmem=256 * n * r,
+            dklen=Scrypt.key_size,
+        )
+
+    @staticmethod
+    def _parse(hashed: str) -> tuple[dict[str, int], bytes, bytes]:
+        _, _, parameters, salt, key = hashed.split("$")
+        values = dict(item.split("=") for item in parameters.split(","))
+        return (
+            {"log_n": int(values["ln"]), "r": int(values["r"]), "p": int(values["p"])},
+            _b64decode(salt),
+            _b64decode(key),
+        )
+
+    def hash(self, password: bytes) -> str:
+        salt = os.urandom(self.salt_size)
+        key = self._derive(password, salt, self.log_n, self.block_size, self.parallelism)
+        return (
+            f"$scrypt$ln={self.log_n},r={self.block_size},p={self.parallelism}"
+            f"${_b64encode(salt)}${_b64encode(key)}"
+        )
+
+    def verify(self, password: bytes, hashed: str) -> bool:
+        try:
+            parameters, salt, key = self._parse(hashed)
+            derived = self._derive(password, salt, **parameters)
+        except (ValueError, KeyError, OverflowError):
+            return False
+        return hmac.compare_digest(derived, key)
+
+    def needs_update(self, hashed: str) -> bool:
+        parameters, _, _ = self._parse(hashed)
+        return parameters != {
+            "log_n": self.log_n, "r": self.block_size, "p": self.parallelism
+        }
+
+
+ALGORITHMS: dict[str, type[HashAlgorithm]] = {
+    algorithm.name: algorithm for algorithm in (Bcrypt, Argon2id, Scrypt)
+}
+
+
+def get_algorithm(name: str, **parameters) -> HashAlgorithm:
+    try:
+        return ALGORITHMS[name](**parameters)
+    except KeyError:
+        raise ValueError(
+            f"Unknown password hash algorithm {name!r}, expected one of {sorted(ALGORITHMS)}"
+        )
+
+
+def identify(hashed: str) -> Optional[type[HashAlgorithm]]:
+    for algorithm in ALGORITHMS.values():
+        if hashed.startswith(algorithm.prefixes):
+            return algorithm
+    return None
+
+
+def _hash(algorithm: HashAlgorithm, password: bytes) -> tuple[str, float]:
+    start = time.perf_counter()
+    hashed = algorithm.hash(password)
+    return hashed, time.perf_counter() - start
+
+
+def _verify(algorithm: HashAlgorithm, password: bytes, hashed: str) -> tuple[bool, float]:
+    start = time.perf_counter()
+    valid = algorithm.verify(password, hashed)
+    return valid, time.perf_counter() - start
+
+
+@dataclass
+class OperationMetrics:
+    calls: int = 0
+    run_time: float = 0.0
+    wait_time: float = 0.0
+    max_run_time: float = 0.0
+
+    def record(self, run_time: float, wait_time: float) -> None:
+        self.calls += 1
+        self.run_time += run_time
+        self.wait_time += wait_time
+        self.max_run_time = max(self.max_run_time, run_time)
+
+
+@dataclass
+class HashingMetrics:
+    hash: OperationMetrics = field(default_factory=OperationMetrics)
+    verify: OperationMetrics = field(default_factory=OperationMetrics)
+    rejected: int = 0
+    in_flight: int = 0
+
+    def snapshot(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+            "hash": vars(self.hash).copy(),
+            "verify": vars(self.verify).copy(),
+        }
+
+
+class PasswordHasher:
+    def __init__(
+        self,
+        algorithm: Optional[HashAlgorithm] = None,
+        workers: int = PASSWORD_HASH_WORKERS,
+        queue_size: int = PASSWORD_HASH_QUEUE_SIZE,
+        executor: Literal["thread", "process"] = PASSWORD_HASH_EXECUTOR,
+    ):
+        self.algorithm = algorithm or get_algorithm(PASSWORD_HASH_ALGORITHM)
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self.executor_type = executor
+        self.metrics = HashingMetrics()
+        self._executor: Optional[Executor] = None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="password-hasher",
+                )
+        return self._executor
+
+    async def hash(self, password: str) -> str:
+        return await self._run(
+            "hash", self.metrics.hash, self.algorithm, _hash, password.encode()
+        )
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        algorithm = self.algorithm_for(hashed)
+        if algorithm is None:
+            logger.warning("password hash with an unknown prefix %r", hashed[:10])
+            return False
+        return await self._run(
+            "verify", self.metrics.verify, algorithm, _verify, password.encode(), hashed
+        )
+
+    def algorithm_for(self, hashed: str) -> Optional[HashAlgorithm]:
+        algorithm = identify(hashed)
+        if algorithm is None:
+            return None
+        if isinstance(self.algorithm, algorithm):
+            return self.algorithm
+        return algorithm()
+
+    def needs_rehash(self, hashed: str) -> bool:
+        if self.algorithm_for(hashed) is not self.algorithm:
+            return True
+        return self.algorithm.needs_update(hashed)
+
+    async def _run(
+        self,
+        operation: str,
+        metrics: OperationMetrics,
+        algorithm: HashAlgorithm,
+        func,
+        *args,
+    ):
+        if self.metrics.in_flight >= self.capacity:
+            self.metrics.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Password hashing queue is full",
+                headers={"Retry-After": "1"},
+            )
+        self.metrics.in_flight += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result, run_time = await loop.run_in_executor(
+                self.executor, func, algorithm, *args
+            )
+        finally:
+            self.metrics.in_flight -= 1
+        wait_time = time.perf_counter() - start - run_time
+        metrics.record(run_time, wait_time)
+        PASSWORD_HASH_DURATION.labels(operation, algorithm.name).observe(run_time)
+        PASSWORD_HASH_QUEUE_TIME.labels(operation).observe(wait_time)
+        return result
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,285 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Optional
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec, padding
+from cryptography.hazmat.primitives.asymmetric.utils import (
+    decode_dss_signature,
+    encode_dss_signature,
+)
+
+from config import JWT_ENGINE, JWT_LEEWAY
+
+HMAC_DIGESTS = {"HS256": hashlib.sha256, "HS384": hashlib.sha384, "HS512": hashlib.sha512}
+HASHES = {"256": hashes.SHA256, "384": hashes.SHA384, "512": hashes.SHA512}
+EC_CURVES = {"ES256": ec.SECP256R1, "ES384": ec.SECP384R1, "ES512": ec.SECP521R1}
+
+
+class TokenError(Exception):
+    pass
+
+
+def b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def b64decode(data: bytes) -> bytes:
+    try:
+        return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+    except ValueError as error:
+        raise TokenError("Invalid base64 segment") from error
+
+
+def timestamp(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return value
+
+
+def load_key(key: str | bytes, private: bool):
+    """Load a PEM key; private PEMs also serve as the verification key."""
+    if isinstance(key, str):
+        key = key.encode()
+    if b"PRIVATE KEY" in key:
+        loaded = serialization.load_pem_private_key(key, password=None)
+        return loaded if private else loaded.public_key()
+    if private:
+        raise TokenError("A private key is required for signing")
+    return serialization.load_pem_public_key(key)
+
+
+class Signer(ABC):
+    @abstractmethod
+    def sign(self, message: bytes) -> bytes: ...
+
+    @abstractmethod
+    def verify(self, message: bytes, signature: bytes) -> bool: ...
+
+
+class HMACSigner(Signer):
+    def __init__(self, key: str | bytes, algorithm: str):
+        if isinstance(key, str):
+            key = key.encode()
+        self._mac = hmac.new(key, digestmod=HMAC_DIGESTS[algorithm])
+
+    def sign(self, message: bytes) -> bytes:
+        mac = self._mac.copy()
+        mac.update(message)
+        return mac.digest()
+
+    def verify(self, message: bytes, signature: bytes) -> bool:
+        return hmac.compare_digest(self.sign(message), signature)
+
+
+class AsymmetricSigner(Signer):
+    def __init__(self, key: str | bytes, algorithm: str, verify_only: bool = False):
+        self._private = None if verify_only else load_key(key, private=True)
+        self._public = (
+            load_key(key, private=False) if verify_only else self._private.public_key()
+        )
+        family, size = algorithm[:2], algorithm[2:]
+        self._hash = HASHES[size]() if family != "Ed" else None
+        if family == "RS":
+            self._args = (padding.PKCS1v15(), self._hash)
+        elif family == "PS":
+            self._args = (
+                padding.PSS(mgf=padding.MGF1(self._hash), salt_length=self._hash.digest_size),
+                self._hash,
+            )
+        elif family == "ES":
+            self._args = (ec.ECDSA(self._hash),)
+            self._size = (self._public.curve.key_size + 7) // 8
+        else:
+            self._args = ()
+        self._family = family
+
+    def sign(self, message: bytes) -> bytes:
+        if self._private is None:
+            raise TokenError("Engine was built without a signing key")
+        signature = self._private.sign(message, *self._args)
+        if self._family == "ES":
+            r, s = decode_dss_signature(signature)
+            signature = r.to_bytes(self._size, "big") + s.to_bytes(self._size, "big")
+        return signature
+
+    def verify(self, message: bytes, signature: bytes) -> bool:
+        if self._family == "ES":
+            if len(signature) != 2 * self._size:
+                return False
+            signature = encode_dss_signature(
+                int.from_bytes(signature[:self._size], "big"),
+                int.from_bytes(signature[self._size:], "big"),
+            )
+        try:
+            self._public.verify(signature, message, *self._args)
+        except InvalidSignature:
+            return False
+        return True
+
+
+def make_signer(key: str | bytes, algorithm: str, verify_only: bool = False) -> Signer:
+    if algorithm in HMAC_DIGESTS:
+        return HMACSigner(key, algorithm)
+    if algorithm[:2] in ("RS", "PS") and algorithm[2:] in HASHES:
+        return AsymmetricSigner(key, algorithm, verify_only)
+    if algorithm in EC_CURVES or algorithm == "EdDSA":
+        return AsymmetricSigner(key, algorithm, verify_only)
+    raise TokenError(f"Unsupported algorithm {algorithm}")
+
+
+class JWTEngine(ABC):
+    """Encodes and decodes compact JWS tokens for one key and algorithm."""
+
+    def __init__(
+        self,
+        key: str | bytes,
+        algorithm: str,
+        leeway: int = JWT_LEEWAY,
+        kid: Optional[str] = None,
+    ):
+        self.algorithm = algorithm
+        self.leeway = leeway
+        self.kid = kid
+        self.headers = {"alg": algorithm, "typ": "JWT"}
+        if kid is not None:
+            self.headers["kid"] = kid
+        self.header_segment = b64encode(
+            json.dumps(self.headers, separators=(",", ":")).encode()
+        )
+
+    @abstractmethod
+    def encode(self, claims: dict) -> str: ...
+
+    @abstractmethod
+    def decode(self, token: str) -> dict: ...
+
+
+class NativeEngine(JWTEngine):
+    """Signs with a key prepared once and a pre-encoded header segment."""
+
+    def __init__(
+        self,
+        key: str | bytes,
+        algorithm: str,
+        leeway: int = JWT_LEEWAY,
+        kid: Optional[str] = None,
+        verify_only: bool = False,
+    ):
+        super().__init__(key, algorithm, leeway, kid)
+        self.signer = make_signer(key, algorithm, verify_only)
+        self._dumps = json.JSONEncoder(separators=(",", ":")).encode
+
+    def encode(self, claims: dict) -> str:
+        payload = {key: timestamp(value) for key, value in claims.items()}
+        signing_input = self.header_segment + b"." + b64encode(self._dumps(payload).encode())
+        return (
+            signing_input + b"." + b64encode(self.signer.sign(signing_input))
+        ).decode()
+
+    def decode(self, token: str) -> dict:
+        if isinstance(token, str):
+            token = token.encode()
+        try:
+            signing_input, signature = token.rsplit(b".", 1)
+            header, payload = signing_input.split(b".")
+        except (AttributeError, ValueError) as error:
+            raise TokenError("Malformed token") from error
+        if header != self.header_segment:
+            self._check_header(header)
+        if not self.signer.verify(signing_input, b64decode(signature)):
+            raise TokenError("Signature verification failed")
+        try:
+            claims = json.loads(b64decode(payload))
+        except ValueError as error:
+            raise TokenError("Invalid payload") from error
+        if not isinstance(claims, dict):
+            raise TokenError("Invalid payload")
+        self._check_claims(claims)
+        return claims
+
+    def _check_header(self, header: bytes) -> None:
+        try:
+            parsed = json.loads(b64decode(header))
+        except ValueError as error:
+            raise TokenError("Invalid header") from error
+        if not isinstance(parsed, dict) or parsed.get("alg") != self.algorithm:
+            raise TokenError("The specified alg value is not allowed")
+
+    def _check_claims(self, claims: dict) -> None:
+        now = time.time()
+        expires = claims.get("exp")
+        if expires is not None:
+            if not isinstance(expires, (int, float)):
+                raise TokenError("Expiration Time claim (exp) must be a number")
+            if expires < now - self.leeway:
+                raise TokenError("Signature has expired")
+        not_before = claims.get("nbf")
+        if not_before is not None:
+            if not isinstance(not_before, (int, float)):
+                raise TokenError("Not Before claim (nbf) must be a number")
+            if not_before > now + self.leeway:
+                raise TokenError("The token is not yet valid (nbf)")
+
+
+class JoseEngine(JWTEngine):
+    """python-jose, which parses the key and algorithm on every call."""
+
+    def __init__(
+        self,
+        key: str | bytes,
+        algorithm: str,
+        leeway: int = JWT_LEEWAY,
+        kid: Optional[str] = None,
+        verify_only: bool = False,
+    ):
+        super().__init__(key, algorithm, leeway, kid)
+        self.key = key
+        self.verify_key = key
+        if algorithm not in HMAC_DIGESTS:
+            self.verify_key = load_key(key, private=False).public_bytes(
+                serialization.Encoding.PEM,
+                serialization.PublicFormat.SubjectPublicKeyInfo,
+            )
+
+    def encode(self, claims: dict) -> str:
+        from jose import jwt
+
+        return jwt.encode(
+            claims, key=self.key, algorithm=self.algorithm, headers=self.headers
+        )
+
+    def decode(self, token: str) -> dict:
+        from jose import JWTError, jwt
+
+        try:
+            return jwt.decode(
+                token,
+                key=self.verify_key,
+                algorithms=[self.algorithm],
+                options={"leeway": self.leeway},
+            )
+        except JWTError as error:
+            raise TokenError(str(error)) from error
+
+
+ENGINES = {"native": NativeEngine, "jose": JoseEngine}
+
+
+def get_jwt_engine(
+    key: str | bytes,
+    algorithm: str,
+    engine: Optional[str] = None,
+    **options,
+) -> JWTEngine:
+    try:
+        engine_class = ENGINES[engine or JWT_ENGINE]
+    except KeyError:
+        raise ValueError(f"Unknown JWT engine {engine or JWT_ENGINE!r}") from None
+    return engine_class(key, algorithm, **options)
@@ -1,12 +1,29 @@
+import logging
+import uuid
 from typing import Optional
 from datetime import datetime, timedelta, UTC
 
-from jose import jwt, JWTError
 from fastapi import HTTPException, status
 
-from config import ALGORITHM, SECRET_KEY, ACCESS_TOKEN_EXPIRE_MINUTES
+from config import (
+    ALGORITHM,
+    SECRET_KEY,
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    STATELESS_TOKENS,
+)
+from observability.metrics import TOKEN_REJECTIONS
+from .jwt_engine import TokenError
+from .keys import KeySet, get_key_set
+from .revocation import RevocationList, revocation_list
+from .token_cache import VerifiedTokenCache, verified_tokens
+from .token_versions import TokenVersions, token_versions
 from .database.queries import UserObjects
 from .database.models import User
+from .database.schemas import TokenPrincipal
+
+logger = logging.getLogger(__name__)
+
+PRINCIPAL_CLAIMS = ("uid", "act", "su", "ver")
 
 
 class JWTStrategy:
@@ -15,39 +32,107 @@ class JWTStrategy:
         secret: str = SECRET_KEY,
         algorithm: Optional[str] = ALGORITHM,
         life_time: Optional[int] = ACCESS_TOKEN_EXPIRE_MINUTES,
+        stateless: bool = STATELESS_TOKENS,
+        keys: Optional[KeySet] = None,
+        token_cache: Optional[VerifiedTokenCache] = None,
+        revocations: RevocationList = revocation_list,
+        versions: TokenVersions = token_versions,
     ):
         self.secret = secret
         self.algorithm = algorithm
         self.life_time = life_time
+        self.stateless = stateless
+        if keys is None and secret == SECRET_KEY and algorithm == ALGORITHM:
+            keys = get_key_set()
+            token_cache = token_cache or verified_tokens
+        self.keys = keys or KeySet.from_secret(secret, algorithm)
+        self.token_cache = token_cache or VerifiedTokenCache()
+        self._generation = self.keys.generation
+        self.revocations = revocations
+        self.versions = versions
+
+    def verify(self, token: Optional[str]) -> dict:
+        if not isinstance(token, str):
+            raise TokenError("Malformed token")
+        self.keys.maybe_reload()
+        if self.keys.generation != self._generation:
+            self._generation = self.keys.generation
+            self.token_cache.clear()
+        claims = self.token_cache.get(token)
+        if claims is None:
+            key = self.keys.verification_key(token)
+            claims = key.engine.decode(token)
+            self.token_cache.put(token, claims, key.not_after)
+        return claims
 
     async def read_token(
         self, 
         token: Optional[str], 
-        users: UserObjects
-    ) -> User | None:
+        users: UserObjects,
+        load_user: bool = False,
+    ) -> User | TokenPrincipal | None:
         try:
-            data = jwt.decode(
-                token=token, 
-                key=self.secret, 
-                algorithms=[self.algorithm],
-            )
+            data = self.verify(token)
             username = data.get("sub")
-        except JWTError as error:
-            print(error)
+        except TokenError as error:
+            logger.info("rejected access token: %s", error)
+            TOKEN_REJECTIONS.labels("invalid").inc()
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+        if "jti" in data and await self.revocations.is_revoked(data["jti"], data["exp"]):
+            TOKEN_REJECTIONS.labels("revoked").inc()
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+        if "uid" in data and "ver" in data and await self.versions.is_stale(
+            data["uid"], data["ver"]
+        ):
+            TOKEN_REJECTIONS.labels("version").inc()
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+        if self.stateless and not load_user and all(
+            claim in data for claim in PRINCIPAL_CLAIMS
+        ):
+            return TokenPrincipal(
+                id=data["uid"],
+                username=username,
+                is_active=data["act"],
+                is_superuser=data["su"],
+                token_version=data["ver"],
+            )
+        user = await users.get(username=username)
+        if user is not None and data.get("ver", user.token_version) < user.token_version:
+            TOKEN_REJECTIONS.labels("version").inc()
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
-        return await users.get(username=username)
+        return user
 
-    async def write_token(self, user: User) -> str:
+    def write_token(self, user: User) -> str:
         to_encode = {
             "sub": user.username,
             "exp": datetime.now(tz=UTC) + timedelta(minutes=self.life_time),
+            "jti": uuid.uuid4().hex,
+            "uid": user.id,
+            "ver": user.token_version,
         }
-        encoded_jwt = jwt.encode(
-            to_encode, 
-            key=self.secret, 
-            algorithm=self.algorithm,
-        )
+        if self.stateless:
+            to_encode.update(act=user.is_active, su=user.is_superuser)
+        encoded_jwt = self.keys.encode(to_encode)
         return f"Bearer {encoded_jwt}"
 
+    async def revoke_token(self, token: Optional[str]) -> None:
+        try:
+            data = self.verify(token)
+        except TokenError:
+            return
+        if "jti" in data:
+            await self.revocations.revoke(data["jti"], data["exp"], data.get("uid"))
+        self.token_cache.discard(token)
+
     async def destroy_token(self):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+
+
+_jwt_strategy: Optional[JWTStrategy] = None
+
+
+def get_jwt_strategy() -> JWTStrategy:
+    global _jwt_strategy
+    if _jwt_strategy is None:
+        _jwt_strategy = JWTStrategy()
+    return _jwt_strategy
@@ -0,0 +1,340 @@
+"""Signing keys for access tokens.
+
+Without ``JWT_KEYS_DIR`` tokens are signed with ``SECRET_KEY``/``ALGORITHM``
+as before. With it, keys live in that directory as ``<kid>.pem`` files listed
+in ``keys.json``; each key has a ``not_before`` (when it starts signing) and an
+optional ``not_after`` (when tokens signed with it stop verifying). Public
+halves are published as a JWKS so other services can verify tokens offline.
+
+Rotate with::
+
+    python -m auth.keys rotate --algorithm ES256
+
+which schedules a new key to start signing after edge caches have seen it in
+the JWKS and retires the previous keys once their tokens have expired.
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, UTC
+from typing import Optional
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+from config import (
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    ALGORITHM,
+    JWKS_MAX_AGE,
+    JWT_KEYS_DIR,
+    JWT_KEYS_RELOAD_INTERVAL,
+    SECRET_KEY,
+)
+from .jwt_engine import (
+    EC_CURVES,
+    HMAC_DIGESTS,
+    JWTEngine,
+    TokenError,
+    b64decode,
+    get_jwt_engine,
+    load_key,
+)
+
+MANIFEST = "keys.json"
+JWK_CURVES = {"secp256r1": "P-256", "secp384r1": "P-384", "secp521r1": "P-521"}
+
+
+def jwk_int(value: int, size: Optional[int] = None) -> str:
+    data = value.to_bytes(size or (value.bit_length() + 7) // 8, "big")
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def public_jwk(pem: bytes, kid: str, algorithm: str) -> dict:
+    key = load_key(pem, private=False)
+    jwk = {"kid": kid, "alg": algorithm, "use": "sig"}
+    if isinstance(key, rsa.RSAPublicKey):
+        numbers = key.public_numbers()
+        jwk.update(kty="RSA", n=jwk_int(numbers.n), e=jwk_int(numbers.e))
+    elif isinstance(key, ec.EllipticCurvePublicKey):
+        numbers = key.public_numbers()
+        size = (key.curve.key_size + 7) // 8
+        jwk.update(
+            kty="EC",
+            crv=JWK_CURVES[key.curve.name],
+            x=jwk_int(numbers.x, size),
+            y=jwk_int(numbers.y, size),
+        )
+    elif isinstance(key, ed25519.Ed25519PublicKey):
+        raw = key.public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+        jwk.update(kty="OKP", crv="Ed25519", x=base64.urlsafe_b64encode(raw).rstrip(b"=").decode())
+    else:
+        raise TokenError(f"Cannot publish a {type(key).__name__}")
+    return jwk
+
+
+def generate_private_key(algorithm: str) -> bytes:
+    if algorithm[:2] in ("RS", "PS"):
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    elif algorithm in EC_CURVES:
+        key = ec.generate_private_key(EC_CURVES[algorithm]())
+    elif algorithm == "EdDSA":
+        key = ed25519.Ed25519PrivateKey.generate()
+    else:
+        raise TokenError(f"Cannot generate a key for {algorithm}")
+    return key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+
+
+@dataclass
+class SigningKey:
+    kid: Optional[str]
+    algorithm: str
+    key: str | bytes
+    not_before: datetime
+    not_after: Optional[datetime] = None
+    engine: JWTEngine = field(init=False)
+
+    def __post_init__(self):
+        self.engine = get_jwt_engine(self.key, self.algorithm, kid=self.kid)
+
+    @property
+    def public(self) -> bool:
+        return self.algorithm not in HMAC_DIGESTS
+
+    def signs_at(self, now: datetime) -> bool:
+        return self.not_before <= now and not self.retired_at(now)
+
+    def retired_at(self, now: datetime) -> bool:
+        return self.not_after is not None and self.not_after <= now
+
+
+class KeySet:
+    def __init__(
+        self,
+        keys: list[SigningKey],
+        directory: Optional[str] = None,
+        reload_interval: float = JWT_KEYS_RELOAD_INTERVAL,
+    ):
+        self.directory = directory
+        self.reload_interval = reload_interval
+        self.generation = 0
+        self._stamp = self._manifest_stamp()
+        self._next_check = time.monotonic() + reload_interval
+        self._install(keys)
+
+    @classmethod
+    def from_secret(cls, secret: str = SECRET_KEY, algorithm: str = ALGORITHM) -> "KeySet":
+        return cls([SigningKey(None, algorithm, secret, datetime.min.replace(tzinfo=UTC))])
+
+    @classmethod
+    def from_directory(cls, directory: str, **options) -> "KeySet":
+        return cls(read_manifest(directory), directory, **options)
+
+    def _install(self, keys: list[SigningKey]) -> None:
+        self.keys = sorted(keys, key=lambda key: key.not_before, reverse=True)
+        self._by_kid = {key.kid: key for key in self.keys}
+        self._by_header = {key.engine.header_segment: key for key in self.keys}
+        self._jwks = None
+
+    def _manifest_stamp(self) -> Optional[int]:
+        if self.directory is None:
+            return None
+        try:
+            return os.stat(os.path.join(self.directory, MANIFEST)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def maybe_reload(self) -> None:
+        if self.directory is None or time.monotonic() < self._next_check:
+            return
+        self._next_check = time.monotonic() + self.reload_interval
+        stamp = self._manifest_stamp()
+        if stamp != self._stamp:
+            self._stamp = stamp
+            self._install(read_manifest(self.directory))
+            self.generation += 1
+
+    def signing_key(self, now: Optional[datetime] = None) -> SigningKey:
+        self.maybe_reload()
+        now = now or datetime.now(tz=UTC)
+        for key in self.keys:
+            if key.signs_at(now):
+                return key
+        raise TokenError("No active signing key")
+
+    def verification_key(self, token: str, now: Optional[datetime] = None) -> SigningKey:
+        self.maybe_reload()
+        header = token.split(".", 1)[0].encode() if isinstance(token, str) else b""
+        key = self._by_header.get(header)
+        if key is None:
+            key = self._by_kid.get(read_kid(header))
+        if key is None:
+            raise TokenError("Unknown signing key")
+        if key.retired_at(now or datetime.now(tz=UTC)):
+            raise TokenError("Signing key has been retired")
+        return key
+
+    def encode(self, claims: dict) -> str:
+        return self.signing_key().engine.encode(claims)
+
+    def decode(self, token: str) -> dict:
+        return self.verification_key(token).engine.decode(token)
+
+    def jwks(self) -> tuple[bytes, str]:
+        """The JWKS document and its ETag, rebuilt only when the keys change."""
+        self.maybe_reload()
+        now = datetime.now(tz=UTC)
+        if self._jwks is None or self._jwks_until <= now:
+            published = [
+                key for key in self.keys if key.public and not key.retired_at(now)
+            ]
+            document = {
+                "keys": [
+                    public_jwk(key.key, key.kid, key.algorithm) for key in published
+                ]
+            }
+            body = json.dumps(document, separators=(",", ":"), sort_keys=True).encode()
+            self._jwks = body, f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+            self._jwks_until = min(
+                (key.not_after for key in published if key.not_after is not None),
+                default=datetime.max.replace(tzinfo=UTC),
+            )
+        return self._jwks
+
+
+def read_kid(header: bytes) -> Optional[str]:
+    try:
+        parsed = json.loads(b64decode(header))
+    except (TokenError, ValueError):
+        return None
+    return parsed.get("kid") if isinstance(parsed, dict) else None
+
+
+def parse_time(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def read_manifest(directory: str) -> list[SigningKey]:
+    with open(os.path.join(directory, MANIFEST)) as file:
+        entries = json.load(file)["keys"]
+    keys = []
+    for entry in entries:
+        with open(os.path.join(directory, entry["file"]), "rb") as file:
+            pem = file.read()
+        keys.append(
+            SigningKey(
+                kid=entry["kid"],
+                algorithm=entry["algorithm"],
+                key=pem,
+                not_before=parse_time(entry["not_before"]),
+                not_after=parse_time(entry.get("not_after")),
+            )
+        )
+    return keys
+
+
+def write_manifest(directory: str, entries: list[dict]) -> None:
+    path = os.path.join(directory, MANIFEST)
+    with open(path + ".tmp", "w") as file:
+        json.dump({"keys": entries}, file, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def rotate(
+    directory: str,
+    algorithm: str,
+    activate_in: timedelta,
+    overlap: timedelta,
+) -> dict:
+    """Add a key that signs from ``now + activate_in`` and retire older keys.
+
+    Older keys stop signing when the new one activates and stop verifying
+    ``overlap`` later, which must cover the access token lifetime.
+    """
+    os.makedirs(directory, exist_ok=True)
+    try:
+        with open(os.path.join(directory, MANIFEST)) as file:
+            entries = json.load(file)["keys"]
+    except FileNotFoundError:
+        entries = []
+    now = datetime.now(tz=UTC)
+    kid = uuid.uuid4().hex[:16]
+    filename = f"{kid}.pem"
+    fd = os.open(os.path.join(directory, filename), os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as file:
+        file.write(generate_private_key(algorithm))
+    not_before = now + activate_in if entries else now
+    retire_at = not_before + overlap
+    kept = []
+    for entry in entries:
+        not_after = parse_time(entry.get("not_after"))
+        if not_after is not None and not_after <= now:
+            os.remove(os.path.join(directory, entry["file"]))
+            continue
+        if not_after is None or not_after > retire_at:
+            entry["not_after"] = retire_at.isoformat()
+        kept.append(entry)
+    new_entry = {
+        "kid": kid,
+        "algorithm": algorithm,
+        "file": filename,
+        "not_before": not_before.isoformat(),
+        "not_after": None,
+    }
+    write_manifest(directory, [new_entry, *kept])
+    return new_entry
+
+
+_key_set: Optional[KeySet] = None
+
+
+def get_key_set() -> KeySet:
+    global _key_set
+    if _key_set is None:
+        if JWT_KEYS_DIR:
+            _key_set = KeySet.from_directory(JWT_KEYS_DIR)
+        else:
+            _key_set = KeySet.from_secret()
+    return _key_set
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    rotate_parser = subparsers.add_parser("rotate")
+    rotate_parser.add_argument("--directory", default=JWT_KEYS_DIR, required=not JWT_KEYS_DIR)
+    rotate_parser.add_argument("--algorithm", default="ES256")
+    rotate_parser.add_argument(
+        "--activate-in",
+        type=float,
+        default=2 * JWKS_MAX_AGE,
+        help="seconds before the new key signs; longer than the JWKS max-age",
+    )
+    rotate_parser.add_argument(
+        "--overlap",
+        type=float,
+        default=ACCESS_TOKEN_EXPIRE_MINUTES * 60 + JWKS_MAX_AGE,
+        help="seconds old keys keep verifying after the new key activates",
+    )
+    list_parser = subparsers.add_parser("list")
+    list_parser.add_argument("--directory", default=JWT_KEYS_DIR, required=not JWT_KEYS_DIR)
+    args = parser.parse_args()
+    if args.command == "rotate":
+        entry = rotate(
+            args.directory,
+            args.algorithm,
+            timedelta(seconds=args.activate_in),
+            timedelta(seconds=args.overlap),
+        )
+        print(json.dumps(entry, indent=2))
+    else:
+        for key in read_manifest(args.directory):
+            print(key.kid, key.algorithm, key.not_before, key.not_after)
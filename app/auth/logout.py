@@ -0,0 +1,145 @@
+"""Log users out everywhere.
+
+``log_out_users`` revokes every refresh session of a batch of users (one
+DELETE on ``tokensession.user_id``) and bumps their token versions in the
+same transaction. That rejects their outstanding access tokens at once in
+this worker, and in the others within ``REVOCATION_SYNC_INTERVAL`` seconds
+(see ``auth.token_versions``). ``LogoutJobs`` runs it over large sets of
+users in the background, ``LOGOUT_BATCH_SIZE`` users at a time, and keeps
+each job's progress in the cache backend; with the memory backend only the
+worker running a job can report it.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from typing import AsyncIterator, Optional, Sequence
+
+from auth.database.models import User
+from auth.database.queries import UserObjects, get_session_store
+from auth.token_versions import TokenVersions, token_versions
+from cache import MISSING, CacheError, get_cache_backend
+from config import LOGOUT_BATCH_PAUSE, LOGOUT_BATCH_SIZE, LOGOUT_JOB_TTL
+from database.connection import async_session
+
+logger = logging.getLogger(__name__)
+
+
+async def log_out_users(
+    user_ids: Sequence[int],
+    session_factory=async_session,
+    versions: TokenVersions = token_versions,
+) -> int:
+    """Revoke all sessions and access tokens of ``user_ids``; return the sessions revoked."""
+    async with session_factory() as session:
+        users = UserObjects(session)
+        async with users.transaction():
+            bumped = await users.bump_token_versions(user_ids)
+            revoked = await get_session_store(session).revoke_users(user_ids)
+    await versions.announce(bumped)
+    return revoked
+
+
+@dataclass
+class LogoutJob:
+    id: str
+    total: Optional[int]
+    users: int = 0
+    sessions: int = 0
+    state: str = "running"
+    error: Optional[str] = None
+    started_at: float = 0.0
+    updated_at: float = 0.0
+
+
+class LogoutJobs:
+    def __init__(
+        self,
+        backend=get_cache_backend,
+        batch_size: int = LOGOUT_BATCH_SIZE,
+        pause: float = LOGOUT_BATCH_PAUSE,
+        ttl: float = LOGOUT_JOB_TTL,
+    ):
+        self._backend = backend
+        self.batch_size = batch_size
+        self.pause = pause
+        self.ttl = ttl
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def backend(self):
+        return self._backend() if callable(self._backend) else self._backend
+
+    async def start(self, user_ids: Optional[Sequence[int]] = None) -> LogoutJob:
+        """Log out ``user_ids``, or every user when it is None."""
+        now = time.time()
+        job = LogoutJob(
+            id=uuid.uuid4().hex,
+            total=None if user_ids is None else len(user_ids),
+            started_at=now,
+            updated_at=now,
+        )
+        await self._save(job)
+        task = asyncio.create_task(self._run(job, user_ids))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def get(self, job_id: str) -> Optional[LogoutJob]:
+        data = await self.backend.get(f"logout-job:{job_id}")
+        return None if data is MISSING else LogoutJob(**data)
+
+    async def _run(self, job: LogoutJob, user_ids: Optional[Sequence[int]]) -> None:
+        try:
+            async for batch in self._batches(user_ids):
+                job.sessions += await log_out_users(batch)
+                job.users += len(batch)
+                await self._save(job)
+                await asyncio.sleep(self.pause)
+            job.state = "done"
+        except asyncio.CancelledError:
+            job.state = "cancelled"
+            raise
+        except Exception as error:
+            job.state = "failed"
+            job.error = str(error)
+            logger.exception("logout job %s failed after %d users", job.id, job.users)
+        finally:
+            await self._save(job)
+        logger.info(
+            "logout job %s logged out %d users, %d sessions", job.id, job.users, job.sessions
+        )
+
+    async def _batches(self, user_ids: Optional[Sequence[int]]) -> AsyncIterator[list[int]]:
+        if user_ids is not None:
+            for start in range(0, len(user_ids), self.batch_size):
+                yield list(user_ids[start:start + self.batch_size])
+            return
+        after = None
+        while True:
+            async with async_session() as session:
+                rows = await UserObjects(session).get_page_rows(
+                    (User.id,), after=after, limit=self.batch_size
+                )
+            if rows:
+                yield [row["id"] for row in rows]
+            if len(rows) < self.batch_size:
+                return
+            after = rows[-1]["id"]
+
+    async def _save(self, job: LogoutJob) -> None:
+        job.updated_at = time.time()
+        try:
+            await self.backend.set(f"logout-job:{job.id}", asdict(job), self.ttl)
+        except CacheError as error:
+            logger.warning("could not record progress of logout job %s: %s", job.id, error)
+
+    async def stop(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.wait(self._tasks)
+
+
+logout_jobs = LogoutJobs()
@@ -0,0 +1,172 @@
+import asyncio
+import fcntl
+import logging
+import os
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from auth.database.queries import RevokedTokenObjects, TokenSessionObjects
+from config import (
+    MAX_SESSIONS_PER_USER,
+    SESSION_SWEEP_BATCH_SIZE,
+    SESSION_SWEEP_INTERVAL,
+    SESSION_SWEEP_JITTER,
+    SESSION_SWEEP_LOCK_PATH,
+)
+from database.connection import async_session
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SweeperMetrics:
+    sweeps: int = 0
+    purged: int = 0
+    evicted: int = 0
+    revocations_purged: int = 0
+    failures: int = 0
+    last_duration: float = 0.0
+    total_duration: float = 0.0
+
+    def record(
+        self, purged: int, evicted: int, revocations_purged: int, duration: float
+    ) -> None:
+        self.sweeps += 1
+        self.purged += purged
+        self.evicted += evicted
+        self.revocations_purged += revocations_purged
+        self.last_duration = duration
+        self.total_duration += duration
+
+    def snapshot(self) -> dict:
+        return vars(self).copy()
+
+
+class SweeperLock:
+    """Non-blocking ``flock`` so only one worker on the host sweeps.
+
+    The lock is held for the life of the process and released by the OS when
+    the worker exits, letting another worker take over on its next tick.
+    """
+
+    def __init__(self, path: str = SESSION_SWEEP_LOCK_PATH):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self) -> bool:
+        if self._fd is not None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+class TokenSessionSweeper:
+    def __init__(
+        self,
+        session_factory=async_session,
+        lock: Optional[SweeperLock] = None,
+        interval: float = SESSION_SWEEP_INTERVAL,
+        batch_size: int = SESSION_SWEEP_BATCH_SIZE,
+        jitter: float = SESSION_SWEEP_JITTER,
+        max_sessions_per_user: int = MAX_SESSIONS_PER_USER,
+    ):
+        self.session_factory = session_factory
+        self.lock = lock or SweeperLock()
+        self.interval = interval
+        self.batch_size = batch_size
+        self.jitter = jitter
+        self.max_sessions_per_user = max_sessions_per_user
+        self.metrics = SweeperMetrics()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.lock.release()
+
+    async def run(self) -> None:
+        await asyncio.sleep(random.uniform(0, self.jitter))
+        while True:
+            if self.lock.acquire():
+                try:
+                    await self.sweep()
+                except Exception:
+                    self.metrics.failures += 1
+                    logger.exception("token session sweep failed")
+            await asyncio.sleep(self.interval + random.uniform(0, self.jitter))
+
+    async def sweep(self) -> None:
+        start = time.perf_counter()
+        purged = await self.purge_expired()
+        evicted = await self.enforce_session_cap()
+        revocations_purged = await self.purge_expired(RevokedTokenObjects)
+        self.metrics.record(
+            purged, evicted, revocations_purged, time.perf_counter() - start
+        )
+        if purged or evicted:
+            logger.info(
+                "purged %d expired and evicted %d surplus sessions", purged, evicted
+            )
+
+    async def purge_expired(self, objects=TokenSessionObjects) -> int:
+        purged = 0
+        now = datetime.now()
+        while True:
+            async with self.session_factory() as session:
+                rows = objects(session)
+                ids = await rows.expired_ids(now, self.batch_size)
+                if ids:
+                    purged += await rows.delete_many(ids)
+            if len(ids) < self.batch_size:
+                return purged
+            await self._pause()
+
+    async def enforce_session_cap(self) -> int:
+        if self.max_sessions_per_user <= 0:
+            return 0
+        evicted = 0
+        while True:
+            async with self.session_factory() as session:
+                sessions = TokenSessionObjects(session)
+                user_ids = await sessions.users_over_cap(
+                    self.max_sessions_per_user, self.batch_size
+                )
+                for user_id in user_ids:
+                    ids = await sessions.overflow_ids(
+                        user_id, self.max_sessions_per_user
+                    )
+                    evicted += await sessions.delete_many(ids)
+            if len(user_ids) < self.batch_size:
+                return evicted
+            await self._pause()
+
+    async def _pause(self) -> None:
+        await asyncio.sleep(random.uniform(0, self.jitter))
@@ -0,0 +1,267 @@
+"""Rate limits and progressive lockout for the credential endpoints.
+
+Per-IP limits run in ``RateLimitMiddleware`` before the request body is read;
+per-username limits run as a dependency once the form is parsed but before
+any password is hashed. ``RATE_LIMIT_BACKEND=memory`` keeps token buckets in
+each worker, ``shared`` keeps sliding-window counters in the cache backend so
+all workers draw from the same budget.
+"""
+import hashlib
+import logging
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from fastapi import HTTPException, Request, status
+from fastapi.responses import JSONResponse
+
+from cache import MISSING, CacheBackend, CacheError, get_cache_backend
+from config import (
+    LOCKOUT_BASE_SECONDS,
+    LOCKOUT_MAX_SECONDS,
+    LOCKOUT_THRESHOLD,
+    LOCKOUT_WINDOW,
+    RATE_LIMIT_BACKEND,
+    RATE_LIMIT_ENABLED,
+    RATE_LIMIT_MAX_KEYS,
+    RATE_LIMIT_SIGN_IN_PER_IP,
+    RATE_LIMIT_SIGN_IN_PER_IP_USERNAME,
+    RATE_LIMIT_SIGN_IN_PER_USERNAME,
+    RATE_LIMIT_SIGN_UP_PER_IP,
+    RATE_LIMIT_TRUST_FORWARDED,
+    RATE_LIMIT_WINDOW,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Rule:
+    name: str
+    limit: int
+    period: float
+
+
+@dataclass
+class Decision:
+    allowed: bool
+    retry_after: float = 0.0
+
+
+SIGN_IN_PER_IP = Rule("sign-in:ip", RATE_LIMIT_SIGN_IN_PER_IP, RATE_LIMIT_WINDOW)
+SIGN_IN_PER_USERNAME = Rule("sign-in:user", RATE_LIMIT_SIGN_IN_PER_USERNAME, RATE_LIMIT_WINDOW)
+SIGN_IN_PER_IP_USERNAME = Rule("sign-in:ip-user", RATE_LIMIT_SIGN_IN_PER_IP_USERNAME, RATE_LIMIT_WINDOW)
+SIGN_UP_PER_IP = Rule("sign-up:ip", RATE_LIMIT_SIGN_UP_PER_IP, RATE_LIMIT_WINDOW)
+
+
+def limiter_key(rule: Rule, *parts: str) -> str:
+    digest = hashlib.blake2b("\0".join(parts).encode(), digest_size=12).hexdigest()
+    return f"rl:{rule.name}:{digest}"
+
+
+def retry_after_header(seconds: float) -> dict:
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
+
+
+class RateLimiter(ABC):
+    @abstractmethod
+    async def hit(self, key: str, rule: Rule) -> Decision: ...
+
+
+class TokenBucketLimiter(RateLimiter):
+    """Per-worker token buckets, LRU-bounded so random keys cannot grow it."""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def hit(self, key: str, rule: Rule) -> Decision:
+        now = time.monotonic()
+        rate = rule.limit / rule.period
+        tokens, updated = self._buckets.pop(key, (float(rule.limit), now))
+        tokens = min(rule.limit, tokens + (now - updated) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return Decision(allowed, 0.0 if allowed else (1 - tokens) / rate)
+
+
+class SlidingWindowLimiter(RateLimiter):
+    """Sliding-window counters in the shared cache backend.
+
+    The estimate weights the previous fixed window by how much of it still
+    overlaps the sliding one; a backend failure lets the request through.
+    """
+
+    def __init__(
+        self,
+        backend: CacheBackend | Callable[[], CacheBackend] = get_cache_backend,
+    ):
+        self._backend = backend
+
+    @property
+    def backend(self) -> CacheBackend:
+        return self._backend() if callable(self._backend) else self._backend
+
+    async def hit(self, key: str, rule: Rule) -> Decision:
+        now = time.time()
+        window = int(now // rule.period)
+        elapsed = now / rule.period - window
+        try:
+            current = await self.backend.incr(f"{key}:{window}", ttl=2 * rule.period)
+            previous = await self.backend.get(f"{key}:{window - 1}")
+        except CacheError:
+            logger.warning("rate limiter backend unavailable, allowing request")
+            return Decision(True)
+        previous = 0 if previous is MISSING else int(previous)
+        estimate = previous * (1 - elapsed) + current
+        if estimate <= rule.limit:
+            return Decision(True)
+        if previous and current <= rule.limit:
+            retry_after = ((estimate - rule.limit) / previous) * rule.period
+        else:
+            retry_after = (1 - elapsed) * rule.period
+        return Decision(False, retry_after)
+
+
+class LoginLockout:
+    """Progressive per-account lockout kept in the cache backend.
+
+    After ``threshold`` failures within ``window`` seconds every further
+    failure locks the account for twice as long, up to ``max_seconds``.
+    """
+
+    def __init__(
+        self,
+        backend: CacheBackend | Callable[[], CacheBackend] = get_cache_backend,
+        threshold: int = LOCKOUT_THRESHOLD,
+        window: float = LOCKOUT_WINDOW,
+        base_seconds: float = LOCKOUT_BASE_SECONDS,
+        max_seconds: float = LOCKOUT_MAX_SECONDS,
+    ):
+        self._backend = backend
+        self.threshold = threshold
+        self.window = window
+        self.base_seconds = base_seconds
+        self.max_seconds = max_seconds
+
+    @property
+    def backend(self) -> CacheBackend:
+        return self._backend() if callable(self._backend) else self._backend
+
+    def _keys(self, username: str) -> tuple[str, str]:
+        digest = hashlib.blake2b(username.encode(), digest_size=12).hexdigest()
+        return f"lockout:failures:{digest}", f"lockout:until:{digest}"
+
+    async def retry_after(self, username: str) -> float:
+        if self.threshold <= 0:
+            return 0.0
+        try:
+            until = await self.backend.get(self._keys(username)[1])
+        except CacheError:
+            return 0.0
+        return 0.0 if until is MISSING else max(0.0, until - time.time())
+
+    async def record_failure(self, username: str) -> None:
+        if self.threshold <= 0:
+            return
+        failures_key, until_key = self._keys(username)
+        try:
+            failures = await self.backend.incr(failures_key, ttl=self.window)
+            if failures >= self.threshold:
+                duration = min(
+                    self.max_seconds,
+                    self.base_seconds * 2 ** (failures - self.threshold),
+                )
+                await self.backend.set(until_key, time.time() + duration, ttl=duration)
+        except CacheError:
+            logger.warning("lockout backend unavailable, failure not recorded")
+
+    async def reset(self, username: str) -> None:
+        if self.threshold <= 0:
+            return
+        try:
+            await self.backend.delete(*self._keys(username))
+        except CacheError:
+            pass
+
+
+_rate_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    global _rate_limiter
+    if _rate_limiter is None:
+        if RATE_LIMIT_BACKEND == "shared":
+            _rate_limiter = SlidingWindowLimiter()
+        else:
+            _rate_limiter = TokenBucketLimiter()
+    return _rate_limiter
+
+
+login_lockout = LoginLockout()
+
+
+def client_ip(scope: dict) -> str:
+    if RATE_LIMIT_TRUST_FORWARDED:
+        for name, value in scope.get("headers", ()):
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class RateLimitMiddleware:
+    """Reject over-limit credential requests before their body is read."""
+
+    def __init__(self, app, rules: Optional[dict[str, Rule]] = None, limiter=None):
+        self.app = app
+        self.rules = rules if rules is not None else {
+            "/api/auth/sign-in": SIGN_IN_PER_IP,
+            "/api/auth/sign-up": SIGN_UP_PER_IP,
+        }
+        self._limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if (
+            RATE_LIMIT_ENABLED
+            and scope["type"] == "http"
+            and scope["method"] == "POST"
+            and scope["path"] in self.rules
+        ):
+            rule = self.rules[scope["path"]]
+            limiter = self._limiter or get_rate_limiter()
+            decision = await limiter.hit(limiter_key(rule, client_ip(scope)), rule)
+            if not decision.allowed:
+                response = JSONResponse(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    content={"detail": "Too many requests"},
+                    headers=retry_after_header(decision.retry_after),
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+async def enforce_username_limits(request: Request, username: str) -> None:
+    if not RATE_LIMIT_ENABLED:
+        return
+    limiter = get_rate_limiter()
+    ip = client_ip(request.scope)
+    for rule, parts in (
+        (SIGN_IN_PER_USERNAME, (username,)),
+        (SIGN_IN_PER_IP_USERNAME, (ip, username)),
+    ):
+        decision = await limiter.hit(limiter_key(rule, *parts), rule)
+        if not decision.allowed:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests",
+                headers=retry_after_header(decision.retry_after),
+            )
@@ -0,0 +1,89 @@
+"""Rehash on sign-in.
+
+A sign-in is the only time the plaintext is at hand, so a password whose
+hash no longer matches ``PASSWORD_HASH_ALGORITHM`` and its cost settings is
+re-hashed right after a successful one. The work runs in a task with its own
+session once the response is on its way, and uses spare hasher capacity only:
+when the pool is full the upgrade is skipped until the next sign-in. The new
+hash is written only if the stored one is unchanged, so a password change in
+the meantime wins.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass
+
+from fastapi import HTTPException
+
+from auth.database.models import User
+from auth.database.queries import UserObjects
+from auth.hashing import PasswordHasher, password_hasher
+from config import PASSWORD_REHASH_ON_LOGIN
+from database.connection import async_session
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RehashMetrics:
+    scheduled: int = 0
+    upgraded: int = 0
+    conflicts: int = 0
+    skipped: int = 0
+    failures: int = 0
+
+    def snapshot(self) -> dict:
+        return vars(self).copy()
+
+
+class PasswordRehasher:
+    def __init__(
+        self,
+        hasher: PasswordHasher = password_hasher,
+        enabled: bool = PASSWORD_REHASH_ON_LOGIN,
+    ):
+        self.hasher = hasher
+        self.enabled = enabled
+        self.metrics = RehashMetrics()
+        self._pending: set[int] = set()
+        self._tasks: set[asyncio.Task] = set()
+
+    def schedule(self, user: User, password: str) -> None:
+        if (
+            not self.enabled
+            or user.id in self._pending
+            or not self.hasher.needs_rehash(user.password)
+        ):
+            return
+        self._pending.add(user.id)
+        self.metrics.scheduled += 1
+        row = user.model_dump(include={"id", "username", "email", "password"})
+        task = asyncio.create_task(self._rehash(row, password))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _rehash(self, user: dict, password: str) -> None:
+        try:
+            if self.hasher.metrics.in_flight >= self.hasher.workers:
+                self.metrics.skipped += 1
+                return
+            hashed = await self.hasher.hash(password)
+            async with async_session() as session:
+                replaced = await UserObjects(session).replace_password(user, hashed)
+            if replaced:
+                self.metrics.upgraded += 1
+            else:
+                self.metrics.conflicts += 1
+        except HTTPException:
+            self.metrics.skipped += 1
+        except Exception:
+            self.metrics.failures += 1
+            logger.exception("rehashing the password of user %s failed", user["id"])
+        finally:
+            self._pending.discard(user["id"])
+
+    async def drain(self, timeout: float = 5.0) -> None:
+        if self._tasks:
+            await asyncio.wait(self._tasks, timeout=timeout)
+
+
+password_rehasher = PasswordRehasher()
@@ -0,0 +1,270 @@
+"""Revoked access tokens.
+
+Revoked ``jti`` values are stored in the ``revokedtoken`` table, which is the
+exact set. Every worker keeps a compact index of them in memory: one group of
+Bloom filters per ``exp`` bucket, so a lookup touches a single bucket and a
+bucket is dropped wholesale once all of its tokens have expired. A miss in the
+index is final; a hit is confirmed against the table. New revocations reach
+the other workers over the cache backend's pub/sub when it is shared (Redis),
+and in any case through a poll of the table every ``REVOCATION_SYNC_INTERVAL``
+seconds, since the memory backend's pub/sub never leaves the worker.
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from cache import MISSING, TTLCache, get_cache_backend
+from config import (
+    REVOCATION_BLOOM_CAPACITY,
+    REVOCATION_BUCKET_SECONDS,
+    REVOCATION_FALSE_POSITIVE_RATE,
+    REVOCATION_SYNC_INTERVAL,
+)
+from database.connection import async_session
+from .database.queries import RevokedTokenObjects
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_CHANNEL = "auth:revocations"
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, item: bytes) -> list[int]:
+        digest = hashlib.blake2b(item, digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        size = self.size
+        return [(first + i * second) % size for i in range(self.hashes)]
+
+    def add(self, item: bytes, positions: Optional[list[int]] = None) -> None:
+        for position in positions or self.positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def contains(self, positions: list[int]) -> bool:
+        bits = self.bits
+        for position in positions:
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def __contains__(self, item: bytes) -> bool:
+        return self.contains(self.positions(item))
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.bits)
+
+
+class RevocationIndex:
+    """Bloom filters grouped by ``exp`` bucket; a full filter gets a sibling."""
+
+    def __init__(
+        self,
+        bucket_seconds: int = REVOCATION_BUCKET_SECONDS,
+        capacity: int = REVOCATION_BLOOM_CAPACITY,
+        error_rate: float = REVOCATION_FALSE_POSITIVE_RATE,
+    ):
+        self.bucket_seconds = bucket_seconds
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.buckets: dict[int, list[BloomFilter]] = {}
+
+    def __len__(self) -> int:
+        return sum(bloom.count for filters in self.buckets.values() for bloom in filters)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(bloom.nbytes for filters in self.buckets.values() for bloom in filters)
+
+    def add(self, jti: str, exp: float) -> None:
+        filters = self.buckets.setdefault(int(exp // self.bucket_seconds), [])
+        if not filters or filters[-1].count >= self.capacity:
+            filters.append(BloomFilter(self.capacity, self.error_rate))
+        filters[-1].add(jti.encode())
+
+    def might_contain(self, jti: str, exp: float) -> bool:
+        filters = self.buckets.get(int(exp // self.bucket_seconds))
+        if not filters:
+            return False
+        positions = filters[0].positions(jti.encode())
+        return any(bloom.contains(positions) for bloom in filters)
+
+    def prune(self, now: float) -> None:
+        current = int(now // self.bucket_seconds)
+        for bucket in [bucket for bucket in self.buckets if bucket < current]:
+            del self.buckets[bucket]
+
+
+@dataclass
+class RevocationMetrics:
+    revoked: int = 0
+    checks: int = 0
+    index_hits: int = 0
+    confirmed: int = 0
+    false_positives: int = 0
+    reloads: int = 0
+    syncs: int = 0
+    sync_failures: int = 0
+
+    def snapshot(self) -> dict:
+        return vars(self).copy()
+
+
+class RevocationList:
+    def __init__(
+        self,
+        session_factory=async_session,
+        backend=get_cache_backend,
+        index_factory=RevocationIndex,
+        page_size: int = 10_000,
+        sync_interval: float = REVOCATION_SYNC_INTERVAL,
+    ):
+        self.session_factory = session_factory
+        self._backend = backend
+        self.index_factory = index_factory
+        self.index = index_factory()
+        self.page_size = page_size
+        self.sync_interval = sync_interval
+        self.metrics = RevocationMetrics()
+        self._verdicts = TTLCache(maxsize=10_000, ttl=REVOCATION_BUCKET_SECONDS)
+        self._loading: Optional[RevocationIndex] = None
+        self._started = False
+        self._start_lock = asyncio.Lock()
+        self._next_prune = 0.0
+        self._task: Optional[asyncio.Task] = None
+        # Polls re-read rows after the highest id seen one poll earlier, so a
+        # revocation committed after a higher id was already read is not lost.
+        self._synced_id = 0
+        self._seen_id = 0
+
+    @property
+    def backend(self):
+        return self._backend() if callable(self._backend) else self._backend
+
+    async def start(self) -> None:
+        async with self._start_lock:
+            if self._started:
+                return
+            await self.backend.subscribe(REVOCATION_CHANNEL, self._on_message)
+            await self.reload()
+            if self.sync_interval > 0:
+                self._task = asyncio.create_task(self.run())
+            self._started = True
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync()
+            except Exception:
+                self.metrics.sync_failures += 1
+                logger.exception("revocation sync failed")
+
+    async def reload(self) -> None:
+        self._loading = index = self.index_factory()
+        try:
+            last_id = await self._load(0, index.add)
+        finally:
+            self._loading = None
+        self.index = index
+        self._verdicts.clear()
+        self._synced_id = self._seen_id = last_id
+        self.metrics.reloads += 1
+
+    async def sync(self) -> None:
+        """Add revocations made by other workers since the last poll."""
+        last_id = await self._load(self._synced_id, self._add)
+        self._synced_id, self._seen_id = self._seen_id, max(self._seen_id, last_id)
+        self.metrics.syncs += 1
+
+    async def _load(self, after: int, add) -> int:
+        now = datetime.now()
+        while True:
+            async with self.session_factory() as session:
+                rows = await RevokedTokenObjects(session).live_page(
+                    now, after, self.page_size
+                )
+            for after, jti, expires_at in rows:
+                add(jti, expires_at.timestamp())
+            if len(rows) < self.page_size:
+                return after
+
+    async def revoke(self, jti: str, exp: float, user_id: Optional[int] = None) -> None:
+        async with self.session_factory() as session:
+            await RevokedTokenObjects(session).revoke(
+                jti, datetime.fromtimestamp(exp), user_id
+            )
+        self._add(jti, exp)
+        self.metrics.revoked += 1
+        await self.backend.publish(REVOCATION_CHANNEL, f"{jti} {exp}")
+
+    async def is_revoked(self, jti: str, exp: float) -> bool:
+        if not self._started:
+            await self.start()
+        self.metrics.checks += 1
+        now = time.time()
+        if now >= self._next_prune:
+            self.index.prune(now)
+            self._next_prune = now + self.index.bucket_seconds
+        if not self.index.might_contain(jti, exp):
+            return False
+        self.metrics.index_hits += 1
+        revoked = self._verdicts.get(jti)
+        if revoked is MISSING:
+            async with self.session_factory() as session:
+                revoked = await RevokedTokenObjects(session).is_revoked(jti)
+            self._verdicts.set(jti, revoked, ttl=max(0.0, exp - now))
+        if revoked:
+            self.metrics.confirmed += 1
+        else:
+            self.metrics.false_positives += 1
+        return revoked
+
+    def _add(self, jti: str, exp: float) -> None:
+        for index in (self.index, self._loading):
+            if index is not None and not index.might_contain(jti, exp):
+                index.add(jti, exp)
+        self._verdicts.delete(jti)
+
+    def _on_message(self, message: Optional[str]) -> None:
+        if message is None:
+            asyncio.get_running_loop().create_task(self.reload())
+            return
+        try:
+            jti, exp = message.split()
+            self._add(jti, float(exp))
+        except ValueError:
+            logger.warning("ignoring malformed revocation message %r", message)
+
+    def snapshot(self) -> dict:
+        return {
+            **self.metrics.snapshot(),
+            "indexed": len(self.index),
+            "index_bytes": self.index.nbytes,
+            "buckets": len(self.index.buckets),
+        }
+
+
+revocation_list = RevocationList()
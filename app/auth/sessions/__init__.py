@@ -0,0 +1,28 @@
+"""Refresh-session storage.
+
+``TokenSessionObjects`` keeps sessions in the SQL ``tokensession`` table;
+``RedisSessionStore`` keeps them in a Redis-protocol server with native TTLs.
+``SESSION_STORE`` picks one, and ``python -m auth.sessions.migrate`` copies
+live sessions between them.
+"""
+from typing import Optional
+
+from config import SESSION_STORE_URL
+from .base import RefreshSession, RefreshSessionStore
+from .resp import RedisSessionStore
+
+_redis_store: Optional[RedisSessionStore] = None
+
+
+def get_redis_session_store() -> RedisSessionStore:
+    global _redis_store
+    if _redis_store is None:
+        _redis_store = RedisSessionStore(SESSION_STORE_URL)
+    return _redis_store
+
+
+async def close_session_store() -> None:
+    global _redis_store
+    if _redis_store is not None:
+        await _redis_store.close()
+        _redis_store = None
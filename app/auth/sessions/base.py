@@ -0,0 +1,59 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from typing import AsyncIterator, Optional, Sequence
+from uuid import UUID
+
+
+@dataclass
+class RefreshSession:
+    user_id: int
+    refresh_token: UUID
+    created_at: datetime
+    expires_at: datetime
+    previous_token: Optional[UUID] = None
+    rotated_at: Optional[datetime] = None
+
+
+class RefreshSessionStore(ABC):
+    @abstractmethod
+    async def open_session(
+        self,
+        user_id: int,
+        refresh_token: UUID,
+        created_at: datetime,
+        expires_at: datetime,
+    ) -> None:
+        ...
+
+    @abstractmethod
+    async def rotate(
+        self,
+        token: UUID,
+        new_token: UUID,
+        expires_at: datetime,
+    ) -> Optional[int]:
+        """Swap ``token`` for ``new_token`` if it is live; return its user id.
+
+        Of several concurrent rotations of one token exactly one succeeds.
+        """
+
+    @abstractmethod
+    async def find_rotated(self, previous_token: UUID) -> Optional[RefreshSession]:
+        """The session ``previous_token`` was last rotated into, if any."""
+
+    @abstractmethod
+    async def revoke(self, refresh_token: UUID) -> None:
+        ...
+
+    @abstractmethod
+    async def revoke_users(self, user_ids: Sequence[int]) -> int:
+        """Revoke every session of ``user_ids``; return how many there were."""
+
+    @abstractmethod
+    def export_sessions(self, batch_size: int) -> AsyncIterator[list[RefreshSession]]:
+        """Yield every live session, ``batch_size`` at a time."""
+
+    @abstractmethod
+    async def import_sessions(self, sessions: list[RefreshSession]) -> None:
+        """Store ``sessions`` as they are, replacing ones with the same token."""
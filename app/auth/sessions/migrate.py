@@ -0,0 +1,80 @@
+"""Copy live refresh sessions from one store to another.
+
+Run from the ``app`` directory::
+
+    python -m auth.sessions.migrate --from sql --to redis --url redis://host:6379/1
+
+Run it between stopping the workers on the old ``SESSION_STORE`` and
+starting them on the new one, so no token is rotated in the old store after
+it was copied; signed-in users then keep their sessions across the switch.
+Sessions are written keyed on their refresh token, so an interrupted run can
+be repeated. The source is left as it was.
+"""
+import argparse
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from auth.database.queries import TokenSessionObjects
+from config import SESSION_STORE_URL
+from database.connection import async_session, dispose_engine
+from .base import RefreshSessionStore
+from .resp import RedisSessionStore
+
+STORES = ("sql", "redis")
+
+
+@asynccontextmanager
+async def open_store(name: str, url: str) -> AsyncIterator[RefreshSessionStore]:
+    if name == "redis":
+        store = RedisSessionStore(url)
+        try:
+            yield store
+        finally:
+            await store.close()
+    else:
+        async with async_session() as session:
+            yield TokenSessionObjects(session)
+
+
+async def migrate(
+    source: str,
+    target: str,
+    url: str = SESSION_STORE_URL,
+    batch_size: int = 1000,
+    dry_run: bool = False,
+) -> int:
+    copied = 0
+    start = time.perf_counter()
+    async with open_store(source, url) as reader, open_store(target, url) as writer:
+        async for batch in reader.export_sessions(batch_size):
+            if not dry_run:
+                await writer.import_sessions(batch)
+            copied += len(batch)
+            print(f"{copied} sessions, {copied / (time.perf_counter() - start):.0f}/s")
+    return copied
+
+
+async def main(args) -> None:
+    try:
+        copied = await migrate(
+            args.source, args.target, args.url, args.batch_size, args.dry_run
+        )
+    finally:
+        await dispose_engine()
+    action = "would copy" if args.dry_run else "copied"
+    print(f"{action} {copied} live sessions from {args.source} to {args.target}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--from", dest="source", choices=STORES, required=True)
+    parser.add_argument("--to", dest="target", choices=STORES, required=True)
+    parser.add_argument("--url", default=SESSION_STORE_URL, help="Redis-protocol server")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    if args.source == args.target:
+        parser.error("--from and --to must differ")
+    asyncio.run(main(args))
@@ -0,0 +1,178 @@
+import asyncio
+import json
+import time
+from dataclasses import replace
+from datetime import datetime
+from typing import AsyncIterator, Optional, Sequence
+from uuid import UUID
+
+from cache.resp import RedisBackend
+from config import MAX_SESSIONS_PER_USER, SESSION_STORE_URL
+from .base import RefreshSession, RefreshSessionStore
+
+
+def encode_session(session: RefreshSession) -> str:
+    return json.dumps({
+        "user_id": session.user_id,
+        "refresh_token": str(session.refresh_token),
+        "created_at": session.created_at.isoformat(),
+        "expires_at": session.expires_at.isoformat(),
+        "previous_token": session.previous_token and str(session.previous_token),
+        "rotated_at": session.rotated_at and session.rotated_at.isoformat(),
+    })
+
+
+def decode_session(raw: bytes) -> RefreshSession:
+    data = json.loads(raw)
+    return RefreshSession(
+        user_id=data["user_id"],
+        refresh_token=UUID(data["refresh_token"]),
+        created_at=datetime.fromisoformat(data["created_at"]),
+        expires_at=datetime.fromisoformat(data["expires_at"]),
+        previous_token=data["previous_token"] and UUID(data["previous_token"]),
+        rotated_at=data["rotated_at"] and datetime.fromisoformat(data["rotated_at"]),
+    )
+
+
+def milliseconds_until(moment: datetime) -> int:
+    return max(1, int((moment - datetime.now()).total_seconds() * 1000))
+
+
+class RedisSessionStore(RefreshSessionStore):
+    """Refresh sessions in a Redis-protocol server, off the SQL primary.
+
+    ``refresh:<token>`` holds a session and expires with it, so nothing has
+    to sweep expired rows. ``rotated:<token>`` remembers the session a token
+    was last rotated into, for reuse detection, and ``user_sessions:<id>``
+    orders a user's tokens by expiry to enforce ``MAX_SESSIONS_PER_USER``.
+    Rotation hinges on GETDEL, which only one caller can win. The server
+    must persist its data (AOF or RDB); a restart that loses it signs
+    everyone out.
+    """
+
+    def __init__(
+        self,
+        url: str = SESSION_STORE_URL,
+        max_sessions_per_user: int = MAX_SESSIONS_PER_USER,
+    ):
+        self.backend = RedisBackend(url)
+        self.max_sessions_per_user = max_sessions_per_user
+
+    async def execute(self, *args):
+        return await self.backend.execute(*args)
+
+    async def open_session(
+        self,
+        user_id: int,
+        refresh_token: UUID,
+        created_at: datetime,
+        expires_at: datetime,
+    ) -> None:
+        session = RefreshSession(user_id, refresh_token, created_at, expires_at)
+        key = f"user_sessions:{user_id}"
+        *_, count = await asyncio.gather(
+            *self._store(session),
+            self.execute("ZREMRANGEBYSCORE", key, "-inf", time.time()),
+            self.execute("ZCARD", key),
+        )
+        if 0 < self.max_sessions_per_user < count:
+            popped = await self.execute("ZPOPMIN", key, count - self.max_sessions_per_user)
+            await self.execute("DEL", *(b"refresh:" + token for token in popped[::2]))
+
+    async def rotate(
+        self,
+        token: UUID,
+        new_token: UUID,
+        expires_at: datetime,
+    ) -> Optional[int]:
+        raw = await self.execute("GETDEL", f"refresh:{token}")
+        if raw is None:
+            return None
+        session = decode_session(raw)
+        now = datetime.now()
+        if session.expires_at <= now:
+            return None
+        rotated = replace(
+            session,
+            refresh_token=new_token,
+            previous_token=token,
+            rotated_at=now,
+            expires_at=expires_at,
+        )
+        commands = [
+            *self._store(rotated),
+            self.execute("ZREM", f"user_sessions:{session.user_id}", str(token)),
+        ]
+        if session.previous_token is not None:
+            commands.append(self.execute("DEL", f"rotated:{session.previous_token}"))
+        await asyncio.gather(*commands)
+        return session.user_id
+
+    async def find_rotated(self, previous_token: UUID) -> Optional[RefreshSession]:
+        raw = await self.execute("GET", f"rotated:{previous_token}")
+        return None if raw is None else decode_session(raw)
+
+    async def revoke(self, refresh_token: UUID) -> None:
+        raw = await self.execute("GETDEL", f"refresh:{refresh_token}")
+        if raw is None:
+            return
+        session = decode_session(raw)
+        commands = [
+            self.execute("ZREM", f"user_sessions:{session.user_id}", str(refresh_token)),
+        ]
+        if session.previous_token is not None:
+            commands.append(self.execute("DEL", f"rotated:{session.previous_token}"))
+        await asyncio.gather(*commands)
+
+    async def revoke_users(self, user_ids: Sequence[int]) -> int:
+        user_keys = [f"user_sessions:{user_id}" for user_id in user_ids]
+        if not user_keys:
+            return 0
+        tokens = await asyncio.gather(
+            *(self.execute("ZRANGE", key, 0, -1) for key in user_keys)
+        )
+        keys = [b"refresh:" + token for user_tokens in tokens for token in user_tokens]
+        revoked = await self.execute("DEL", *keys) if keys else 0
+        await self.execute("DEL", *user_keys)
+        return revoked
+
+    async def export_sessions(self, batch_size: int) -> AsyncIterator[list[RefreshSession]]:
+        cursor = b"0"
+        while True:
+            cursor, keys = await self.execute(
+                "SCAN", cursor, "MATCH", "refresh:*", "COUNT", batch_size
+            )
+            for start in range(0, len(keys), batch_size):
+                values = await self.execute("MGET", *keys[start:start + batch_size])
+                yield [decode_session(raw) for raw in values if raw is not None]
+            if cursor == b"0":
+                return
+
+    async def import_sessions(self, sessions: list[RefreshSession]) -> None:
+        now = datetime.now()
+        await asyncio.gather(*(
+            command
+            for session in sessions
+            if session.expires_at > now
+            for command in self._store(session)
+        ))
+
+    def _store(self, session: RefreshSession) -> list:
+        ttl = milliseconds_until(session.expires_at)
+        value = encode_session(session)
+        user_key = f"user_sessions:{session.user_id}"
+        commands = [
+            self.execute("SET", f"refresh:{session.refresh_token}", value, "PX", ttl),
+            self.execute(
+                "ZADD", user_key, session.expires_at.timestamp(), str(session.refresh_token)
+            ),
+            self.execute("PEXPIRE", user_key, ttl),
+        ]
+        if session.previous_token is not None:
+            commands.append(
+                self.execute("SET", f"rotated:{session.previous_token}", value, "PX", ttl)
+            )
+        return commands
+
+    async def close(self) -> None:
+        await self.backend.close()
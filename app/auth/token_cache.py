@@ -0,0 +1,61 @@
+import hashlib
+import time
+from datetime import datetime
+from typing import Optional
+
+from cache import MISSING, TTLCache
+from config import TOKEN_CACHE_MAX_ENTRIES
+
+
+class VerifiedTokenCache:
+    """Claims of access tokens that already passed signature and claim checks.
+
+    Entries are keyed by a digest of the token, live until the token's ``exp``
+    (or the signing key's retirement, if earlier) and are evicted LRU beyond
+    ``maxsize``. Only successful verifications are stored, so garbage tokens
+    cannot grow the cache; revocation checks run on every request after the
+    lookup.
+    """
+
+    def __init__(self, maxsize: int = TOKEN_CACHE_MAX_ENTRIES):
+        self.entries = TTLCache(maxsize=maxsize, ttl=0)
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        claims = self.entries.get(self.digest(token))
+        return None if claims is MISSING else claims
+
+    def put(
+        self,
+        token: str,
+        claims: dict,
+        not_after: Optional[datetime] = None,
+    ) -> None:
+        expires = claims.get("exp")
+        if not isinstance(expires, (int, float)):
+            return
+        if not_after is not None:
+            expires = min(expires, not_after.timestamp())
+        self.entries.set(self.digest(token), claims, ttl=expires - time.time())
+
+    def discard(self, token: str) -> None:
+        self.entries.delete(self.digest(token))
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+    def snapshot(self) -> dict:
+        stats = self.entries.stats.snapshot()
+        lookups = stats["hits"] + stats["misses"]
+        return {
+            **stats,
+            "size": len(self.entries),
+            "maxsize": self.entries.maxsize,
+            "hit_ratio": stats["hits"] / lookups if lookups else 0.0,
+        }
+
+
+verified_tokens = VerifiedTokenCache()
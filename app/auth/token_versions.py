@@ -0,0 +1,185 @@
+"""Per-user token versions.
+
+Bumping ``User.token_version`` invalidates every access token minted before
+it, since their ``ver`` claim is now behind. Stateless tokens are checked
+against an in-memory map of the users bumped within the last access-token
+lifetime, so the check costs no query. Older bumps need no entry: every token
+they invalidated has expired. The map is loaded from ``tokens_revoked_at``
+on start and kept current by polling that column every
+``REVOCATION_SYNC_INTERVAL`` seconds. A shared cache backend's pub/sub
+delivers bumps to the other workers sooner; the memory backend's does not
+leave the worker.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from cache import get_cache_backend
+from config import ACCESS_TOKEN_EXPIRE_MINUTES, REVOCATION_SYNC_INTERVAL
+from database.connection import async_session
+from .database.queries import UserObjects
+
+logger = logging.getLogger(__name__)
+
+TOKEN_VERSION_CHANNEL = "auth:token-versions"
+
+
+@dataclass
+class TokenVersionMetrics:
+    bumped: int = 0
+    checks: int = 0
+    stale: int = 0
+    reloads: int = 0
+    syncs: int = 0
+    sync_failures: int = 0
+
+    def snapshot(self) -> dict:
+        return vars(self).copy()
+
+
+class TokenVersions:
+    def __init__(
+        self,
+        session_factory=async_session,
+        backend=get_cache_backend,
+        life_time: float = ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        page_size: int = 10_000,
+        message_size: int = 1000,
+        sync_interval: float = REVOCATION_SYNC_INTERVAL,
+    ):
+        self.session_factory = session_factory
+        self._backend = backend
+        self.life_time = life_time
+        self.page_size = page_size
+        self.message_size = message_size
+        self.sync_interval = sync_interval
+        self.metrics = TokenVersionMetrics()
+        # user id -> (current version, when the entry can be forgotten)
+        self.versions: dict[int, tuple[int, float]] = {}
+        self._started = False
+        self._start_lock = asyncio.Lock()
+        self._next_prune = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._synced_at: Optional[datetime] = None
+
+    @property
+    def backend(self):
+        return self._backend() if callable(self._backend) else self._backend
+
+    async def start(self) -> None:
+        async with self._start_lock:
+            if self._started:
+                return
+            await self.backend.subscribe(TOKEN_VERSION_CHANNEL, self._on_message)
+            await self.reload()
+            if self.sync_interval > 0:
+                self._task = asyncio.create_task(self.run())
+            self._started = True
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync()
+            except Exception:
+                self.metrics.sync_failures += 1
+                logger.exception("token version sync failed")
+
+    async def reload(self) -> None:
+        started = datetime.now()
+        await self._load(started - timedelta(seconds=self.life_time))
+        self._synced_at = started
+        self.metrics.reloads += 1
+
+    async def sync(self) -> None:
+        """Pick up bumps made by other workers since the last poll."""
+        started = datetime.now()
+        # Overlap the previous poll by an interval for bumps committed late.
+        await self._load(self._synced_at - timedelta(seconds=self.sync_interval))
+        self._synced_at = started
+        self.metrics.syncs += 1
+
+    async def _load(self, since: datetime) -> None:
+        after = 0
+        while True:
+            async with self.session_factory() as session:
+                rows = await UserObjects(session).revoked_versions_page(
+                    since, after, self.page_size
+                )
+            for after, version, revoked_at in rows:
+                self._set(after, version, revoked_at.timestamp() + self.life_time)
+            if len(rows) < self.page_size:
+                return
+
+    async def is_stale(self, user_id: int, version: int) -> bool:
+        if not self._started:
+            await self.start()
+        self.metrics.checks += 1
+        now = time.time()
+        if now >= self._next_prune:
+            self.prune(now)
+            self._next_prune = now + 60
+        entry = self.versions.get(user_id)
+        if entry is None or version >= entry[0]:
+            return False
+        self.metrics.stale += 1
+        return True
+
+    async def announce(self, versions: dict[int, int]) -> None:
+        """Apply freshly bumped ``versions`` here and in every other worker."""
+        forget_at = time.time() + self.life_time
+        for user_id, version in versions.items():
+            self._set(user_id, version, forget_at)
+        self.metrics.bumped += len(versions)
+        items = list(versions.items())
+        for start in range(0, len(items), self.message_size):
+            await self.backend.publish(
+                TOKEN_VERSION_CHANNEL,
+                " ".join(
+                    f"{user_id}:{version}"
+                    for user_id, version in items[start:start + self.message_size]
+                ),
+            )
+
+    def prune(self, now: float) -> None:
+        expired = [
+            user_id for user_id, (_, forget_at) in self.versions.items()
+            if forget_at <= now
+        ]
+        for user_id in expired:
+            del self.versions[user_id]
+
+    def _set(self, user_id: int, version: int, forget_at: float) -> None:
+        current = self.versions.get(user_id)
+        if current is None or version >= current[0]:
+            self.versions[user_id] = (version, forget_at)
+
+    def _on_message(self, message: Optional[str]) -> None:
+        if message is None:
+            asyncio.get_running_loop().create_task(self.reload())
+            return
+        forget_at = time.time() + self.life_time
+        try:
+            for item in message.split():
+                user_id, version = item.split(":")
+                self._set(int(user_id), int(version), forget_at)
+        except ValueError:
+            logger.warning("ignoring malformed token version message %r", message[:100])
+
+    def snapshot(self) -> dict:
+        return {**self.metrics.snapshot(), "tracked": len(self.versions)}
+
+
+token_versions = TokenVersions()
@@ -0,0 +1,138 @@
+"""JSON baselines and the regression gate.
+
+A baseline file holds the environment a run was made in and one summary per
+scenario (see ``common.summarize``). Compare two runs with::
+
+    python -m benchmarks.baseline baseline.json current.json --threshold 0.25
+
+which exits non-zero when any scenario got slower (or its throughput fell)
+by more than the threshold. Only the median and p95 latency and throughput
+are gated by default; p99 of a short run is too noisy to fail a build on.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+from datetime import datetime, UTC
+from typing import Optional
+
+LOWER_IS_BETTER = ("p50_ms", "p95_ms")
+HIGHER_IS_BETTER = ("rps", "rows_per_s")
+
+
+def environment(**options) -> dict:
+    from sqlalchemy.engine import make_url
+
+    from config import DATABASE_URL
+
+    return {
+        "recorded_at": datetime.now(tz=UTC).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "database": make_url(DATABASE_URL).get_backend_name(),
+        **options,
+    }
+
+
+def median_of(runs: list[dict[str, dict]]) -> dict[str, dict]:
+    """Combine repeated runs scenario by scenario, metric by metric."""
+    return {
+        name: {
+            metric: statistics.median(run[name][metric] for run in runs)
+            for metric in summary
+        }
+        for name, summary in runs[0].items()
+    }
+
+
+def save(path: str, scenarios: dict[str, dict], **options) -> None:
+    with open(path, "w") as file:
+        json.dump(
+            {"environment": environment(**options), "scenarios": scenarios},
+            file,
+            indent=2,
+            sort_keys=True,
+        )
+        file.write("\n")
+
+
+def load(path: str) -> dict:
+    with open(path) as file:
+        return json.load(file)
+
+
+def compare(
+    baseline: dict[str, dict],
+    current: dict[str, dict],
+    threshold: float,
+    metrics: Optional[tuple[str, ...]] = None,
+) -> list[str]:
+    """Describe every metric of ``current`` that regressed past ``threshold``."""
+    regressions = []
+    for name, before in baseline.items():
+        after = current.get(name)
+        if after is None:
+            regressions.append(f"{name}: missing from the current run")
+            continue
+        if after.get("errors", 0) > before.get("errors", 0):
+            regressions.append(f"{name}: errors {before.get('errors', 0)} -> {after['errors']}")
+        for metric in metrics or LOWER_IS_BETTER + HIGHER_IS_BETTER:
+            if not before.get(metric) or metric not in after:
+                continue
+            change = after[metric] / before[metric] - 1
+            if metric in HIGHER_IS_BETTER:
+                change = -change
+            if change > threshold:
+                regressions.append(
+                    f"{name}: {metric} {before[metric]:.2f} -> {after[metric]:.2f} "
+                    f"({change:+.0%} worse)"
+                )
+    return regressions
+
+
+def gate(
+    baseline_path: str,
+    scenarios: dict[str, dict],
+    threshold: float,
+    metrics: Optional[tuple[str, ...]] = None,
+) -> bool:
+    regressions = compare(load(baseline_path)["scenarios"], scenarios, threshold, metrics)
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    if not regressions:
+        print(f"no regressions beyond {threshold:.0%} against {baseline_path}")
+    return not regressions
+
+
+def add_gate_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--repeat", type=int, default=3, help="runs to take the median of")
+    parser.add_argument("--save", metavar="PATH", help="write the results as a baseline")
+    parser.add_argument("--check", metavar="PATH", help="fail on regressions against a baseline")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="allowed relative slowdown before --check fails",
+    )
+
+
+def apply_gate(args, scenarios: dict[str, dict], **options) -> None:
+    if args.save:
+        save(args.save, scenarios, **options)
+    if args.check and not gate(args.check, scenarios, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--metric", action="append", dest="metrics")
+    args = parser.parse_args()
+    metrics = tuple(args.metrics) if args.metrics else None
+    if not gate(args.baseline, load(args.current)["scenarios"], args.threshold, metrics):
+        sys.exit(1)
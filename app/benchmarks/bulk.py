@@ -0,0 +1,115 @@
+"""Row-at-a-time writes versus the batched ``ORMBase`` operations.
+
+Run from the ``app`` directory::
+
+    python -m benchmarks.bulk --rows 1000 --chunk-size 500
+
+Each scenario imports ``--rows`` users and then revokes as many refresh
+sessions, once with one statement and commit per row and once with the
+bulk variants (or a single unit of work).
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from auth.database.models import User
+from auth.database.queries import TokenSessionObjects, UserObjects
+from benchmarks.common import create_schema, print_table
+from database.connection import async_session, dispose_engine
+
+
+def user_rows(count: int, prefix: str) -> list[dict]:
+    return [
+        {
+            "username": f"{prefix}{index}",
+            "email": f"{prefix}{index}@example.com",
+            "password": "not-a-hash",
+            "registered_at": datetime.now(),
+            "is_public": True,
+            "is_active": True,
+            "is_superuser": False,
+            "token_version": 0,
+        }
+        for index in range(count)
+    ]
+
+
+def session_rows(count: int, user_ids: list[int]) -> list[dict]:
+    created_at = datetime.now()
+    expires_at = created_at + timedelta(days=30)
+    return [
+        {
+            "user_id": user_ids[index % len(user_ids)],
+            "refresh_token": uuid.uuid4(),
+            "created_at": created_at,
+            "expires": expires_at - created_at,
+            "expires_at": expires_at,
+        }
+        for index in range(count)
+    ]
+
+
+async def timed(coroutine, rows: int) -> dict:
+    start = time.perf_counter()
+    await coroutine
+    elapsed = time.perf_counter() - start
+    return {"seconds": elapsed, "rows_per_s": rows / elapsed}
+
+
+async def one_by_one_import(users: UserObjects, rows: list[dict]) -> None:
+    for row in rows:
+        await users.create(**row)
+
+
+async def unit_of_work_import(users: UserObjects, rows: list[dict]) -> None:
+    async with users.transaction():
+        for row in rows:
+            await users.create(**row)
+
+
+async def one_by_one_revoke(sessions: TokenSessionObjects, tokens: list) -> None:
+    for token in tokens:
+        await sessions.delete(refresh_token=token)
+
+
+async def main(args) -> None:
+    await create_schema()
+    results = {}
+    async with async_session() as session:
+        users = UserObjects(session)
+        sessions = TokenSessionObjects(session)
+        results["create x N"] = await timed(
+            one_by_one_import(users, user_rows(args.rows, "single")), args.rows
+        )
+        results["create x N (uow)"] = await timed(
+            unit_of_work_import(users, user_rows(args.rows, "uow")), args.rows
+        )
+        results["create_many"] = await timed(
+            users.create_many(user_rows(args.rows, "bulk"), args.chunk_size),
+            args.rows,
+        )
+
+        owners = await users.get_page_rows((User.id,), limit=args.rows)
+        rows = session_rows(args.rows * 2, [owner["id"] for owner in owners])
+        await sessions.create_many(rows, args.chunk_size)
+        tokens = [row["refresh_token"] for row in rows]
+        results["delete x N"] = await timed(
+            one_by_one_revoke(sessions, tokens[: args.rows]), args.rows
+        )
+        results["delete_many"] = await timed(
+            sessions.delete_many(
+                tokens[args.rows:], field="refresh_token", chunk_size=args.chunk_size
+            ),
+            args.rows,
+        )
+    print_table(f"{args.rows} rows, chunk size {args.chunk_size}", results)
+    await dispose_engine()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    asyncio.run(main(parser.parse_args()))
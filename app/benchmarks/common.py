@@ -0,0 +1,46 @@
+import statistics
+from typing import Sequence
+
+
+def percentile(samples: Sequence[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples: Sequence[float]) -> dict:
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000 if samples else 0.0,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+    }
+
+
+def print_table(title: str, rows: dict[str, dict]) -> None:
+    print(title)
+    for name, row in rows.items():
+        values = "  ".join(
+            f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}"
+            for key, value in row.items()
+        )
+        print(f"  {name:<24} {values}")
+
+
+async def create_schema() -> None:
+    from sqlmodel import SQLModel
+
+    from auth.database import models  # noqa: F401
+    from database.connection import get_engine
+
+    engine = get_engine()
+    async with engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.drop_all)
+        await connection.run_sync(SQLModel.metadata.create_all)
+    if engine.dialect.name == "sqlite":
+        # Persistent for the file; concurrent writers otherwise starve on the lock.
+        async with engine.connect() as connection:
+            await connection.exec_driver_sql("PRAGMA journal_mode=WAL")
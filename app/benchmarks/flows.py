@@ -0,0 +1,179 @@
+"""Load test of the auth flows through the whole ASGI app.
+
+Run from the ``app`` directory::
+
+    python -m benchmarks.flows --users 200 --concurrency 16 --save flows.json
+    python -m benchmarks.flows --users 200 --concurrency 16 --check flows.json
+
+Every virtual user signs up, signs in, reads its profile, refreshes and logs
+out over httpx's ASGI transport, so requests pass through the middleware and
+dependency stack without a socket. Each step runs for all users before the
+next one starts and is reported separately with its throughput; each figure
+is the median over ``--repeat`` runs with fresh users. Requests go
+to whatever ``DATABASE_URL`` points at (SQLite in a temp file by default, or
+a local MySQL); its tables are dropped and recreated. Password hashing
+dominates sign-up and sign-in, so compare runs made with the same
+``PASSWORD_HASH_ALGORITHM`` and cost settings.
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+import httpx
+
+from auth.hashing import password_hasher
+from benchmarks import baseline
+from benchmarks.common import create_schema, print_table, summarize
+from database.connection import dispose_engine
+from main import app
+
+PASSWORD = "benchmark-password"
+
+
+@dataclass
+class Step:
+    name: str
+    expected: int
+    samples: list[float] = field(default_factory=list)
+    errors: int = 0
+    unexpected: Counter = field(default_factory=Counter)
+    elapsed: float = 0.0
+
+    def record(self, elapsed: float, status_code: int) -> None:
+        self.samples.append(elapsed)
+        if status_code != self.expected:
+            self.errors += 1
+            self.unexpected[status_code] += 1
+
+    def summary(self) -> dict:
+        return {
+            **summarize(self.samples),
+            "rps": len(self.samples) / self.elapsed if self.elapsed else 0.0,
+            "errors": self.errors,
+        }
+
+
+class VirtualUser:
+    def __init__(self, transport: httpx.AsyncBaseTransport, username: str):
+        self.username = username
+        self.client = httpx.AsyncClient(transport=transport, base_url="https://benchmark")
+
+    async def request(self, step: Step, method: str, url: str, **kwargs) -> httpx.Response:
+        start = time.perf_counter()
+        response = await self.client.request(method, url, **kwargs)
+        step.record(time.perf_counter() - start, response.status_code)
+        return response
+
+    async def sign_up(self, step: Step) -> None:
+        await self.request(step, "POST", "/api/auth/sign-up", params={
+            "username": self.username,
+            "email": f"{self.username}@example.com",
+            "password": PASSWORD,
+            "is_public": True,
+        })
+
+    async def sign_in(self, step: Step) -> None:
+        response = await self.request(step, "POST", "/api/auth/sign-in", data={
+            "username": self.username,
+            "password": PASSWORD,
+        })
+        if response.status_code == 200:
+            tokens = response.json()
+            self.client.cookies.set("access_token", tokens["access_token"])
+            self.client.cookies.set("refresh_token", tokens["refresh_token"])
+
+    async def my_profile(self, step: Step, reads: int) -> None:
+        for _ in range(reads):
+            await self.request(step, "GET", "/api/auth/my_profile")
+
+    async def refresh(self, step: Step) -> None:
+        await self.request(step, "POST", "/api/auth/refresh")
+
+    async def logout(self, step: Step) -> None:
+        await self.request(step, "POST", "/api/auth/logout")
+
+
+async def run_step(users: list[VirtualUser], step: Step, concurrency: int, action) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(user: VirtualUser) -> None:
+        async with semaphore:
+            await action(user, step)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run(user) for user in users))
+    step.elapsed = time.perf_counter() - start
+
+
+async def run_flows(users: list[VirtualUser], concurrency: int, reads: int) -> dict[str, Step]:
+    steps = {
+        "sign-up": (Step("sign-up", 201), VirtualUser.sign_up),
+        "sign-in": (Step("sign-in", 200), VirtualUser.sign_in),
+        "my_profile": (
+            Step("my_profile", 200),
+            lambda user, step: user.my_profile(step, reads),
+        ),
+        "refresh": (Step("refresh", 200), VirtualUser.refresh),
+        "logout": (Step("logout", 204), VirtualUser.logout),
+    }
+    for step, action in steps.values():
+        await run_step(users, step, concurrency, action)
+    return {name: step for name, (step, _) in steps.items()}
+
+
+async def main(
+    users: int,
+    concurrency: int,
+    reads: int,
+    warmup: int,
+    repeat: int,
+) -> dict[str, dict]:
+    await create_schema()
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    runs = []
+    async with app.router.lifespan_context(app):
+        warmup_users = [VirtualUser(transport, f"warmup{i}") for i in range(warmup)]
+        await run_flows(warmup_users, concurrency, reads)
+        for run in range(repeat):
+            virtual_users = [VirtualUser(transport, f"bench{run}-{i}") for i in range(users)]
+            steps = await run_flows(virtual_users, concurrency, reads)
+            for step in steps.values():
+                if step.unexpected:
+                    print(f"{step.name}: unexpected statuses {dict(step.unexpected)}")
+            runs.append({name: step.summary() for name, step in steps.items()})
+            for user in virtual_users:
+                await user.client.aclose()
+        for user in warmup_users:
+            await user.client.aclose()
+    await dispose_engine()
+    return baseline.median_of(runs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--reads", type=int, default=5, help="my_profile requests per user")
+    parser.add_argument("--warmup", type=int, default=10, help="unrecorded users run first")
+    baseline.add_gate_arguments(parser)
+    args = parser.parse_args()
+
+    scenarios = asyncio.run(
+        main(args.users, args.concurrency, args.reads, args.warmup, args.repeat)
+    )
+    print_table(
+        f"auth flows: {args.users} users, concurrency {args.concurrency}, "
+        f"hashing {password_hasher.algorithm}",
+        scenarios,
+    )
+    baseline.apply_gate(
+        args,
+        scenarios,
+        users=args.users,
+        concurrency=args.concurrency,
+        reads=args.reads,
+        repeat=args.repeat,
+        password_hash=repr(password_hasher.algorithm),
+    )
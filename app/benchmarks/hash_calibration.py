@@ -0,0 +1,122 @@
+"""Pick password hashing parameters for a target latency.
+
+Run from the ``app`` directory on the hardware that serves sign-ins::
+
+    python -m benchmarks.hash_calibration --target-ms 250 --algorithm argon2id
+
+Raises the cost of each algorithm one step at a time (bcrypt rounds, argon2id
+time cost, scrypt N) until a hash takes at least ``--target-ms``, timing
+``--workers`` hashes at once so the cores are as busy as under
+``PASSWORD_HASH_WORKERS``. Memory and parallelism stay where the flags put
+them. Prints the settings that land closest to the target as environment
+variables; existing hashes are upgraded by the rehash on sign-in.
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from auth.hashing import ALGORITHMS, Argon2id, Bcrypt, HashAlgorithm, Scrypt
+from benchmarks.common import print_table, summarize
+from config import PASSWORD_HASH_WORKERS
+
+PASSWORD = b"calibration-password"
+
+
+def time_hashes(algorithm: HashAlgorithm, samples: int, workers: int) -> list[float]:
+    def timed(_) -> float:
+        start = time.perf_counter()
+        algorithm.hash(PASSWORD)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(timed, range(samples)))
+
+
+def calibrate(
+    build: Callable[[int], HashAlgorithm],
+    costs: range,
+    target: float,
+    samples: int,
+    workers: int,
+) -> tuple[HashAlgorithm, dict[str, dict]]:
+    """Climb ``costs`` until the median hash reaches ``target`` seconds."""
+    measured = {}
+    best, best_distance = None, float("inf")
+    for cost in costs:
+        algorithm = build(cost)
+        timings = time_hashes(algorithm, samples, workers)
+        measured[repr(algorithm)] = summarize(timings)
+        median = statistics.median(timings)
+        distance = abs(median - target)
+        if distance < best_distance:
+            best, best_distance = algorithm, distance
+        if median >= target:
+            break
+    return best, measured
+
+
+def settings(algorithm: HashAlgorithm) -> str:
+    if isinstance(algorithm, Bcrypt):
+        values = {"PASSWORD_HASH_ROUNDS": algorithm.rounds}
+    elif isinstance(algorithm, Argon2id):
+        values = {
+            "ARGON2_TIME_COST": algorithm.time_cost,
+            "ARGON2_MEMORY_COST": algorithm.memory_cost,
+            "ARGON2_PARALLELISM": algorithm.parallelism,
+        }
+    else:
+        values = {
+            "SCRYPT_LOG_N": algorithm.log_n,
+            "SCRYPT_BLOCK_SIZE": algorithm.block_size,
+            "SCRYPT_PARALLELISM": algorithm.parallelism,
+        }
+    return " ".join(
+        [f"PASSWORD_HASH_ALGORITHM={algorithm.name}"]
+        + [f"{name}={value}" for name, value in values.items()]
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--target-ms", type=float, default=250.0)
+    parser.add_argument("--algorithm", choices=sorted(ALGORITHMS), action="append")
+    parser.add_argument("--samples", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=PASSWORD_HASH_WORKERS)
+    parser.add_argument("--argon2-memory-mib", type=int, default=64)
+    parser.add_argument("--argon2-parallelism", type=int, default=4)
+    parser.add_argument("--scrypt-block-size", type=int, default=8)
+    parser.add_argument("--scrypt-parallelism", type=int, default=1)
+    args = parser.parse_args()
+
+    ladders = {
+        "bcrypt": (lambda cost: Bcrypt(rounds=cost), range(8, 21)),
+        "argon2id": (
+            lambda cost: Argon2id(
+                time_cost=cost,
+                memory_cost=args.argon2_memory_mib * 1024,
+                parallelism=args.argon2_parallelism,
+            ),
+            range(1, 33),
+        ),
+        "scrypt": (
+            lambda cost: Scrypt(
+                log_n=cost,
+                block_size=args.scrypt_block_size,
+                parallelism=args.scrypt_parallelism,
+            ),
+            range(12, 23),
+        ),
+    }
+    chosen = {}
+    for name in args.algorithm or sorted(ALGORITHMS):
+        build, costs = ladders[name]
+        best, measured = calibrate(
+            build, costs, args.target_ms / 1000, args.samples, args.workers
+        )
+        print_table(f"{name}, {args.workers} concurrent hashes", measured)
+        chosen[name] = best
+    print(f"closest to {args.target_ms:.0f} ms per hash")
+    for name, algorithm in chosen.items():
+        print(f"  {settings(algorithm)}")
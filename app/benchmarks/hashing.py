@@ -0,0 +1,91 @@
+"""Event loop latency while sign-ins saturate the password hasher.
+
+Run from the ``app`` directory::
+
+    python -m benchmarks.hashing --signins 64 --duration 5
+
+A probe coroutine stands in for the cheap endpoints (``/my_profile``,
+``/refresh``) and records how late the loop schedules it, once with bcrypt
+called inline on the loop and once through ``PasswordHasher``.
+"""
+import argparse
+import asyncio
+import time
+
+from bcrypt import checkpw, gensalt, hashpw
+from fastapi import HTTPException
+
+from auth.hashing import Bcrypt, PasswordHasher
+from benchmarks.common import print_table, summarize
+
+
+async def probe(stop: asyncio.Event, interval: float) -> list[float]:
+    delays = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        delays.append(time.perf_counter() - start - interval)
+    return delays
+
+
+async def inline_signin(password: bytes, hashed: bytes) -> None:
+    checkpw(password, hashed)
+    await asyncio.sleep(0)
+
+
+async def pooled_signin(hasher: PasswordHasher, password: str, hashed: str):
+    try:
+        await hasher.verify(password, hashed)
+    except HTTPException:
+        await asyncio.sleep(0.01)
+
+
+async def storm(signin, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        await signin()
+
+
+async def scenario(signin, args) -> dict:
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(stop, args.interval))
+    storms = [
+        asyncio.create_task(storm(signin, stop)) for _ in range(args.signins)
+    ]
+    await asyncio.sleep(args.duration)
+    stop.set()
+    await asyncio.gather(*storms)
+    return summarize(await probe_task)
+
+
+async def main(args) -> None:
+    password = "benchmark-password"
+    hashed = hashpw(password.encode(), gensalt(args.rounds))
+    hasher = PasswordHasher(
+        algorithm=Bcrypt(rounds=args.rounds),
+        workers=args.workers,
+        queue_size=args.queue_size,
+        executor=args.executor,
+    )
+    results = {
+        "inline": await scenario(
+            lambda: inline_signin(password.encode(), hashed), args
+        ),
+        "pool": await scenario(
+            lambda: pooled_signin(hasher, password, hashed.decode()), args
+        ),
+    }
+    print_table("probe scheduling delay (non-login endpoints)", results)
+    print("pool metrics:", hasher.metrics.snapshot())
+    hasher.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--signins", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--interval", type=float, default=0.005)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--queue-size", type=int, default=16)
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread")
+    asyncio.run(main(parser.parse_args()))
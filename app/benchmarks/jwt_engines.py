@@ -0,0 +1,87 @@
+"""Encode/decode throughput of the JWT engines.
+
+Run from the ``app`` directory::
+
+    python -m benchmarks.jwt_engines --iterations 2000 --algorithms HS256 ES256
+
+Every engine signs and verifies the same claims ``JWTStrategy`` issues; each
+decoded token is checked against the other engine too, so the table doubles
+as an interoperability check.
+"""
+import argparse
+import time
+from datetime import UTC, datetime, timedelta
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+from auth.jwt_engine import ENGINES, get_jwt_engine
+
+ALGORITHMS = (
+    "HS256", "HS512", "RS256", "PS256", "ES256", "ES384", "EdDSA",
+)
+
+
+def private_key(algorithm: str) -> bytes | str:
+    if algorithm.startswith("HS"):
+        return "benchmark-secret-" * 4
+    if algorithm[:2] in ("RS", "PS"):
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    elif algorithm == "EdDSA":
+        key = ed25519.Ed25519PrivateKey.generate()
+    else:
+        curve = {"ES256": ec.SECP256R1, "ES384": ec.SECP384R1, "ES512": ec.SECP521R1}
+        key = ec.generate_private_key(curve[algorithm]())
+    return key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+
+
+def claims() -> dict:
+    return {
+        "sub": "benchmark-user",
+        "exp": datetime.now(tz=UTC) + timedelta(minutes=30),
+        "uid": 1,
+        "act": True,
+        "su": False,
+        "ver": 0,
+    }
+
+
+def ops_per_second(function, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return iterations / (time.perf_counter() - start)
+
+
+def main(args) -> None:
+    print(f"{'algorithm':<10} {'engine':<8} {'encode/s':>12} {'decode/s':>12}")
+    for algorithm in args.algorithms:
+        key = private_key(algorithm)
+        engines = {}
+        for name in args.engines:
+            try:
+                engines[name] = get_jwt_engine(key, algorithm, name)
+                engines[name].decode(engines[name].encode(claims()))
+            except Exception as error:
+                print(f"{algorithm:<10} {name:<8} unsupported: {error}")
+                engines.pop(name, None)
+        for name, engine in engines.items():
+            payload = claims()
+            token = engine.encode(payload)
+            for other in engines.values():
+                assert other.decode(token)["uid"] == 1
+            encode = ops_per_second(lambda: engine.encode(payload), args.iterations)
+            decode = ops_per_second(lambda: engine.decode(token), args.iterations)
+            print(f"{algorithm:<10} {name:<8} {encode:>12.0f} {decode:>12.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--algorithms", nargs="+", default=ALGORITHMS)
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES))
+    main(parser.parse_args())
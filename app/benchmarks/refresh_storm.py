@@ -0,0 +1,126 @@
+"""Concurrent refreshes of one refresh token.
+
+Run from the ``app`` directory::
+
+    python -m benchmarks.refresh_storm --clients 20 --rounds 50
+
+Each round signs a user in and has ``--clients`` tabs refresh the same token
+at once: exactly one refresh may rotate it, the rest get a 401 without
+revoking the session. A stale token replayed after the grace window must
+revoke the session it was rotated into.
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException, Response
+
+from auth.backend import AuthServise
+from auth.database.models import TokenSession
+from auth.database.queries import TokenSessionObjects, UserObjects
+from benchmarks.bulk import user_rows
+from benchmarks.common import create_schema, print_table, summarize
+from config import REFRESH_REUSE_GRACE_SECONDS
+from database.connection import async_session, dispose_engine
+
+
+def auth_servise(session) -> AuthServise:
+    return AuthServise(
+        refresh_sessions=TokenSessionObjects(session),
+        users=UserObjects(session),
+    )
+
+
+async def refresh(token) -> tuple[str, float, object]:
+    async with async_session() as session:
+        start = time.perf_counter()
+        try:
+            new_token = (await auth_servise(session).refresh(Response(), token)).refresh_token
+            outcome = "rotated"
+        except HTTPException as error:
+            new_token = None
+            outcome = str(error.status_code)
+        return outcome, time.perf_counter() - start, new_token
+
+
+async def sign_in(user):
+    async with async_session() as session:
+        return (await auth_servise(session).create_token(user)).refresh_token
+
+
+async def storm(user, clients: int, rounds: int) -> tuple[Counter, list[float], int, float]:
+    outcomes = Counter()
+    samples = []
+    failed_rounds = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        token = await sign_in(user)
+        results = await asyncio.gather(*(refresh(token) for _ in range(clients)))
+        round_outcomes = Counter(outcome for outcome, _, _ in results)
+        failed_rounds += round_outcomes["rotated"] != 1
+        outcomes.update(round_outcomes)
+        samples += [elapsed for _, elapsed, _ in results]
+    return outcomes, samples, failed_rounds, time.perf_counter() - start
+
+
+async def chain(token, rotations: int) -> tuple[list[float], float]:
+    samples = []
+    start = time.perf_counter()
+    for _ in range(rotations):
+        _, elapsed, token = await refresh(token)
+        samples.append(elapsed)
+    return samples, time.perf_counter() - start
+
+
+async def replay_after_grace(user) -> bool:
+    stale = await sign_in(user)
+    _, _, current = await refresh(stale)
+    async with async_session() as session:
+        await TokenSessionObjects(session).update(
+            TokenSession.previous_token == stale,
+            rotated_at=datetime.now() - timedelta(seconds=REFRESH_REUSE_GRACE_SECONDS + 1),
+        )
+    replayed, _, _ = await refresh(stale)
+    revoked, _, _ = await refresh(current)
+    return replayed == revoked == "401"
+
+
+async def main(args) -> None:
+    await create_schema()
+    async with async_session() as session:
+        users = UserObjects(session)
+        await users.create_many(user_rows(1, "storm"))
+        user = await users.get(username="storm0")
+
+    outcomes, storm_samples, failed_rounds, storm_elapsed = await storm(
+        user, args.clients, args.rounds
+    )
+    chain_samples, chain_elapsed = await chain(await sign_in(user), args.rounds)
+    revoked = await replay_after_grace(user)
+    await dispose_engine()
+
+    print(f"storm outcomes: {dict(outcomes)}")
+    print(f"storm rounds with != 1 rotation: {failed_rounds}")
+    print(f"reuse after grace revokes session: {revoked}")
+    print_table(
+        "refresh latency",
+        {
+            f"storm x{args.clients}": summarize(storm_samples),
+            "sequential chain": summarize(chain_samples),
+        },
+    )
+    print(
+        f"rotations/s: storm {args.rounds / storm_elapsed:.1f}, "
+        f"chain {args.rounds / chain_elapsed:.1f}"
+    )
+    if failed_rounds or not revoked:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
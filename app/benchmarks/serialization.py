@@ -0,0 +1,109 @@
+"""Rows per second through the user list endpoint.
+
+Run from the ``app`` directory::
+
+    python -m benchmarks.serialization --rows 10000 --limit 200
+
+Walks every page of ``--rows`` seeded users over the ASGI app three ways:
+``orm + encoder`` is the endpoint as it was (ORM instances through FastAPI's
+generic encoder), ``response_model`` validates ORM instances against
+``UserPage`` and renders them with orjson, and ``columns + orjson`` is the
+current endpoint, which selects only the published columns and dumps the
+rows straight to bytes.
+"""
+import argparse
+import asyncio
+import time
+from typing import Annotated, Optional
+
+import httpx
+from fastapi import Depends, Query
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from auth.database.queries import UserObjects, get_user_objects_dependency
+from auth.database.schemas import UserPage
+from benchmarks import baseline
+from benchmarks.bulk import user_rows
+from benchmarks.common import create_schema, print_table
+from database.connection import async_session, dispose_engine
+from database.pagination import decode_cursor, encode_cursor
+from main import app
+
+
+async def orm_page(
+    users: Annotated[UserObjects, Depends(get_user_objects_dependency)],
+    cursor: Annotated[Optional[str], Query()] = None,
+    limit: Annotated[int, Query()] = 50,
+):
+    items = await users.get_page(after=decode_cursor(cursor) if cursor else None, limit=limit)
+    next_cursor = encode_cursor(items[-1].id) if len(items) == limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+
+app.add_api_route("/benchmark/users/orm", orm_page, response_class=JSONResponse)
+app.add_api_route(
+    "/benchmark/users/model",
+    orm_page,
+    response_model=UserPage,
+    response_class=ORJSONResponse,
+)
+
+SCENARIOS = {
+    "orm + encoder": "/benchmark/users/orm",
+    "response_model": "/benchmark/users/model",
+    "columns + orjson": "/api/auth/users",
+}
+
+
+async def walk(client: httpx.AsyncClient, url: str, limit: int) -> tuple[int, int, float]:
+    rows, pages, cursor = 0, 0, None
+    start = time.perf_counter()
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = await client.get(url, params=params)
+        response.raise_for_status()
+        body = response.json()
+        rows += len(body["items"])
+        pages += 1
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return rows, pages, time.perf_counter() - start
+
+
+async def main(rows: int, limit: int, repeat: int) -> dict[str, dict]:
+    await create_schema()
+    async with async_session() as session:
+        await UserObjects(session).create_many(user_rows(rows, "reader"))
+    runs = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="https://benchmark") as client:
+            for url in SCENARIOS.values():
+                await walk(client, url, limit)
+            for _ in range(repeat):
+                run = {}
+                for name, url in SCENARIOS.items():
+                    count, pages, elapsed = await walk(client, url, limit)
+                    run[name] = {
+                        "rows_per_s": count / elapsed,
+                        "ms_per_page": elapsed / pages * 1000,
+                        "pages": pages,
+                    }
+                runs.append(run)
+    await dispose_engine()
+    return baseline.median_of(runs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--limit", type=int, default=200)
+    baseline.add_gate_arguments(parser)
+    args = parser.parse_args()
+
+    scenarios = asyncio.run(main(args.rows, args.limit, args.repeat))
+    print_table(f"user list: {args.rows} rows, {args.limit} per page", scenarios)
+    before = scenarios["orm + encoder"]["rows_per_s"]
+    for name, row in scenarios.items():
+        print(f"  {name:<24} {row['rows_per_s'] / before:.2f}x rows/s")
+    baseline.apply_gate(args, scenarios, rows=args.rows, limit=args.limit)
@@ -0,0 +1,175 @@
+"""Refresh-session store throughput, SQL against Redis protocol.
+
+Run from the ``app`` directory::
+
+    python -m benchmarks.session_store --sessions 2000 --concurrency 32
+    python -m benchmarks.session_store --redis-url redis://127.0.0.1:6379/15
+
+Opens, rotates and revokes ``--sessions`` sessions through each store with
+``--concurrency`` operations in flight, one database session per operation as
+a request would have, and reports operations per second. A storm of
+concurrent rotations of one token checks that each store lets exactly one
+win. Without ``--redis-url`` the Redis side talks to ``cache.server`` in this
+process, which shares the event loop with the clients; a real server does
+better than that.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Optional
+
+from auth.database.queries import TokenSessionObjects, UserObjects
+from auth.sessions import RedisSessionStore, RefreshSessionStore
+from benchmarks import baseline
+from benchmarks.bulk import user_rows
+from benchmarks.common import create_schema, print_table, summarize
+from cache.server import StubRedisServer
+from database.connection import async_session, dispose_engine
+
+LIFETIME = timedelta(days=30)
+
+
+@asynccontextmanager
+async def sql_store() -> AsyncIterator[RefreshSessionStore]:
+    async with async_session() as session:
+        yield TokenSessionObjects(session)
+
+
+def shared_store(store: RefreshSessionStore):
+    @asynccontextmanager
+    async def factory() -> AsyncIterator[RefreshSessionStore]:
+        yield store
+    return factory
+
+
+async def run_operations(store_factory, operations, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+
+    async def run(operation) -> None:
+        async with semaphore:
+            async with store_factory() as store:
+                start = time.perf_counter()
+                await operation(store)
+                samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run(operation) for operation in operations))
+    return {"rps": len(samples) / (time.perf_counter() - start), **summarize(samples)}
+
+
+def open_operation(user_id: int, token: uuid.UUID):
+    async def operation(store: RefreshSessionStore) -> None:
+        now = datetime.now()
+        await store.open_session(user_id, token, now, now + LIFETIME)
+    return operation
+
+
+def rotate_operation(token: uuid.UUID, new_token: uuid.UUID):
+    async def operation(store: RefreshSessionStore) -> None:
+        if await store.rotate(token, new_token, datetime.now() + LIFETIME) is None:
+            raise RuntimeError(f"rotation of {token} failed")
+    return operation
+
+
+def revoke_operation(token: uuid.UUID):
+    async def operation(store: RefreshSessionStore) -> None:
+        await store.revoke(token)
+    return operation
+
+
+async def storm(store_factory, user_id: int, clients: int) -> int:
+    token = uuid.uuid4()
+    async with store_factory() as store:
+        await open_operation(user_id, token)(store)
+
+    async def rotate() -> Optional[int]:
+        async with store_factory() as store:
+            return await store.rotate(token, uuid.uuid4(), datetime.now() + LIFETIME)
+
+    results = await asyncio.gather(*(rotate() for _ in range(clients)))
+    return sum(result is not None for result in results)
+
+
+async def measure(store_factory, user_ids: list[int], sessions: int, concurrency: int):
+    tokens = [uuid.uuid4() for _ in range(sessions)]
+    rotated = [uuid.uuid4() for _ in range(sessions)]
+    owners = [user_ids[index % len(user_ids)] for index in range(sessions)]
+    return {
+        "open": await run_operations(
+            store_factory, map(open_operation, owners, tokens), concurrency
+        ),
+        "rotate": await run_operations(
+            store_factory, map(rotate_operation, tokens, rotated), concurrency
+        ),
+        "revoke": await run_operations(
+            store_factory, map(revoke_operation, rotated), concurrency
+        ),
+    }
+
+
+async def main(args) -> dict[str, dict]:
+    await create_schema()
+    async with async_session() as session:
+        users = UserObjects(session)
+        await users.create_many(user_rows(args.users, "sessions"))
+        user_ids = [user.id for user in await users.get_all(limit=args.users)]
+
+    server = None
+    url = args.redis_url
+    if url is None:
+        server = await StubRedisServer().start()
+        url = server.url
+    # Each user keeps every session the benchmark opens for them.
+    redis_store = RedisSessionStore(url, max_sessions_per_user=0)
+    stores = {"sql": sql_store, "redis": shared_store(redis_store)}
+    runs = []
+    try:
+        for _ in range(args.repeat):
+            run = {}
+            for name, factory in stores.items():
+                for operation, result in (
+                    await measure(factory, user_ids, args.sessions, args.concurrency)
+                ).items():
+                    run[f"{name} {operation}"] = result
+            runs.append(run)
+        winners = {
+            name: await storm(factory, user_ids[0], args.storm_clients)
+            for name, factory in stores.items()
+        }
+    finally:
+        await redis_store.close()
+        if server is not None:
+            await server.stop()
+        await dispose_engine()
+    print(f"rotation storm winners of {args.storm_clients} (must be 1): {winners}")
+    if any(count != 1 for count in winners.values()):
+        raise SystemExit(1)
+    return baseline.median_of(runs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--storm-clients", type=int, default=20)
+    parser.add_argument("--redis-url", help="a real server; its keys are overwritten")
+    baseline.add_gate_arguments(parser)
+    args = parser.parse_args()
+
+    scenarios = asyncio.run(main(args))
+    print_table(
+        f"session stores: {args.sessions} sessions, concurrency {args.concurrency}",
+        scenarios,
+    )
+    baseline.apply_gate(
+        args,
+        scenarios,
+        sessions=args.sessions,
+        concurrency=args.concurrency,
+        redis="external" if args.redis_url else "cache.server",
+    )
@@ -0,0 +1,80 @@
+"""Concurrent duplicate sign-ups.
+
+Run from the ``app`` directory::
+
+    python -m benchmarks.signup_race --attempts 50
+
+Fires ``--attempts`` sign-ups for the same username (and, in a second round,
+the same email) at once and checks that exactly one of them is created while
+every other attempt gets a 409 naming the conflicting field.
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+from fastapi import HTTPException
+
+from auth.backend import AuthServise
+from auth.hashing import PasswordHasher
+from auth.database.queries import TokenSessionObjects, UserObjects
+from benchmarks.common import create_schema, print_table, summarize
+from database.connection import async_session, dispose_engine
+
+
+async def sign_up(
+    hasher: PasswordHasher, index: int, username: str, email: str
+) -> tuple[str, float]:
+    async with async_session() as session:
+        servise = AuthServise(
+            refresh_sessions=TokenSessionObjects(session),
+            users=UserObjects(session),
+            hasher=hasher,
+        )
+        start = time.perf_counter()
+        try:
+            await servise.authorize(
+                username=username.format(index=index),
+                email=email.format(index=index),
+                password="benchmark-password",
+                is_public=True,
+            )
+            outcome = "created"
+        except HTTPException as error:
+            outcome = f"{error.status_code} {error.detail}"
+        return outcome, time.perf_counter() - start
+
+
+async def race(attempts: int, username: str, email: str) -> tuple[Counter, dict]:
+    hasher = PasswordHasher(queue_size=attempts)
+    results = await asyncio.gather(
+        *(sign_up(hasher, index, username, email) for index in range(attempts))
+    )
+    hasher.shutdown()
+    outcomes = Counter(outcome for outcome, _ in results)
+    return outcomes, summarize([elapsed for _, elapsed in results])
+
+
+async def main(args) -> None:
+    await create_schema()
+    rounds = {
+        "same username": ("racer", "racer{index}@example.com"),
+        "same email": ("racer{index}", "racer@example.com"),
+    }
+    timings = {}
+    failed = False
+    for name, (username, email) in rounds.items():
+        outcomes, timings[name] = await race(args.attempts, username, email)
+        print(f"{name}: {dict(outcomes)}")
+        failed |= outcomes["created"] != 1
+    print_table("sign-up latency", timings)
+    await dispose_engine()
+    if failed:
+        raise SystemExit("expected exactly one sign-up to succeed per round")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--attempts", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args))
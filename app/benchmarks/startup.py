@@ -0,0 +1,102 @@
+"""Worker start-up cost.
+
+Run from the ``app`` directory::
+
+    python -m benchmarks.startup --repeat 5 --budget-ms 800
+
+Imports ``main`` in fresh interpreters under ``python -X importtime`` and
+reports the import time, the packages ``main`` pulls in that cost the most,
+and how long the lifespan then takes to build the engine, JWT strategy and
+cookie transport. Exits non-zero when the median import of ``main`` exceeds
+``--budget-ms``, so the budget can run in CI next to ``--check``.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from benchmarks import baseline
+from benchmarks.common import print_table, summarize
+
+APP_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+main.get_engine()
+main.get_jwt_strategy()
+main.get_cookie_transport()
+print(imported - start, time.perf_counter() - imported)
+"""
+
+
+def parse_importtime(stderr: str) -> tuple[float, dict[str, float]]:
+    """Cumulative seconds for ``main`` and for each module it imports directly."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((depth, name.strip(), int(cumulative) / 1_000_000))
+    children = {}
+    for depth, name, cumulative in entries:
+        if depth == 0:
+            if name == "main":
+                return cumulative, children
+            children = {}
+        elif depth == 1:
+            children[name] = cumulative
+    return 0.0, {}
+
+
+def start_worker() -> tuple[float, float, float, dict[str, float]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD],
+        cwd=APP_DIRECTORY,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imported, built = map(float, result.stdout.split())
+    return (imported, built, *parse_importtime(result.stderr))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, help="fail above this median import time")
+    parser.add_argument("--top", type=int, default=10)
+    baseline.add_gate_arguments(parser)
+    args = parser.parse_args()
+
+    imports, builds = [], []
+    packages = defaultdict(list)
+    for _ in range(args.repeat):
+        imported, built, cumulative, children = start_worker()
+        imports.append(cumulative or imported)
+        builds.append(built)
+        for name, seconds in children.items():
+            packages[name].append(seconds)
+
+    scenarios = {"import main": summarize(imports), "build components": summarize(builds)}
+    print_table(f"worker start-up over {args.repeat} interpreters", scenarios)
+    slowest = sorted(
+        ((statistics.median(samples), name) for name, samples in packages.items()),
+        reverse=True,
+    )
+    print("slowest imports under main")
+    for cumulative, name in slowest[:args.top]:
+        print(f"  {name:<40} {cumulative * 1000:8.2f} ms")
+
+    baseline.apply_gate(args, scenarios)
+    median_ms = statistics.median(imports) * 1000
+    if args.budget_ms is not None and median_ms > args.budget_ms:
+        print(
+            f"import of main took {median_ms:.0f} ms, over the {args.budget_ms:.0f} ms budget",
+            file=sys.stderr,
+        )
+        sys.exit(1)
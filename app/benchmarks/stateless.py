@@ -0,0 +1,80 @@
+"""Authenticated request rate with and without a database lookup.
+
+Run from the ``app`` directory::
+
+    python -m benchmarks.stateless --requests 5000 --concurrency 50
+
+Both scenarios decode the same access token; ``db`` loads the user row the
+way ``read_token`` always did (bypassing the user cache), ``claims`` builds
+the principal from the token alone, once re-verifying the signature on every
+request and once through the verified-token cache.
+"""
+import argparse
+import asyncio
+import time
+
+from auth.database.queries import UserObjects
+from auth.jwt_strategy import JWTStrategy
+from auth.token_cache import VerifiedTokenCache
+from benchmarks.common import create_schema, print_table, summarize
+from database.connection import async_session, dispose_engine
+
+
+class UncachedUserObjects(UserObjects):
+    cache = None
+
+
+async def seed_user(users: UserObjects):
+    await users.create(
+        username="benchmark",
+        email="benchmark@example.com",
+        password="not-a-hash",
+        is_public=True,
+    )
+    return await users.get(username="benchmark")
+
+
+async def authenticated_request(strategy: JWTStrategy, token: str, load_user: bool):
+    async with async_session() as session:
+        start = time.perf_counter()
+        await strategy.read_token(token, UncachedUserObjects(session), load_user)
+        return time.perf_counter() - start
+
+
+async def scenario(strategy, token, load_user, args) -> dict:
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def request():
+        async with semaphore:
+            return await authenticated_request(strategy, token, load_user)
+
+    start = time.perf_counter()
+    samples = await asyncio.gather(*(request() for _ in range(args.requests)))
+    elapsed = time.perf_counter() - start
+    return {"req_per_s": args.requests / elapsed, **summarize(samples)}
+
+
+async def main(args) -> None:
+    await create_schema()
+    async with async_session() as session:
+        user = await seed_user(UserObjects(session))
+    uncached = JWTStrategy(stateless=True, token_cache=VerifiedTokenCache(maxsize=0))
+    strategy = JWTStrategy(stateless=True, token_cache=VerifiedTokenCache())
+    token = strategy.write_token(user).removeprefix("Bearer ")
+    print_table(
+        "read_token",
+        {
+            "db": await scenario(uncached, token, True, args),
+            "claims": await scenario(uncached, token, False, args),
+            "claims, cached verify": await scenario(strategy, token, False, args),
+        },
+    )
+    print(f"token cache: {strategy.token_cache.snapshot()}")
+    await dispose_engine()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
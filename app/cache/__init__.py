@@ -0,0 +1,25 @@
+from typing import Optional
+
+from config import CACHE_BACKEND, CACHE_MAX_ENTRIES, CACHE_URL
+from .base import MISSING, CacheBackend, CacheError, CacheNamespace
+from .memory import MemoryBackend, TTLCache
+from .resp import RedisBackend
+
+_backend: Optional[CacheBackend] = None
+
+
+def get_cache_backend() -> CacheBackend:
+    global _backend
+    if _backend is None:
+        if CACHE_BACKEND == "redis":
+            _backend = RedisBackend(CACHE_URL)
+        else:
+            _backend = MemoryBackend(maxsize=CACHE_MAX_ENTRIES)
+    return _backend
+
+
+async def close_cache_backend() -> None:
+    global _backend
+    if _backend is not None:
+        await _backend.close()
+        _backend = None
@@ -0,0 +1,163 @@
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+MISSING = object()
+
+Subscriber = Callable[[Optional[str]], None]
+
+
+class CacheError(Exception):
+    pass
+
+
+class CacheBackend(ABC):
+    @abstractmethod
+    async def get(self, key: str) -> Any:
+        """Return the stored value or ``MISSING``."""
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        ...
+
+    @abstractmethod
+    async def incr(self, key: str, ttl: Optional[float] = None) -> int:
+        """Increment a counter; ``ttl`` (re)sets its expiry."""
+
+    @abstractmethod
+    async def publish(self, channel: str, message: str) -> None:
+        ...
+
+    @abstractmethod
+    async def subscribe(self, channel: str, callback: Subscriber) -> None:
+        """Call ``callback(message)`` for every message on ``channel``.
+
+        ``callback(None)`` means messages may have been lost (for example
+        after a reconnect) and any state derived from them must be reloaded.
+        """
+
+    async def close(self) -> None:
+        pass
+
+    def snapshot(self) -> dict:
+        return {"backend": type(self).__name__}
+
+
+@dataclass
+class NamespaceStats:
+    hits: int = 0
+    misses: int = 0
+    errors: int = 0
+    invalidations: int = 0
+
+    def snapshot(self) -> dict:
+        return vars(self).copy()
+
+
+class CacheNamespace:
+    def __init__(
+        self,
+        backend: CacheBackend | Callable[[], CacheBackend],
+        name: str,
+        ttl: float,
+        negative_ttl: Optional[float] = None,
+    ):
+        self._backend = backend
+        self.name = name
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.stats = NamespaceStats()
+        self._generation: Optional[int] = None
+        self._subscribed = False
+
+    @property
+    def backend(self) -> CacheBackend:
+        if callable(self._backend):
+            self._backend = self._backend()
+        return self._backend
+
+    async def get(self, key: str) -> Any:
+        try:
+            value = await self.backend.get(await self._key(key))
+        except CacheError as error:
+            logger.warning("cache get failed for %s: %s", self.name, error)
+            self.stats.errors += 1
+            return MISSING
+        if value is MISSING:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any) -> None:
+        ttl = self.negative_ttl if value is None else self.ttl
+        try:
+            await self.backend.set(await self._key(key), value, ttl)
+        except CacheError as error:
+            logger.warning("cache set failed for %s: %s", self.name, error)
+            self.stats.errors += 1
+
+    async def delete(self, *keys: str) -> None:
+        try:
+            await self.backend.delete(*[await self._key(key) for key in keys])
+        except CacheError as error:
+            logger.error("cache delete failed for %s: %s", self.name, error)
+            self.stats.errors += 1
+
+    async def invalidate(self) -> None:
+        """Drop every entry of the namespace, in all workers."""
+        self.stats.invalidations += 1
+        try:
+            await self._subscribe()
+            self._generation = await self.backend.incr(self._generation_key)
+            await self.backend.publish(
+                INVALIDATION_CHANNEL, f"{self.name} {self._generation}"
+            )
+        except CacheError as error:
+            logger.error("cache invalidation failed for %s: %s", self.name, error)
+            self.stats.errors += 1
+            self._generation = None
+
+    @property
+    def _generation_key(self) -> str:
+        return f"{self.name}:generation"
+
+    async def _key(self, key: str) -> str:
+        if self._generation is None:
+            await self._subscribe()
+            generation = await self.backend.get(self._generation_key)
+            self._generation = 0 if generation is MISSING else int(generation)
+        return f"{self.name}:{self._generation}:{key}"
+
+    async def _subscribe(self) -> None:
+        if not self._subscribed:
+            await self.backend.subscribe(INVALIDATION_CHANNEL, self._on_invalidate)
+            self._subscribed = True
+
+    def _on_invalidate(self, message: Optional[str]) -> None:
+        if message is None:
+            self._generation = None
+            return
+        name, generation = message.rsplit(" ", 1)
+        if name == self.name and (
+            self._generation is None or int(generation) > self._generation
+        ):
+            self._generation = int(generation)
+
+    def snapshot(self) -> dict:
+        stats = self.stats.snapshot()
+        lookups = stats["hits"] + stats["misses"]
+        return {
+            **stats,
+            "generation": self._generation,
+            "hit_ratio": stats["hits"] / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,137 @@
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Optional
+
+from .base import MISSING, CacheBackend, Subscriber
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+
+    def snapshot(self) -> dict:
+        return vars(self).copy()
+
+
+class TTLCache:
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 60.0,
+        negative_ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.clock = clock
+        self.stats = CacheStats()
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return MISSING
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            del self._data[key]
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return MISSING
+        self._data.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        if ttl is None:
+            ttl = self.negative_ttl if value is None else self.ttl
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        self._data[key] = (self.clock() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.stats.evictions += 1
+
+    def delete(self, *keys: Hashable) -> None:
+        for key in keys:
+            if self._data.pop(key, None) is not None:
+                self.stats.invalidations += 1
+
+    def delete_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        self.delete(*[key for key in self._data if predicate(key)])
+
+    def clear(self) -> None:
+        self.stats.invalidations += len(self._data)
+        self._data.clear()
+
+
+class MemoryBackend(CacheBackend):
+    """Process-local backend; every gunicorn worker keeps its own copy."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._counters: dict[str, int] = {}
+        self._counter_expiry: dict[str, float] = {}
+        self._purge_threshold = maxsize
+        self._subscribers: defaultdict[str, list[Subscriber]] = defaultdict(list)
+
+    async def get(self, key: str) -> Any:
+        if self._counter_alive(key):
+            return self._counters[key]
+        return self.entries.get(key)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.entries.set(key, value, ttl)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._counters.pop(key, None)
+            self._counter_expiry.pop(key, None)
+        self.entries.delete(*keys)
+
+    async def incr(self, key: str, ttl: Optional[float] = None) -> int:
+        value = self._counters[key] + 1 if self._counter_alive(key) else 1
+        self._counters[key] = value
+        if ttl is not None:
+            self._counter_expiry[key] = time.monotonic() + ttl
+            if len(self._counter_expiry) > self._purge_threshold:
+                self._purge_counters()
+        return value
+
+    def _counter_alive(self, key: str) -> bool:
+        expires_at = self._counter_expiry.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._counters[key], self._counter_expiry[key]
+        return key in self._counters
+
+    def _purge_counters(self) -> None:
+        now = time.monotonic()
+        for key in [key for key, at in self._counter_expiry.items() if at <= now]:
+            del self._counters[key], self._counter_expiry[key]
+        self._purge_threshold = max(self.entries.maxsize, 2 * len(self._counter_expiry))
+
+    async def publish(self, channel: str, message: str) -> None:
+        for callback in self._subscribers[channel]:
+            callback(message)
+
+    async def subscribe(self, channel: str, callback: Subscriber) -> None:
+        self._subscribers[channel].append(callback)
+
+    def snapshot(self) -> dict:
+        return {
+            "backend": "memory",
+            **self.entries.stats.snapshot(),
+            "size": len(self.entries),
+            "maxsize": self.entries.maxsize,
+            "counters": len(self._counters),
+        }
@@ -0,0 +1,244 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict, deque
+from typing import Any, Optional
+from urllib.parse import urlparse
+
+from .base import MISSING, CacheBackend, CacheError, Subscriber
+
+logger = logging.getLogger(__name__)
+
+
+class ReplyError(CacheError):
+    pass
+
+
+def encode_command(*args: Any) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode()
+        elif not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    line = await reader.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("connection closed")
+    prefix, payload = line[:1], line[1:-2]
+    if prefix == b"+":
+        return payload.decode()
+    if prefix == b"-":
+        return ReplyError(payload.decode())
+    if prefix == b":":
+        return int(payload)
+    if prefix == b"$":
+        length = int(payload)
+        if length < 0:
+            return None
+        return (await reader.readexactly(length + 2))[:-2]
+    if prefix == b"*":
+        length = int(payload)
+        if length < 0:
+            return None
+        return [await read_reply(reader) for _ in range(length)]
+    raise CacheError(f"unexpected reply: {line!r}")
+
+
+class RedisConnection:
+    """A single pipelined connection; replies resolve requests in order."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.closed = False
+        self._pending: deque[asyncio.Future] = deque()
+        self._reader_task = asyncio.create_task(self._read_loop())
+
+    @classmethod
+    async def open(cls, host: str, port: int) -> "RedisConnection":
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def execute(self, *args: Any) -> Any:
+        if self.closed:
+            raise CacheError("connection closed")
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(future)
+        self.writer.write(encode_command(*args))
+        await self.writer.drain()
+        return await future
+
+    async def _read_loop(self) -> None:
+        try:
+            while True:
+                reply = await read_reply(self.reader)
+                future = self._pending.popleft()
+                if future.done():
+                    continue
+                if isinstance(reply, ReplyError):
+                    future.set_exception(reply)
+                else:
+                    future.set_result(reply)
+        except (ConnectionError, asyncio.IncompleteReadError, CacheError) as error:
+            self._fail(CacheError(str(error) or "connection closed"))
+        except asyncio.CancelledError:
+            self._fail(CacheError("connection closed"))
+
+    def _fail(self, error: CacheError) -> None:
+        self.closed = True
+        while self._pending:
+            future = self._pending.popleft()
+            if not future.done():
+                future.set_exception(error)
+        self.writer.close()
+
+    async def close(self) -> None:
+        self._reader_task.cancel()
+        self.writer.close()
+
+
+class RedisBackend(CacheBackend):
+    """Backend speaking the Redis protocol (RESP2) over asyncio streams.
+
+    Commands share one pipelined connection; pub/sub gets its own connection
+    that reconnects and tells subscribers to resync when it drops.
+    """
+
+    def __init__(self, url: str, reconnect_delay: float = 0.5):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.reconnect_delay = reconnect_delay
+        self._connection: Optional[RedisConnection] = None
+        self._connect_lock = asyncio.Lock()
+        self._subscribers: defaultdict[str, list[Subscriber]] = defaultdict(list)
+        self._pubsub_task: Optional[asyncio.Task] = None
+        self._pubsub_writer: Optional[asyncio.StreamWriter] = None
+
+    async def execute(self, *args: Any) -> Any:
+        connection = await self._get_connection()
+        return await connection.execute(*args)
+
+    async def _get_connection(self) -> RedisConnection:
+        if self._connection is None or self._connection.closed:
+            async with self._connect_lock:
+                if self._connection is None or self._connection.closed:
+                    try:
+                        connection = await RedisConnection.open(self.host, self.port)
+                    except OSError as error:
+                        raise CacheError(str(error)) from error
+                    await self._prepare(connection.execute)
+                    self._connection = connection
+        return self._connection
+
+    async def _prepare(self, execute) -> None:
+        if self.password:
+            await execute("AUTH", self.password)
+        if self.db:
+            await execute("SELECT", self.db)
+
+    async def get(self, key: str) -> Any:
+        value = await self.execute("GET", key)
+        return MISSING if value is None else json.loads(value)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        args = ["SET", key, json.dumps(value, default=str)]
+        if ttl is not None:
+            args += ["PX", max(1, int(ttl * 1000))]
+        await self.execute(*args)
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self.execute("DEL", *keys)
+
+    async def incr(self, key: str, ttl: Optional[float] = None) -> int:
+        if ttl is None:
+            return await self.execute("INCR", key)
+        value, _ = await asyncio.gather(
+            self.execute("INCR", key),
+            self.execute("PEXPIRE", key, max(1, int(ttl * 1000))),
+        )
+        return value
+
+    async def publish(self, channel: str, message: str) -> None:
+        await self.execute("PUBLISH", channel, message)
+
+    async def subscribe(self, channel: str, callback: Subscriber) -> None:
+        self._subscribers[channel].append(callback)
+        if self._pubsub_task is None:
+            ready = asyncio.get_running_loop().create_future()
+            self._pubsub_task = asyncio.create_task(self._listen(ready))
+            await ready
+        elif self._pubsub_writer is not None:
+            self._pubsub_writer.write(encode_command("SUBSCRIBE", channel))
+            await self._pubsub_writer.drain()
+
+    async def _listen(self, ready: asyncio.Future) -> None:
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+            except OSError as error:
+                if not ready.done():
+                    self._pubsub_task = None
+                    ready.set_exception(CacheError(str(error)))
+                    return
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+            self._pubsub_writer = writer
+            try:
+                if self.password:
+                    writer.write(encode_command("AUTH", self.password))
+                    await read_reply(reader)
+                writer.write(encode_command("SUBSCRIBE", *self._subscribers))
+                await writer.drain()
+                if ready.done():
+                    self._dispatch_all(None)
+                else:
+                    ready.set_result(None)
+                while True:
+                    reply = await read_reply(reader)
+                    if isinstance(reply, list) and reply[0] == b"message":
+                        self._dispatch(reply[1].decode(), reply[2].decode())
+            except (ConnectionError, asyncio.IncompleteReadError, CacheError):
+                logger.warning("pub/sub connection lost, reconnecting")
+                self._pubsub_writer = None
+                writer.close()
+                await asyncio.sleep(self.reconnect_delay)
+
+    def _dispatch(self, channel: str, message: Optional[str]) -> None:
+        for callback in self._subscribers.get(channel, ()):
+            try:
+                callback(message)
+            except Exception:
+                logger.exception("cache subscriber failed on %s", channel)
+
+    def _dispatch_all(self, message: Optional[str]) -> None:
+        for channel in self._subscribers:
+            self._dispatch(channel, message)
+
+    def snapshot(self) -> dict:
+        # Hits, misses and evictions are counted by the server (INFO stats).
+        return {
+            "backend": "redis",
+            "address": f"{self.host}:{self.port}/{self.db}",
+            "connected": self._connection is not None and not self._connection.closed,
+            "subscribed": self._pubsub_writer is not None,
+        }
+
+    async def close(self) -> None:
+        if self._pubsub_task is not None:
+            self._pubsub_task.cancel()
+            self._pubsub_task = None
+        if self._pubsub_writer is not None:
+            self._pubsub_writer.close()
+            self._pubsub_writer = None
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
@@ -0,0 +1,264 @@
+"""A small in-process stand-in for a Redis server.
+
+It implements just the commands ``RedisBackend`` and the rest of the app use,
+so the shared backend can be exercised locally and in benchmarks without a
+real Redis::
+
+    python -m cache.server --port 6380
+"""
+import argparse
+import asyncio
+import fnmatch
+import time
+from collections import defaultdict
+from typing import Any, Optional
+
+from .resp import read_reply
+
+
+class SimpleString(str):
+    pass
+
+
+OK = SimpleString("OK")
+
+
+def encode_reply(value: Any) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, Exception):
+        return b"-ERR %s\r\n" % str(value).encode()
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, SimpleString):
+        return b"+%s\r\n" % value.encode()
+    if isinstance(value, str):
+        value = value.encode()
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    if isinstance(value, (list, tuple)):
+        return b"*%d\r\n" % len(value) + b"".join(encode_reply(item) for item in value)
+    raise TypeError(f"cannot encode {type(value)}")
+
+
+class StubRedisServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.data: dict[bytes, Any] = {}
+        self.expires: dict[bytes, float] = {}
+        self.channels: defaultdict[bytes, set[asyncio.StreamWriter]] = defaultdict(set)
+        self._server: Optional[asyncio.base_events.Server] = None
+
+    @property
+    def url(self) -> str:
+        return f"redis://{self.host}:{self.port}/0"
+
+    async def start(self) -> "StubRedisServer":
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            for writers in self.channels.values():
+                for writer in writers:
+                    writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "StubRedisServer":
+        return await self.start()
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                command = await read_reply(reader)
+                if not isinstance(command, list) or not command:
+                    break
+                name = command[0].upper().decode()
+                handler = getattr(self, f"cmd_{name.lower()}", None)
+                if handler is None:
+                    reply = Exception(f"unknown command '{name}'")
+                else:
+                    try:
+                        reply = handler(writer, *command[1:])
+                    except (TypeError, ValueError) as error:
+                        reply = Exception(str(error))
+                if reply is not NotImplemented:
+                    writer.write(encode_reply(reply))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            for writers in self.channels.values():
+                writers.discard(writer)
+            writer.close()
+
+    def _alive(self, key: bytes) -> bool:
+        expires_at = self.expires.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    def _expire(self, key: bytes, milliseconds: int) -> None:
+        self.expires[key] = time.monotonic() + milliseconds / 1000
+
+    def cmd_ping(self, writer, *args):
+        return SimpleString("PONG")
+
+    def cmd_auth(self, writer, *args):
+        return OK
+
+    def cmd_select(self, writer, db):
+        return OK
+
+    def cmd_flushall(self, writer, *args):
+        self.data.clear()
+        self.expires.clear()
+        return OK
+
+    def cmd_get(self, writer, key):
+        return self.data[key] if self._alive(key) else None
+
+    def cmd_set(self, writer, key, value, *options):
+        options = [option.upper() for option in options]
+        if b"NX" in options and self._alive(key):
+            return None
+        self.data[key] = value
+        self.expires.pop(key, None)
+        for unit, factor in ((b"PX", 1), (b"EX", 1000)):
+            if unit in options:
+                self._expire(key, int(options[options.index(unit) + 1]) * factor)
+        return OK
+
+    def cmd_del(self, writer, *keys):
+        deleted = 0
+        for key in keys:
+            if self._alive(key):
+                del self.data[key]
+                self.expires.pop(key, None)
+                deleted += 1
+        return deleted
+
+    def cmd_incr(self, writer, key):
+        value = int(self.data[key]) + 1 if self._alive(key) else 1
+        self.data[key] = str(value).encode()
+        return value
+
+    def cmd_pexpire(self, writer, key, milliseconds):
+        if not self._alive(key):
+            return 0
+        self._expire(key, int(milliseconds))
+        return 1
+
+    def cmd_expire(self, writer, key, seconds):
+        return self.cmd_pexpire(writer, key, int(seconds) * 1000)
+
+    def cmd_pttl(self, writer, key):
+        if not self._alive(key):
+            return -2
+        if key not in self.expires:
+            return -1
+        return int((self.expires[key] - time.monotonic()) * 1000)
+
+    def cmd_getdel(self, writer, key):
+        value = self.cmd_get(writer, key)
+        self.data.pop(key, None)
+        self.expires.pop(key, None)
+        return value
+
+    def cmd_mget(self, writer, *keys):
+        return [self.cmd_get(writer, key) for key in keys]
+
+    def cmd_scan(self, writer, cursor, *options):
+        pattern = b"*"
+        for name, value in zip(options[::2], options[1::2]):
+            if name.upper() == b"MATCH":
+                pattern = value
+        keys = [
+            key for key in list(self.data)
+            if self._alive(key) and fnmatch.fnmatchcase(key, pattern)
+        ]
+        return [b"0", keys]
+
+    def _zset(self, key: bytes) -> dict[bytes, float]:
+        return self.data[key] if self._alive(key) else {}
+
+    def _store_zset(self, key: bytes, zset: dict[bytes, float]) -> None:
+        if zset:
+            self.data[key] = zset
+        else:
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+
+    def cmd_zadd(self, writer, key, *pairs):
+        zset = self._zset(key)
+        added = 0
+        for score, member in zip(pairs[::2], pairs[1::2]):
+            added += member not in zset
+            zset[member] = float(score)
+        self._store_zset(key, zset)
+        return added
+
+    def cmd_zrem(self, writer, key, *members):
+        zset = self._zset(key)
+        removed = sum(zset.pop(member, None) is not None for member in members)
+        self._store_zset(key, zset)
+        return removed
+
+    def cmd_zcard(self, writer, key):
+        return len(self._zset(key))
+
+    def cmd_zrange(self, writer, key, start, stop):
+        members = sorted(self._zset(key).items(), key=lambda item: (item[1], item[0]))
+        stop = int(stop)
+        return [member for member, _ in members[int(start):None if stop == -1 else stop + 1]]
+
+    def cmd_zremrangebyscore(self, writer, key, low, high):
+        zset = self._zset(key)
+        low, high = float(low), float(high)
+        doomed = [member for member, score in zset.items() if low <= score <= high]
+        for member in doomed:
+            del zset[member]
+        self._store_zset(key, zset)
+        return len(doomed)
+
+    def cmd_zpopmin(self, writer, key, count=b"1"):
+        zset = self._zset(key)
+        popped = sorted(zset.items(), key=lambda item: (item[1], item[0]))[:int(count)]
+        for member, _ in popped:
+            del zset[member]
+        self._store_zset(key, zset)
+        return [value for member, score in popped for value in (member, repr(score))]
+
+    def cmd_publish(self, writer, channel, message):
+        subscribers = list(self.channels.get(channel, ()))
+        for subscriber in subscribers:
+            subscriber.write(encode_reply([b"message", channel, message]))
+        return len(subscribers)
+
+    def cmd_subscribe(self, writer, *channels):
+        for count, channel in enumerate(channels, 1):
+            self.channels[channel].add(writer)
+            writer.write(encode_reply([b"subscribe", channel, count]))
+        return NotImplemented
+
+
+async def serve(host: str, port: int) -> None:
+    server = await StubRedisServer(host, port).start()
+    print(f"listening on {server.url}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6380)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port))
@@ -1,8 +1,24 @@
 import os
 
-from dotenv import load_dotenv
 
-load_dotenv()
+def find_env_file() -> str | None:
+    directory = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        candidate = os.path.join(directory, ".env")
+        if os.path.isfile(candidate):
+            return candidate
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+ENV_FILE = os.getenv("ENV_FILE") or find_env_file()
+
+if ENV_FILE:
+    from dotenv import load_dotenv
+
+    load_dotenv(ENV_FILE)
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
@@ -12,7 +28,101 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 REFRESH_TOKEN_EXPIRE_DAYS = 30
 
+REFRESH_REUSE_GRACE_SECONDS = float(os.getenv("REFRESH_REUSE_GRACE_SECONDS", 10))
+
+SESSION_STORE = os.getenv("SESSION_STORE", "sql")
+SESSION_STORE_URL = os.getenv("SESSION_STORE_URL", "redis://127.0.0.1:6379/1")
+
+MAX_SESSIONS_PER_USER = int(os.getenv("MAX_SESSIONS_PER_USER", 10))
+SESSION_SWEEP_ENABLED = os.getenv("SESSION_SWEEP_ENABLED", "true").lower() == "true"
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", 300))
+SESSION_SWEEP_BATCH_SIZE = int(os.getenv("SESSION_SWEEP_BATCH_SIZE", 1000))
+SESSION_SWEEP_JITTER = float(os.getenv("SESSION_SWEEP_JITTER", 1.0))
+SESSION_SWEEP_LOCK_PATH = os.getenv(
+    "SESSION_SWEEP_LOCK_PATH", "/tmp/auth-session-sweeper.lock"
+)
+
+LOGOUT_BATCH_SIZE = int(os.getenv("LOGOUT_BATCH_SIZE", 1000))
+LOGOUT_BATCH_PAUSE = float(os.getenv("LOGOUT_BATCH_PAUSE", 0.05))
+LOGOUT_JOB_TTL = float(os.getenv("LOGOUT_JOB_TTL", 86400))
+
 ALGORITHM = os.getenv("ALGORITHM")
+JWT_ENGINE = os.getenv("JWT_ENGINE", "native")
+JWT_LEEWAY = int(os.getenv("JWT_LEEWAY", 0))
+JWT_KEYS_DIR = os.getenv("JWT_KEYS_DIR")
+JWT_KEYS_RELOAD_INTERVAL = float(os.getenv("JWT_KEYS_RELOAD_INTERVAL", 60))
+JWKS_MAX_AGE = int(os.getenv("JWKS_MAX_AGE", 300))
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", 10_000))
+
+REVOCATION_BUCKET_SECONDS = int(os.getenv("REVOCATION_BUCKET_SECONDS", 300))
+REVOCATION_BLOOM_CAPACITY = int(os.getenv("REVOCATION_BLOOM_CAPACITY", 100_000))
+REVOCATION_FALSE_POSITIVE_RATE = float(os.getenv("REVOCATION_FALSE_POSITIVE_RATE", 0.001))
+REVOCATION_SYNC_INTERVAL = float(os.getenv("REVOCATION_SYNC_INTERVAL", 5))
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 5))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 5))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_CHUNK_SIZE = int(os.getenv("DB_CHUNK_SIZE", 500))
+
+DATABASE_REPLICA_URLS = [
+    url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+]
+DATABASE_REPLICA_WEIGHTS = [
+    int(weight) for weight in os.getenv("DATABASE_REPLICA_WEIGHTS", "").split(",") if weight.strip()
+]
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", 5))
+REPLICA_LAG_QUERY = os.getenv("REPLICA_LAG_QUERY")
+REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", 5))
+REPLICA_CHECK_TIMEOUT = float(os.getenv("REPLICA_CHECK_TIMEOUT", 2))
+REPLICA_READ_AFTER_WRITE = float(os.getenv("REPLICA_READ_AFTER_WRITE", REPLICA_MAX_LAG))
+
+STATELESS_TOKENS = os.getenv("STATELESS_TOKENS", "true").lower() == "true"
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "true").lower() == "true"
+PROFILING_INTERVAL = float(os.getenv("PROFILING_INTERVAL", 0.001))
+
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", 50))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", 200))
+USER_PROFILE_MAX_AGE = int(os.getenv("USER_PROFILE_MAX_AGE", 60))
+
+SIGNUP_PRECHECK = os.getenv("SIGNUP_PRECHECK", "false").lower() == "true"
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", 100_000))
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() == "true"
+RATE_LIMIT_WINDOW = float(os.getenv("RATE_LIMIT_WINDOW", 60))
+RATE_LIMIT_SIGN_IN_PER_IP = int(os.getenv("RATE_LIMIT_SIGN_IN_PER_IP", 30))
+RATE_LIMIT_SIGN_IN_PER_USERNAME = int(os.getenv("RATE_LIMIT_SIGN_IN_PER_USERNAME", 10))
+RATE_LIMIT_SIGN_IN_PER_IP_USERNAME = int(os.getenv("RATE_LIMIT_SIGN_IN_PER_IP_USERNAME", 5))
+RATE_LIMIT_SIGN_UP_PER_IP = int(os.getenv("RATE_LIMIT_SIGN_UP_PER_IP", 5))
+
+LOCKOUT_THRESHOLD = int(os.getenv("LOCKOUT_THRESHOLD", 5))
+LOCKOUT_WINDOW = float(os.getenv("LOCKOUT_WINDOW", 900))
+LOCKOUT_BASE_SECONDS = float(os.getenv("LOCKOUT_BASE_SECONDS", 30))
+LOCKOUT_MAX_SECONDS = float(os.getenv("LOCKOUT_MAX_SECONDS", 3600))
+
+PASSWORD_HASH_ALGORITHM = os.getenv("PASSWORD_HASH_ALGORITHM", "bcrypt")
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", 12))
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", 3))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", 65536))
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", 4))
+SCRYPT_LOG_N = int(os.getenv("SCRYPT_LOG_N", 15))
+SCRYPT_BLOCK_SIZE = int(os.getenv("SCRYPT_BLOCK_SIZE", 8))
+SCRYPT_PARALLELISM = int(os.getenv("SCRYPT_PARALLELISM", 1))
+PASSWORD_REHASH_ON_LOGIN = os.getenv("PASSWORD_REHASH_ON_LOGIN", "true").lower() == "true"
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", 16))
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_URL = os.getenv("CACHE_URL", "redis://127.0.0.1:6379/0")
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 10_000))
+
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 60))
+USER_CACHE_NEGATIVE_TTL = float(os.getenv("USER_CACHE_NEGATIVE_TTL", 5))
 
 DB_USERNAME = "root"
 DB_PASSWORD = os.getenv("MYSQL_ROOT_PASSWORD")
@@ -1,57 +1,422 @@
+from contextlib import asynccontextmanager
+from functools import partial
+from itertools import islice
+from typing import Any, AsyncIterator, Iterable, Optional, Sequence
+
+from sqlalchemy import UniqueConstraint, tuple_
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import DBAPIError, IntegrityError
 from sqlmodel import SQLModel, select, update, insert, delete
 
-from .connection import AsyncSession
+from cache import MISSING, CacheNamespace
+from config import DB_CHUNK_SIZE
+from .connection import AsyncSession, async_session
+from .routing import REPLICA_OPTION, ROUTED_KEY, replica_failed
+from .singleflight import SingleFlight, single_flight
+
+UNIT_OF_WORK = "unit_of_work"
+
+
+def chunked(rows: Iterable, size: int) -> Iterable[list]:
+    iterator = iter(rows)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def unique_keys(table) -> list[set[str]]:
+    keys = [{column.name for column in table.primary_key}]
+    keys += [
+        {column.name for column in constraint.columns}
+        for constraint in table.constraints
+        if isinstance(constraint, UniqueConstraint)
+    ]
+    keys += [
+        {column.name for column in index.columns}
+        for index in table.indexes
+        if index.unique
+    ]
+    return keys
 
 
 class ORMBase:
     model: SQLModel
+    cache: Optional[CacheNamespace] = None
+    cache_fields: tuple[str, ...] = ()
+    # Fields kept out of the cache, and the value cache hits carry instead.
+    cache_exclude: dict[str, Any] = {}
+    # Fields whose concurrent ``get`` calls share one query.
+    coalesce_fields: tuple[str, ...] = ()
+    flights: SingleFlight = single_flight
+    chunk_size: int = DB_CHUNK_SIZE
+    replica_reads: bool = False
 
     def __init__(self, session: AsyncSession) -> None:
         self.session = session
 
-    async def get(self, *filter, **params):
-        result = await self.session.execute(
+    async def _read(self, query):
+        """Run a read on a replica when the model allows it, else the primary."""
+        if not self.replica_reads:
+            return await self.session.execute(query)
+        try:
+            return await self.session.execute(
+                query.execution_options(**{REPLICA_OPTION: True})
+            )
+        except DBAPIError as error:
+            if not replica_failed(self.session, error):
+                raise
+            await self.session.rollback()
+            return await self.session.execute(query)
+
+    async def get(self, *filter, cache: bool = True, **params):
+        """The first matching row.
+
+        ``cache=False`` reads the row as it is now: from the primary, past
+        the cache and replicas, for reads that must see the latest write.
+        """
+        query = select(self.model).filter(*filter).filter_by(**params)
+        if not cache:
+            return (await self.session.execute(query)).scalars().first()
+        key = self.cache_key(*filter, **params)
+        if key is not None:
+            cached = await self.cache.get(key)
+            if cached is None:
+                return None
+            if cached is not MISSING:
+                return self.model.model_validate({**cached, **self.cache_exclude})
+        flight = self.flight_key(*filter, **params)
+        if flight is None:
+            return await self._load(query, key)
+        data = await self.flights.do(flight, partial(self._load_shared, query, key))
+        return None if data is None else self.model.model_validate(data)
+
+    async def _load(self, query, key: Optional[str]):
+        instance = (await self._read(query)).scalars().first()
+        if instance is None and self.session.info.pop(ROUTED_KEY, None):
+            # A lagging replica may not have the row yet; ask the primary.
+            instance = (await self.session.execute(query)).scalars().first()
+        if key is not None:
+            await self.cache.set(
+                key,
+                instance and instance.model_dump(
+                    mode="json", exclude=set(self.cache_exclude)
+                ),
+            )
+        return instance
+
+    async def _load_shared(self, query, key: Optional[str]) -> Optional[dict]:
+        """``_load`` in a session of its own, which no single caller can close."""
+        async with async_session() as session:
+            instance = await type(self)(session)._load(query, key)
+        return instance and instance.model_dump()
+
+    async def get_all(
+        self,
+        *filter,
+        limit: int = 50,
+        offset: int = 0,
+        **params
+    ):
+        result = await self._read(
             select(self.model).
             filter(*filter).
-            filter_by(**params)
+            filter_by(**params).
+            offset(offset).
+            limit(limit)
         )
-        return result.scalars().first()
+        return result.scalars().all()
 
-    async def get_all(
+    async def get_page(
         self,
         *filter,
-        limit: int = 0, 
-        offset: int = 50, 
+        after: Optional[int] = None,
+        limit: int = 50,
         **params
     ):
-        result = await self.session.execute(
+        """Keyset pagination on the primary key: rows with ``id > after``."""
+        query = (
             select(self.model).
             filter(*filter).
             filter_by(**params).
-            offset(offset).
+            order_by(self.model.id).
             limit(limit)
         )
+        if after is not None:
+            query = query.where(self.model.id > after)
+        result = await self._read(query)
         return result.scalars().all()
 
-    async def create(self, **data):
-        await self.session.execute(
-            insert(self.model).
-            values(**data)
+    async def get_page_rows(
+        self,
+        columns: Sequence,
+        *filter,
+        after: Optional[int] = None,
+        limit: int = 50,
+        **params
+    ) -> list[dict]:
+        """``get_page`` selecting only ``columns``, as plain dicts."""
+        query = (
+            select(*columns).
+            filter(*filter).
+            filter_by(**params).
+            order_by(self.model.id).
+            limit(limit)
         )
-        await self.session.commit()
+        if after is not None:
+            query = query.where(self.model.id > after)
+        result = await self._read(query)
+        return [dict(row) for row in result.mappings()]
+
+    async def stream(
+        self,
+        *filter,
+        batch_size: Optional[int] = None,
+        **params
+    ) -> AsyncIterator[SQLModel]:
+        result = await self.session.stream(
+            select(self.model).
+            filter(*filter).
+            filter_by(**params).
+            order_by(self.model.id).
+            execution_options(
+                yield_per=batch_size or self.chunk_size,
+                **{REPLICA_OPTION: self.replica_reads},
+            )
+        )
+        async for instance in result.scalars():
+            yield instance
+
+    async def stream_rows(
+        self,
+        columns: Sequence,
+        *filter,
+        batch_size: Optional[int] = None,
+        **params
+    ) -> AsyncIterator[dict]:
+        """``stream`` selecting only ``columns``, as plain dicts."""
+        result = await self.session.stream(
+            select(*columns).
+            filter(*filter).
+            filter_by(**params).
+            order_by(self.model.id).
+            execution_options(
+                yield_per=batch_size or self.chunk_size,
+                **{REPLICA_OPTION: self.replica_reads},
+            )
+        )
+        async for row in result.mappings():
+            yield dict(row)
+
+    async def create(self, **data):
+        try:
+            await self.session.execute(
+                insert(self.model).
+                values(**data)
+            )
+        except IntegrityError:
+            await self._rollback()
+            raise
+        await self._commit(partial(self.invalidate_rows, [data]))
 
     async def update(self, *filter, **data):
+        rows = await self._cached_rows(*filter)
         await self.session.execute(
             update(self.model).
             filter(*filter).
             values(**data)
         )
-        await self.session.commit()
+        # A changed cached field leaves a key under its old and its new value.
+        rows += [{**row, **data} for row in rows]
+        await self._commit(partial(self.invalidate_rows, rows))
 
     async def delete(self, *filter, **params):
+        rows = await self._cached_rows(*filter, **params)
         await self.session.execute(
             delete(self.model).
             filter(*filter).
             filter_by(**params)
         )
+        await self._commit(partial(self.invalidate_rows, rows))
+
+    async def _cached_rows(self, *filter, **params) -> list[dict]:
+        """The ``cache_fields`` of the rows a write is about to change."""
+        if self.cache is None or not self.cache_fields:
+            return []
+        result = await self.session.execute(
+            select(*(getattr(self.model, field) for field in self.cache_fields)).
+            filter(*filter).
+            filter_by(**params)
+        )
+        return [dict(row) for row in result.mappings()]
+
+    async def create_many(
+        self,
+        rows: Sequence[dict],
+        chunk_size: Optional[int] = None,
+    ) -> None:
+        try:
+            for chunk in chunked(rows, chunk_size or self.chunk_size):
+                await self.session.execute(insert(self.model.__table__), chunk)
+        except IntegrityError:
+            await self._rollback()
+            raise
+        await self._commit(partial(self.invalidate_rows, rows))
+
+    async def update_many(
+        self,
+        rows: Sequence[dict],
+        chunk_size: Optional[int] = None,
+    ) -> None:
+        """Update rows by primary key; every dict must contain it."""
+        cached = []
+        for chunk in chunked(rows, chunk_size or self.chunk_size):
+            cached += await self._cached_rows(self.model.id.in_([row["id"] for row in chunk]))
+            await self.session.execute(update(self.model), chunk)
+        await self._commit(partial(self.invalidate_rows, [*cached, *rows]))
+
+    async def delete_many(
+        self,
+        values: Sequence[Any],
+        field: str = "id",
+        chunk_size: Optional[int] = None,
+    ) -> int:
+        deleted = 0
+        column = getattr(self.model, field)
+        cached = []
+        for chunk in chunked(values, chunk_size or self.chunk_size):
+            cached += await self._cached_rows(column.in_(chunk))
+            result = await self.session.execute(
+                delete(self.model).
+                where(column.in_(chunk))
+            )
+            deleted += result.rowcount
+        await self._commit(partial(self.invalidate_rows, cached))
+        return deleted
+
+    async def upsert(
+        self,
+        rows: Sequence[dict],
+        update_fields: Sequence[str],
+        conflict_fields: Sequence[str] = ("id",),
+        chunk_size: Optional[int] = None,
+    ) -> None:
+        statement = self._upsert_statement(update_fields, conflict_fields)
+        key = tuple_(*(getattr(self.model, field) for field in conflict_fields))
+        cached = []
+        for chunk in chunked(rows, chunk_size or self.chunk_size):
+            cached += await self._cached_rows(
+                key.in_([tuple(row[field] for field in conflict_fields) for row in chunk])
+            )
+            await self.session.execute(statement, chunk)
+        await self._commit(partial(self.invalidate_rows, [*cached, *rows]))
+
+    def _upsert_statement(
+        self,
+        update_fields: Sequence[str],
+        conflict_fields: Sequence[str],
+    ):
+        """Insert, or update ``update_fields`` where ``conflict_fields`` clash.
+
+        MySQL's ON DUPLICATE KEY UPDATE cannot name the key: a clash on any
+        unique key of the table updates the row. ``conflict_fields`` must
+        still be a unique key there, and callers should not upsert into
+        tables whose other unique keys may clash.
+        """
+        table = self.model.__table__
+        dialect = self.session.get_bind().dialect.name
+        if dialect == "mysql":
+            if set(conflict_fields) not in unique_keys(table):
+                raise ValueError(
+                    f"{table.name} has no unique key on {', '.join(conflict_fields)}"
+                )
+            statement = mysql.insert(table)
+            return statement.on_duplicate_key_update(
+                {field: statement.inserted[field] for field in update_fields}
+            )
+        if dialect in ("sqlite", "postgresql"):
+            statement = (sqlite if dialect == "sqlite" else postgresql).insert(table)
+            return statement.on_conflict_do_update(
+                index_elements=list(conflict_fields),
+                set_={field: statement.excluded[field] for field in update_fields},
+            )
+        raise ValueError(
+            f"upsert supports mysql, postgresql and sqlite, not {dialect}"
+        )
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator["ORMBase"]:
+        """Run every write on this session in one transaction and one commit.
+
+        Other ``ORMBase`` objects sharing the session join the same unit of
+        work; cache invalidations are deferred until the commit succeeds.
+        """
+        info = self.session.info
+        if UNIT_OF_WORK in info:
+            yield self
+            return
+        info[UNIT_OF_WORK] = []
+        try:
+            yield self
+            await self.session.commit()
+        except BaseException:
+            await self.session.rollback()
+            raise
+        finally:
+            invalidations = info.pop(UNIT_OF_WORK)
+        for invalidation in invalidations:
+            await invalidation()
+
+    async def _commit(self, invalidation=None) -> None:
+        pending = self.session.info.get(UNIT_OF_WORK)
+        if pending is not None:
+            if invalidation is not None:
+                pending.append(invalidation)
+            return
         await self.session.commit()
+        if invalidation is not None:
+            await invalidation()
+
+    async def _rollback(self) -> None:
+        if UNIT_OF_WORK not in self.session.info:
+            await self.session.rollback()
+
+    def cache_key(self, *filter, **params) -> Optional[str]:
+        if self.cache is None or filter or len(params) != 1:
+            return None
+        [(field, value)] = params.items()
+        if field not in self.cache_fields:
+            return None
+        return f"{field}={value}"
+
+    def flight_key(self, *filter, **params) -> Optional[str]:
+        # A session inside a transaction may have to see its own writes.
+        if filter or len(params) != 1 or self.session.in_transaction():
+            return None
+        [(field, value)] = params.items()
+        if field not in self.coalesce_fields:
+            return None
+        return f"{self.model.__tablename__}:{field}={value}"
+
+    async def invalidate_rows(self, rows: Iterable[dict]) -> None:
+        """Drop the cache keys of ``rows``, or the whole namespace if it has none."""
+        if self.cache is None:
+            return
+        if not self.cache_fields:
+            await self.cache.invalidate()
+            return
+        keys = [
+            self.cache_key(**{field: row[field]})
+            for row in rows
+            for field in self.cache_fields
+            if field in row
+        ]
+        if keys:
+            await self.cache.delete(*keys)
+
+    async def invalidate(self, *filter, **params) -> None:
+        if self.cache is None:
+            return
+        key = self.cache_key(*filter, **params)
+        if key is not None:
+            await self.cache.delete(key)
+        else:
+            await self.cache.invalidate()
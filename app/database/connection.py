@@ -1,15 +1,216 @@
-from typing import AsyncGenerator
+import time
+from dataclasses import dataclass
+from typing import AsyncGenerator, Optional
 
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-from config import DATABASE_URL
+from config import (
+    DATABASE_REPLICA_URLS,
+    DATABASE_REPLICA_WEIGHTS,
+    DATABASE_URL,
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+)
+from observability.context import current_request
+from observability.metrics import DB_POOL_TIMEOUTS, DB_POOL_WAIT, DB_QUERY_DURATION
+from .routing import ROUTER_KEY, ReplicaRouter, RoutingSession
 
-engine = create_async_engine(DATABASE_URL)
+QUERY_OPERATIONS = frozenset({"SELECT", "INSERT", "UPDATE", "DELETE"})
 
-async_session = sessionmaker(autoflush=False, bind=engine, class_=AsyncSession)
+
+@dataclass
+class PoolMetrics:
+    checkouts: int = 0
+    timeouts: int = 0
+    wait_time: float = 0.0
+    max_wait_time: float = 0.0
+
+    def record(self, wait_time: float) -> None:
+        self.checkouts += 1
+        self.wait_time += wait_time
+        self.max_wait_time = max(self.max_wait_time, wait_time)
+
+    def snapshot(self) -> dict:
+        if _engine is None:
+            return vars(self).copy()
+        pool = _engine.pool
+        return {
+            **vars(self),
+            "size": pool.size() if hasattr(pool, "size") else None,
+            "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+            "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+        }
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.timeouts += 1
+            DB_POOL_TIMEOUTS.inc()
+            raise
+        wait_time = time.perf_counter() - start
+        pool_metrics.record(wait_time)
+        DB_POOL_WAIT.observe(wait_time)
+        return connection
+
+
+def engine_options(url: str) -> dict:
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "poolclass": InstrumentedPool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def instrument_engine(sync_engine) -> None:
+    """Time every statement and charge it to the current request."""
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        record_query(conn, statement)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(context):
+        if context.connection is not None:
+            record_query(context.connection, context.statement or "")
+
+
+def record_query(conn, statement: str) -> None:
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    duration = time.perf_counter() - starts.pop()
+    operation = statement.lstrip()[:6].upper()
+    DB_QUERY_DURATION.labels(
+        operation if operation in QUERY_OPERATIONS else "OTHER"
+    ).observe(duration)
+    stats = current_request.get()
+    if stats is not None:
+        stats.record_query(duration)
+
+
+def create_engine(url: str) -> AsyncEngine:
+    engine = create_async_engine(url, **engine_options(url))
+    instrument_engine(engine.sync_engine)
+    return engine
+
+
+_engine: Optional[AsyncEngine] = None
+_replicas: Optional[ReplicaRouter] = None
+_session_factory: Optional[async_sessionmaker] = None
+
+
+def get_engine() -> AsyncEngine:
+    """The worker's primary engine, created on first use so it never crosses a fork."""
+    global _engine, _replicas, _session_factory
+    if _engine is None:
+        _engine = create_engine(DATABASE_URL)
+        if DATABASE_REPLICA_URLS:
+            _replicas = ReplicaRouter.from_urls(
+                DATABASE_REPLICA_URLS, DATABASE_REPLICA_WEIGHTS, create_engine
+            )
+        _session_factory = async_sessionmaker(
+            autoflush=False,
+            expire_on_commit=False,
+            bind=_engine,
+            class_=AsyncSession,
+            sync_session_class=RoutingSession,
+            info={ROUTER_KEY: _replicas} if _replicas else None,
+        )
+    return _engine
+
+
+def get_replica_router() -> Optional[ReplicaRouter]:
+    get_engine()
+    return _replicas
+
+
+def async_session() -> AsyncSession:
+    if _session_factory is None:
+        get_engine()
+    return _session_factory()
+
+
+async def dispose_engine() -> None:
+    global _engine, _replicas, _session_factory
+    if _replicas is not None:
+        await _replicas.dispose()
+    if _engine is not None:
+        await _engine.dispose()
+    _engine = _replicas = _session_factory = None
+
+
+def reset_engine_after_fork() -> None:
+    """Drop engines inherited from the parent without touching their sockets."""
+    global _engine, _replicas, _session_factory
+    if _replicas is not None:
+        _replicas.reset_after_fork()
+    if _engine is not None:
+        _engine.sync_engine.dispose(close=False)
+    _engine = _replicas = _session_factory = None
+
+
+class LazySession:
+    """Proxy that opens the ``AsyncSession`` on first use."""
+
+    def __init__(self, factory=async_session):
+        self._factory = factory
+        self._session: Optional[AsyncSession] = None
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = self._factory()
+        return self._session
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
 
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
-    async with async_session() as session:
+    session = LazySession()
+    try:
         yield session
+    finally:
+        await session.close()
+
+
+async def pool_timeout_handler(request: Request, error: exc.TimeoutError):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Database connection pool exhausted"},
+        headers={"Retry-After": "1"},
+    )
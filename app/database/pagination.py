@@ -0,0 +1,18 @@
+import base64
+import json
+
+
+def encode_cursor(last_id: int) -> str:
+    payload = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_id = json.loads(base64.urlsafe_b64decode(padded))["id"]
+    except (ValueError, KeyError, TypeError) as error:
+        raise ValueError(f"invalid cursor: {cursor!r}") from error
+    if not isinstance(last_id, int):
+        raise ValueError(f"invalid cursor: {cursor!r}")
+    return last_id
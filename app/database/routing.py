@@ -0,0 +1,240 @@
+"""Read replicas.
+
+Writes, row locks and every statement after a session's first write go to
+the primary. Reads that opt in with the ``replica`` execution option go to a
+replica picked by smooth weighted round-robin. A replica that fails its
+health check, or lags by more than ``REPLICA_MAX_LAG`` seconds, is skipped
+until a later check passes; with none left, reads go to the primary. Tables
+this worker wrote to in the last ``REPLICA_READ_AFTER_WRITE`` seconds are
+read from the primary as well.
+"""
+import asyncio
+import logging
+import time
+from typing import Callable, Optional, Sequence
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.dml import UpdateBase
+
+from config import (
+    REPLICA_CHECK_INTERVAL,
+    REPLICA_CHECK_TIMEOUT,
+    REPLICA_LAG_QUERY,
+    REPLICA_MAX_LAG,
+    REPLICA_READ_AFTER_WRITE,
+)
+
+logger = logging.getLogger(__name__)
+
+REPLICA_OPTION = "replica"
+ROUTER_KEY = "replica_router"
+PINNED_KEY = "primary_pinned"
+ROUTED_KEY = "routed_replica"
+
+
+class Replica:
+    def __init__(self, url: str, engine: AsyncEngine, weight: int = 1):
+        self.name = make_url(url).render_as_string(hide_password=True)
+        self.engine = engine
+        self.weight = weight
+        self.current_weight = 0
+        self.healthy = True
+        self.lag = 0.0
+        self.reads = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+    def snapshot(self) -> dict:
+        return {
+            "name": self.name,
+            "weight": self.weight,
+            "healthy": self.healthy,
+            "lag": self.lag,
+            "reads": self.reads,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+
+def statement_tables(clause) -> list[str]:
+    if isinstance(clause, UpdateBase):
+        return [clause.table.name]
+    if isinstance(clause, Select):
+        return [table.name for table in clause.get_final_froms() if hasattr(table, "name")]
+    return []
+
+
+class ReplicaRouter:
+    def __init__(
+        self,
+        replicas: list[Replica],
+        max_lag: float = REPLICA_MAX_LAG,
+        lag_query: Optional[str] = REPLICA_LAG_QUERY,
+        check_interval: float = REPLICA_CHECK_INTERVAL,
+        check_timeout: float = REPLICA_CHECK_TIMEOUT,
+        read_after_write: float = REPLICA_READ_AFTER_WRITE,
+    ):
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.lag_query = lag_query
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self.read_after_write = read_after_write
+        self.fallbacks = 0
+        self._written: dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_urls(
+        cls,
+        urls: Sequence[str],
+        weights: Sequence[int],
+        engine_factory: Callable[[str], AsyncEngine],
+        **options,
+    ) -> "ReplicaRouter":
+        replicas = [
+            Replica(url, engine_factory(url), weights[index] if index < len(weights) else 1)
+            for index, url in enumerate(urls)
+        ]
+        return cls(replicas, **options)
+
+    def available(self) -> list[Replica]:
+        return [
+            replica for replica in self.replicas
+            if replica.healthy and replica.lag <= self.max_lag and replica.weight > 0
+        ]
+
+    def pick(self) -> Optional[Replica]:
+        candidates = self.available()
+        if not candidates:
+            self.fallbacks += 1
+            return None
+        total = 0
+        chosen = None
+        for replica in candidates:
+            replica.current_weight += replica.weight
+            total += replica.weight
+            if chosen is None or replica.current_weight > chosen.current_weight:
+                chosen = replica
+        chosen.current_weight -= total
+        chosen.reads += 1
+        return chosen
+
+    def record_write(self, tables: list[str]) -> None:
+        if self.read_after_write > 0:
+            until = time.monotonic() + self.read_after_write
+            for table in tables:
+                self._written[table] = until
+
+    def recently_written(self, tables: list[str]) -> bool:
+        if not self._written:
+            return False
+        now = time.monotonic()
+        return any(self._written.get(table, 0.0) > now for table in tables)
+
+    def mark_failed(self, replica: Replica, error: Exception) -> None:
+        message = str(getattr(error, "orig", None) or error)
+        if replica.healthy:
+            logger.warning("replica %s failed, reading from the primary: %s", replica.name, message)
+        replica.healthy = False
+        replica.failures += 1
+        replica.last_error = message
+
+    async def measure_lag(self, connection) -> float:
+        if self.lag_query:
+            return float((await connection.exec_driver_sql(self.lag_query)).scalar() or 0)
+        if connection.dialect.name == "mysql":
+            status = (await connection.exec_driver_sql("SHOW REPLICA STATUS")).mappings().first()
+            if status is None:
+                return 0.0
+            lag = status.get("Seconds_Behind_Source")
+            # NULL means the replication threads are stopped.
+            return float("inf") if lag is None else float(lag)
+        await connection.exec_driver_sql("SELECT 1")
+        return 0.0
+
+    async def check(self, replica: Replica) -> None:
+        try:
+            async with asyncio.timeout(self.check_timeout):
+                async with replica.engine.connect() as connection:
+                    replica.lag = await self.measure_lag(connection)
+        except Exception as error:
+            self.mark_failed(replica, error)
+            return
+        if not replica.healthy:
+            logger.info("replica %s is healthy again", replica.name)
+        replica.healthy = True
+        if replica.lag > self.max_lag:
+            logger.warning("replica %s lags by %.1fs", replica.name, replica.lag)
+
+    async def check_all(self) -> None:
+        await asyncio.gather(*(self.check(replica) for replica in self.replicas))
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def run(self) -> None:
+        while True:
+            await self.check_all()
+            await asyncio.sleep(self.check_interval)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def dispose(self) -> None:
+        await self.stop()
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def reset_after_fork(self) -> None:
+        for replica in self.replicas:
+            replica.engine.sync_engine.dispose(close=False)
+
+    def snapshot(self) -> dict:
+        return {
+            "fallbacks": self.fallbacks,
+            "replicas": [replica.snapshot() for replica in self.replicas],
+        }
+
+
+class RoutingSession(Session):
+    """Sends opted-in reads to a replica; everything else to the bound primary."""
+
+    def get_bind(self, mapper=None, *, clause=None, **kw):
+        router: Optional[ReplicaRouter] = self.info.get(ROUTER_KEY)
+        self.info.pop(ROUTED_KEY, None)
+        if router is not None:
+            if isinstance(clause, UpdateBase) or self._flushing:
+                self.info[PINNED_KEY] = True
+                router.record_write(statement_tables(clause))
+            elif (
+                isinstance(clause, Select)
+                and clause.get_execution_options().get(REPLICA_OPTION)
+                and clause._for_update_arg is None
+                and not self.info.get(PINNED_KEY)
+                and not router.recently_written(statement_tables(clause))
+            ):
+                replica = router.pick()
+                if replica is not None:
+                    self.info[ROUTED_KEY] = replica
+                    return replica.engine.sync_engine
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+def replica_failed(session, error: Exception) -> bool:
+    """Mark the replica that served ``session``'s last read as failed."""
+    replica = session.info.pop(ROUTED_KEY, None)
+    if replica is None:
+        return False
+    session.info[ROUTER_KEY].mark_failed(replica, error)
+    return True
@@ -0,0 +1,72 @@
+"""Coalesce identical in-flight reads.
+
+While a call for a key is running in this worker, later callers with the same
+key wait for its result instead of making the call again. The call runs in a
+task of its own, so a caller that is cancelled does not take it away from the
+others; it is cancelled only once every caller has gone.
+"""
+import asyncio
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Awaitable, Callable, Hashable
+
+from observability.metrics import DB_COALESCED_QUERIES
+
+
+@dataclass
+class SingleFlightMetrics:
+    calls: int = 0
+    coalesced: int = 0
+    abandoned: int = 0
+    errors: int = 0
+
+    def snapshot(self) -> dict:
+        return vars(self).copy()
+
+
+@dataclass
+class Flight:
+    task: asyncio.Task
+    waiters: int = 0
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        self.flights: dict[Hashable, Flight] = {}
+        self.metrics = SingleFlightMetrics()
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        flight = self.flights.get(key)
+        if flight is None:
+            flight = Flight(asyncio.create_task(call()))
+            self.flights[key] = flight
+            flight.task.add_done_callback(partial(self._done, key, flight))
+            self.metrics.calls += 1
+        else:
+            self.metrics.coalesced += 1
+            DB_COALESCED_QUERIES.inc()
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Everyone waiting has been cancelled.
+                self._forget(key, flight)
+                flight.task.cancel()
+                self.metrics.abandoned += 1
+
+    def _done(self, key: Hashable, flight: Flight, task: asyncio.Task) -> None:
+        self._forget(key, flight)
+        if not task.cancelled() and task.exception() is not None:
+            self.metrics.errors += 1
+
+    def _forget(self, key: Hashable, flight: Flight) -> None:
+        if self.flights.get(key) is flight:
+            del self.flights[key]
+
+    def snapshot(self) -> dict:
+        return {**self.metrics.snapshot(), "in_flight": len(self.flights)}
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,32 @@
+import os
+import shutil
+
+from prometheus_client import multiprocess
+
+# Import the app once in the master and fork it into the workers. The
+# database engine, hash executor and cache connections are created lazily,
+# so each worker builds its own after the fork.
+preload_app = os.environ.get("GUNICORN_PRELOAD_APP", "false").lower() == "true"
+
+if preload_app and os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    # The master imports the metrics before on_starting runs.
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+
+def on_starting(server):
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+
+
+def post_fork(server, worker):
+    if preload_app:
+        from database.connection import reset_engine_after_fork
+
+        reset_engine_after_fork()
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
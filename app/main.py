@@ -1,16 +1,74 @@
+from contextlib import asynccontextmanager
+
 from fastapi.middleware.cors import CORSMiddleware
 # from fastapi.middleware.httpsredirect import HTTPSRedirectMiddleware
-from fastapi import FastAPI
-import uvicorn
+from fastapi import FastAPI, Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 
 from auth import auth_router
+from auth.backend import is_superuser_request
+from auth.database.queries import UserObjects
+from auth.cookies import get_cookie_transport
+from auth.hashing import password_hasher
+from auth.jwt_strategy import get_jwt_strategy
+from auth.logout import logout_jobs
+from auth.maintenance import TokenSessionSweeper
+from auth.ratelimit import RateLimitMiddleware
+from auth.rehash import password_rehasher
+from auth.revocation import revocation_list
+from auth.sessions import close_session_store
+from auth.token_cache import verified_tokens
+from auth.token_versions import token_versions
+from cache import close_cache_backend, get_cache_backend
+from config import SESSION_SWEEP_ENABLED
+from database.connection import (
+    dispose_engine,
+    get_engine,
+    get_replica_router,
+    pool_metrics,
+    pool_timeout_handler,
+)
+from database.singleflight import single_flight
+from observability import MetricsMiddleware, ProfilingMiddleware, render_metrics
+
+session_sweeper = TokenSessionSweeper()
+
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    get_engine()
+    get_jwt_strategy()
+    get_cookie_transport()
+    replicas = get_replica_router()
+    if replicas is not None:
+        replicas.start()
+    if SESSION_SWEEP_ENABLED:
+        session_sweeper.start()
+    await revocation_list.start()
+    await token_versions.start()
+    yield
+    await session_sweeper.stop()
+    await logout_jobs.stop()
+    await revocation_list.stop()
+    await token_versions.stop()
+    await password_rehasher.drain()
+    password_hasher.shutdown()
+    await close_session_store()
+    await close_cache_backend()
+    await dispose_engine()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.include_router(auth_router.router)
 
+app.add_exception_handler(PoolTimeoutError, pool_timeout_handler)
+
 # app.add_middleware(HTTPSRedirectMiddleware)
 
+app.add_middleware(RateLimitMiddleware)
+
 app.add_middleware(
     middleware_class=CORSMiddleware,
     allow_origins=["*"],
@@ -19,11 +77,74 @@ app.add_middleware(
     allow_headers=["*",],
 )
 
+app.add_middleware(ProfilingMiddleware, authorize=is_superuser_request)
+
+app.add_middleware(MetricsMiddleware)
+
 
 @app.get('/root')
 async def root():
     return {"message": "Hello, world!"}
 
 
+@app.get('/metrics')
+async def metrics():
+    content, media_type = render_metrics()
+    return Response(content, media_type=media_type)
+
+
+@app.get('/metrics/pool')
+async def pool_stats():
+    return pool_metrics.snapshot()
+
+
+@app.get('/metrics/singleflight')
+async def single_flight_stats():
+    return single_flight.snapshot()
+
+
+@app.get('/metrics/cache')
+async def cache_stats():
+    return {
+        "backend": get_cache_backend().snapshot(),
+        "namespaces": {UserObjects.cache.name: UserObjects.cache.snapshot()},
+    }
+
+
+@app.get('/metrics/replicas')
+async def replica_stats():
+    replicas = get_replica_router()
+    return replicas.snapshot() if replicas else {"replicas": []}
+
+
+@app.get('/metrics/tokens')
+async def token_cache_stats():
+    return verified_tokens.snapshot()
+
+
+@app.get('/metrics/revocations')
+async def revocation_stats():
+    return {**revocation_list.snapshot(), "token_versions": token_versions.snapshot()}
+
+
+@app.get('/metrics/hashing')
+async def hashing_stats():
+    return {
+        "algorithm": password_hasher.algorithm.name,
+        **password_hasher.metrics.snapshot(),
+        "rehash": password_rehasher.metrics.snapshot(),
+    }
+
+
+@app.get('/metrics/sessions')
+async def session_sweeper_stats():
+    return {
+        "sweeper": session_sweeper.lock.held,
+        **session_sweeper.metrics.snapshot(),
+    }
+
+
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run("main:app", reload=True)
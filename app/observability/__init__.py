@@ -0,0 +1,4 @@
+from .context import RequestStats, current_request
+from .metrics import render_metrics
+from .middleware import MetricsMiddleware
+from .profiling import ProfilingMiddleware
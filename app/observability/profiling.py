@@ -0,0 +1,56 @@
+from typing import Awaitable, Callable
+from urllib.parse import parse_qs
+
+from fastapi import Request
+from fastapi.responses import HTMLResponse, PlainTextResponse
+
+from config import PROFILING_ENABLED, PROFILING_INTERVAL
+
+
+def profile_requested(scope) -> bool:
+    for name, value in scope.get("headers", ()):
+        if name == b"x-profile":
+            return value not in (b"", b"0")
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return query.get("profile", ["0"])[0] not in ("", "0")
+
+
+class ProfilingMiddleware:
+    """Profile a single request with pyinstrument.
+
+    Triggered by ``?profile=1`` or an ``X-Profile: 1`` header; the request
+    runs normally and its response is replaced by the profile (HTML, or text
+    with ``?profile_format=text``). Requests that ``authorize`` rejects are
+    served unprofiled.
+    """
+
+    def __init__(self, app, authorize: Callable[[Request], Awaitable[bool]]):
+        self.app = app
+        self.authorize = authorize
+
+    async def __call__(self, scope, receive, send):
+        if (
+            not PROFILING_ENABLED
+            or scope["type"] != "http"
+            or not profile_requested(scope)
+            or not await self.authorize(Request(scope))
+        ):
+            await self.app(scope, receive, send)
+            return
+        from pyinstrument import Profiler
+
+        async def discard(message):
+            pass
+
+        profiler = Profiler(interval=PROFILING_INTERVAL, async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            profiler.stop()
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        if query.get("profile_format", ["html"])[0] == "text":
+            response = PlainTextResponse(profiler.output_text(unicode=True))
+        else:
+            response = HTMLResponse(profiler.output_html())
+        await response(scope, receive, send)
@@ -4,4 +4,10 @@ alembic upgrade head
 
 cd app
 
-gunicorn main:app --workers 4 --worker-class uvicorn.workers.UvicornWorker --bind=0.0.0.0:8000
\ No newline at end of file
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus}
+
+# The workers share one cache so an invalidation in one reaches the others.
+export CACHE_BACKEND=${CACHE_BACKEND:-redis}
+export CACHE_URL=${CACHE_URL:-redis://redis:6379/0}
+
+gunicorn main:app -c gunicorn.conf.py --workers 4 --worker-class uvicorn.workers.UvicornWorker --bind=0.0.0.0:8000
\ No newline at end of file
@@ -0,0 +1,32 @@
+"""TokenSession expires_at
+
+Revision ID: 8e4d2b6f9c13
+Revises: 5b1f0c7e2a41
+Create Date: 2026-10-18 11:02:17.530942
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e4d2b6f9c13'
+down_revision: Union[str, None] = '5b1f0c7e2a41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('tokensession', sa.Column('expires_at', sa.DateTime(), nullable=True))
+    op.execute(
+        "UPDATE tokensession SET expires_at = DATE_ADD(created_at, INTERVAL 30 DAY)"
+    )
+    op.alter_column('tokensession', 'expires_at', existing_type=sa.DateTime(), nullable=False)
+    op.create_index(op.f('ix_tokensession_expires_at'), 'tokensession', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_tokensession_expires_at'), table_name='tokensession')
+    op.drop_column('tokensession', 'expires_at')
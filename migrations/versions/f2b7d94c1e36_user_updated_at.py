@@ -0,0 +1,34 @@
+"""Users updated_at
+
+Revision ID: f2b7d94c1e36
+Revises: e5c83a1f6b20
+Create Date: 2026-10-18 17:51:27.304815
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b7d94c1e36'
+down_revision: Union[str, None] = 'e5c83a1f6b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+updated_at_type = sa.DateTime().with_variant(mysql.DATETIME(fsp=6), 'mysql')
+
+
+def upgrade() -> None:
+    op.add_column('Users', sa.Column('updated_at', updated_at_type, nullable=True))
+    users = sa.table('Users', sa.column('updated_at'), sa.column('registered_at'))
+    op.execute(users.update().values(updated_at=users.c.registered_at))
+    with op.batch_alter_table('Users') as batch_op:
+        batch_op.alter_column('updated_at', existing_type=updated_at_type, nullable=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('Users') as batch_op:
+        batch_op.drop_column('updated_at')
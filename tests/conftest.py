@@ -0,0 +1,10 @@
+import os
+import tempfile
+
+# config reads the environment on import; point it at a throwaway database.
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/test.db"
+os.environ["SECRET_KEY"] = "test-secret"
+os.environ["ALGORITHM"] = "HS256"
+os.environ["PASSWORD_HASH_ROUNDS"] = "4"
+# Importing ``benchmarks`` would otherwise switch the rate limits off.
+os.environ["RATE_LIMIT_ENABLED"] = "true"
@@ -0,0 +1,59 @@
+import asyncio
+
+from cache import MISSING, CacheNamespace, RedisBackend
+from cache.server import StubRedisServer
+
+
+async def until(condition, timeout: float = 1.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+async def with_workers(scenario) -> None:
+    """Run ``scenario`` with two namespaces on separate connections to one server."""
+    async with StubRedisServer() as server:
+        backends = [RedisBackend(server.url), RedisBackend(server.url)]
+        namespaces = [CacheNamespace(backend, "users", ttl=60) for backend in backends]
+        try:
+            await scenario(*namespaces)
+        finally:
+            for backend in backends:
+                await backend.close()
+
+
+def test_round_trip():
+    async def scenario(first, second):
+        await first.set("id=1", {"id": 1, "username": "ann"})
+        await first.set("id=2", None)
+        assert await second.get("id=1") == {"id": 1, "username": "ann"}
+        assert await second.get("id=2") is None
+        assert await second.get("id=3") is MISSING
+        assert second.stats.snapshot() == {
+            "hits": 2, "misses": 1, "errors": 0, "invalidations": 0,
+        }
+
+    asyncio.run(with_workers(scenario))
+
+
+def test_deleted_keys_are_gone_for_every_worker():
+    async def scenario(first, second):
+        await first.set("id=1", {"id": 1})
+        assert await second.get("id=1") == {"id": 1}
+        await first.delete("id=1")
+        assert await second.get("id=1") is MISSING
+
+    asyncio.run(with_workers(scenario))
+
+
+def test_invalidation_reaches_other_subscribers():
+    async def scenario(first, second):
+        await first.set("id=1", {"id": 1})
+        assert await second.get("id=1") == {"id": 1}
+        await first.invalidate()
+        await until(lambda: second._generation == first._generation)
+        assert await second.get("id=1") is MISSING
+        assert await first.get("id=1") is MISSING
+
+    asyncio.run(with_workers(scenario))
@@ -0,0 +1,117 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import httpx
+
+from benchmarks.common import create_schema
+from config import (
+    LOCKOUT_THRESHOLD,
+    RATE_LIMIT_SIGN_IN_PER_IP,
+    RATE_LIMIT_SIGN_IN_PER_IP_USERNAME,
+    RATE_LIMIT_SIGN_UP_PER_IP,
+)
+from database.connection import dispose_engine
+from main import app
+
+PASSWORD = "correct-password"
+
+
+@asynccontextmanager
+async def client(ip: str):
+    transport = httpx.ASGITransport(app=app, client=(ip, 40000))
+    async with httpx.AsyncClient(transport=transport, base_url="https://test") as client:
+        yield client
+
+
+def run(scenario) -> None:
+    async def main():
+        await create_schema()
+        try:
+            await scenario()
+        finally:
+            await dispose_engine()
+
+    asyncio.run(main())
+
+
+async def sign_up(ip: str, username: str) -> httpx.Response:
+    async with client(ip) as http:
+        return await http.post("/api/auth/sign-up", params={
+            "username": username,
+            "email": f"{username}@example.com",
+            "password": PASSWORD,
+            "is_public": True,
+        })
+
+
+async def sign_in(ip: str, username: str, password: str) -> httpx.Response:
+    async with client(ip) as http:
+        return await http.post(
+            "/api/auth/sign-in", data={"username": username, "password": password}
+        )
+
+
+def assert_limited(response: httpx.Response, detail: str) -> None:
+    assert response.status_code == 429
+    assert response.json()["detail"] == detail
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_sign_ups_are_limited_per_ip():
+    async def scenario():
+        for index in range(RATE_LIMIT_SIGN_UP_PER_IP):
+            response = await sign_up("10.0.1.1", f"signup{index}")
+            assert response.status_code == 201
+        assert_limited(await sign_up("10.0.1.1", "signup-over"), "Too many requests")
+        assert (await sign_up("10.0.1.2", "signup-other-ip")).status_code == 201
+
+    run(scenario)
+
+
+def test_sign_ins_are_limited_per_ip():
+    async def scenario():
+        for index in range(RATE_LIMIT_SIGN_IN_PER_IP):
+            response = await sign_in("10.0.2.1", f"nobody{index}", PASSWORD)
+            assert response.status_code == 400
+        assert_limited(await sign_in("10.0.2.1", "nobody", PASSWORD), "Too many requests")
+
+    run(scenario)
+
+
+def test_sign_ins_are_limited_per_ip_and_username():
+    async def scenario():
+        assert (await sign_up("10.0.3.1", "guessed")).status_code == 201
+        for _ in range(RATE_LIMIT_SIGN_IN_PER_IP_USERNAME):
+            assert (await sign_in("10.0.3.2", "guessed", "wrong")).status_code == 400
+        assert_limited(await sign_in("10.0.3.2", "guessed", PASSWORD), "Too many requests")
+
+    run(scenario)
+
+
+def test_failed_sign_ins_lock_the_account():
+    async def scenario():
+        assert (await sign_up("10.0.4.1", "locked")).status_code == 201
+        # A new address for every attempt keeps the per-IP limits out of it.
+        for index in range(LOCKOUT_THRESHOLD):
+            response = await sign_in(f"10.0.4.{10 + index}", "locked", "wrong")
+            assert response.status_code == 400
+        assert_limited(
+            await sign_in("10.0.4.100", "locked", PASSWORD),
+            "Too many failed sign-in attempts",
+        )
+
+    run(scenario)
+
+
+def test_successful_sign_in_resets_the_failures():
+    async def scenario():
+        assert (await sign_up("10.0.5.1", "forgetful")).status_code == 201
+        addresses = (f"10.0.5.{10 + index}" for index in range(100))
+        for _ in range(2):
+            for _ in range(LOCKOUT_THRESHOLD - 1):
+                response = await sign_in(next(addresses), "forgetful", "wrong")
+                assert response.status_code == 400
+            response = await sign_in(next(addresses), "forgetful", PASSWORD)
+            assert response.status_code == 200
+
+    run(scenario)
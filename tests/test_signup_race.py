@@ -0,0 +1,30 @@
+import asyncio
+from collections import Counter
+
+from benchmarks.common import create_schema
+from benchmarks.signup_race import race
+from database.connection import dispose_engine
+
+ATTEMPTS = 25
+
+
+async def run_races() -> tuple[Counter, Counter]:
+    await create_schema()
+    try:
+        by_username, _ = await race(ATTEMPTS, "racer", "racer{index}@example.com")
+        by_email, _ = await race(ATTEMPTS, "racer{index}", "racer@example.com")
+    finally:
+        await dispose_engine()
+    return by_username, by_email
+
+
+def test_exactly_one_duplicate_sign_up_wins():
+    by_username, by_email = asyncio.run(run_races())
+    assert by_username == Counter({
+        "created": 1,
+        "409 User with this username already exists": ATTEMPTS - 1,
+    })
+    assert by_email == Counter({
+        "created": 1,
+        "409 User with this email already exists": ATTEMPTS - 1,
+    })
@@ -0,0 +1,17 @@
+import os
+import statistics
+
+from benchmarks.startup import start_worker
+
+# python -X importtime inflates the figure; keep headroom for slow CI hosts.
+BUDGET_MS = float(os.getenv("STARTUP_IMPORT_BUDGET_MS", 1500))
+INTERPRETERS = 3
+
+
+def test_import_of_main_stays_within_budget():
+    imports = []
+    for _ in range(INTERPRETERS):
+        imported, _, cumulative, _ = start_worker()
+        imports.append(cumulative or imported)
+    median_ms = statistics.median(imports) * 1000
+    assert median_ms <= BUDGET_MS, f"import of main took {median_ms:.0f} ms"